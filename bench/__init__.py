@@ -0,0 +1,3 @@
+"""
+Herramientas de pruebas de rendimiento del FND (microservicios simulados y carga).
+"""
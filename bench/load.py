@@ -0,0 +1,291 @@
+"""
+PRUEBAS DE CARGA DEL FND CON RECORRIDOS DE USUARIO.
+
+Lanza N usuarios virtuales (corrutinas asyncio con su propio cliente y sus
+cookies) que repiten recorridos realistas contra el FND durante un tiempo fijo:
+
+- anonymous: portada -> tienda -> páginas filtradas de la tienda -> canción -> reproducir track
+- buyer: login -> búsqueda mientras se escribe -> álbum -> añadir al carrito -> carrito -> compra
+- studio: login de artista -> estudio -> subir canción -> editarla -> subir álbum -> editar perfil
+
+Para cada paso y cada recorrido calcula peticiones por segundo, latencias
+p50/p95/p99 y tasa de errores, y lo escribe en JSON para comparar ejecuciones.
+Pensado para usarse contra los microservicios simulados de `bench.stubs`
+(usuarios benchN, identificadores del catálogo de 1 a N), con el FND arrancado
+con la cabecera Server-Timing activada para ver el desglose por microservicio:
+
+    python -m bench.stubs --size 1000 &
+    FND_SERVER_TIMING_ENABLED=1 python frontend.py &
+    python -m bench.load --users 20 --duration 60 --catalogue-size 1000 --out antes.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from bench.stubs import BENCH_PASSWORD, BENCH_USERS, WORDS, catalogue_counts
+
+JOURNEYS = {}
+
+
+def journey(name: str):
+    def register(func):
+        JOURNEYS[name] = func
+        return func
+    return register
+
+
+class Recorder():
+    """
+    Latencias y errores por paso y por recorrido.
+    """
+
+    def __init__(self):
+        self.steps = {}
+        self.journeys = {}
+
+    def add(self, table: dict, name: str, duration: float, ok: bool):
+        entry = table.setdefault(name, {"latencies": [], "errors": 0})
+        entry["latencies"].append(duration)
+        if not ok:
+            entry["errors"] += 1
+
+    def report(self, elapsed: float) -> dict:
+        return {
+            "steps": {name: _summary(entry, elapsed) for name, entry in sorted(self.steps.items())},
+            "journeys": {name: _summary(entry, elapsed) for name, entry in sorted(self.journeys.items())},
+        }
+
+
+def _percentile(values: list, p: float) -> float:
+    # Rango más cercano sobre la lista ya ordenada
+    index = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def _summary(entry: dict, elapsed: float) -> dict:
+    latencies = sorted(entry["latencies"])
+    count = len(latencies)
+    return {
+        "count": count,
+        "errors": entry["errors"],
+        "error_rate": entry["errors"] / count if count else 0.0,
+        "rps": count / elapsed if elapsed else 0.0,
+        "mean": sum(latencies) / count if count else None,
+        "p50": _percentile(latencies, 50) if count else None,
+        "p95": _percentile(latencies, 95) if count else None,
+        "p99": _percentile(latencies, 99) if count else None,
+        "max": latencies[-1] if count else None,
+    }
+
+
+class VirtualUser():
+    """
+    Usuario virtual con su propio cliente HTTP (y por tanto sus propias cookies).
+    """
+
+    def __init__(self, index: int, args, recorder: Recorder):
+        self.index = index
+        self.args = args
+        self.recorder = recorder
+        self.rng = random.Random(args.seed + index)
+        self.counts = catalogue_counts(args.catalogue_size)
+        self.client = httpx.AsyncClient(base_url=args.base, timeout=args.timeout, follow_redirects=False)
+        self.journey_ok = True
+
+    def pick(self, kind: str) -> int:
+        return self.rng.randint(1, self.counts[kind])
+
+    @property
+    def username(self) -> str:
+        return f"bench{self.index % min(BENCH_USERS, self.counts['artist']) + 1}"
+
+    async def step(self, name: str, method: str, url: str, **kwargs):
+        """
+        Ejecuta un paso del recorrido y lo registra. Un estado >= 400 o un
+        error de red cuentan como error del paso y del recorrido.
+        """
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        self.recorder.add(self.recorder.steps, name, time.perf_counter() - start, ok)
+        self.journey_ok = self.journey_ok and ok
+        if self.args.think:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think))
+        return response
+
+    async def login(self, journey_name: str):
+        self.client.cookies.clear()
+        return await self.step(f"{journey_name}.login", "POST", "/login",
+                               json={"username": self.username, "password": BENCH_PASSWORD})
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def _json(response):
+    try:
+        return response.json() if response is not None else None
+    except ValueError:
+        return None
+
+
+# ===================== RECORRIDOS =====================
+@journey("anonymous")
+async def anonymous(vu: VirtualUser):
+    vu.client.cookies.clear()
+    await vu.step("anonymous.home", "GET", "/")
+    await vu.step("anonymous.shop", "GET", "/shop")
+    genre = vu.rng.randint(1, 12)
+    for page in range(1, vu.rng.randint(2, 4)):
+        await vu.step("anonymous.shop_filter", "GET", "/shop",
+                      params={"genres": genre, "order": vu.rng.choice(("date", "name")), "page": page})
+    song_id = vu.pick("song")
+    await vu.step("anonymous.song", "GET", f"/song/{song_id}")
+    # En los microservicios simulados el track de una canción tiene su mismo id
+    await vu.step("anonymous.play", "GET", f"/track/{song_id}")
+
+
+@journey("buyer")
+async def buyer(vu: VirtualUser):
+    await vu.login("buyer")
+    word = vu.rng.choice([w for w in WORDS if len(w) >= 5])
+    for length in range(3, len(word) + 1):
+        await vu.step("buyer.search", "GET", "/api/search/song", params={"q": word[:length]})
+    album_id = vu.pick("album")
+    await vu.step("buyer.album", "GET", f"/album/{album_id}")
+    await vu.step("buyer.add_to_cart", "POST", "/cart", json={"albumId": album_id})
+    await vu.step("buyer.cart", "GET", "/cart")
+    await vu.step("buyer.purchase", "POST", "/purchase", json={
+        "paymentMethodId": 1,
+        "purchasePrice": 9.99,
+        "purchaseDate": datetime.now(timezone.utc).isoformat(),
+        "albumIds": [album_id],
+    })
+    await vu.step("buyer.logout", "POST", "/logout")
+
+
+@journey("studio")
+async def studio(vu: VirtualUser):
+    await vu.login("studio")
+    await vu.step("studio.studio", "GET", "/artist/studio")
+    await vu.step("studio.upload_form", "GET", "/song/upload")
+    created = _json(await vu.step("studio.upload_song", "POST", "/song/upload", json={
+        "title": f"Bench {vu.rng.randint(1, 10 ** 6)}",
+        "description": "Subida de prueba de carga",
+        "genres": [vu.rng.randint(1, 12)],
+        "price": 0.99,
+        "duration": 180,
+        "releaseDate": datetime.now(timezone.utc).date().isoformat(),
+        "collaborators": [],
+    }))
+    song_id = (created or {}).get("songId")
+    if song_id:
+        await vu.step("studio.edit_form", "GET", f"/song/{song_id}/edit")
+        await vu.step("studio.edit_song", "PATCH", f"/song/{song_id}/edit",
+                      json={"description": "Editada durante la prueba de carga"})
+    await vu.step("studio.upload_album", "POST", "/album/upload", json={
+        "title": f"Bench LP {vu.rng.randint(1, 10 ** 6)}",
+        "description": "Álbum de prueba de carga",
+        "genres": [vu.rng.randint(1, 12)],
+        "price": 9.99,
+        "releaseDate": datetime.now(timezone.utc).date().isoformat(),
+        "songs": [song_id] if song_id else [],
+        "collaborators": [],
+    })
+    await vu.step("studio.edit_profile", "PATCH", "/artist/edit",
+                  data={"artisticBiography": f"Biografía {vu.rng.randint(1, 10 ** 6)}"})
+
+
+# ===================== EJECUCIÓN =====================
+async def _run_user(vu: VirtualUser, names: list, weights: list, deadline: float):
+    while time.monotonic() < deadline:
+        name = vu.rng.choices(names, weights)[0]
+        vu.journey_ok = True
+        start = time.perf_counter()
+        await JOURNEYS[name](vu)
+        vu.recorder.add(vu.recorder.journeys, name, time.perf_counter() - start, vu.journey_ok)
+    await vu.close()
+
+
+def _parse_mix(spec: str):
+    names, weights = [], []
+    for item in spec.split(","):
+        name, _, weight = item.partition(":")
+        if name not in JOURNEYS:
+            raise SystemExit(f"Recorrido desconocido: {name} (disponibles: {', '.join(JOURNEYS)})")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+async def run(args) -> dict:
+    names, weights = _parse_mix(args.journeys)
+    recorder = Recorder()
+    users = [VirtualUser(i, args, recorder) for i in range(args.users)]
+    started = datetime.now(timezone.utc)
+    start = time.monotonic()
+    deadline = start + args.duration
+    tasks = []
+    for vu in users:
+        tasks.append(asyncio.create_task(_run_user(vu, names, weights, deadline)))
+        if args.ramp_up:
+            await asyncio.sleep(args.ramp_up / args.users)
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - start
+    report = {
+        "started": started.isoformat(timespec="seconds"),
+        "elapsed": elapsed,
+        "config": {key: value for key, value in vars(args).items() if key != "out"},
+    }
+    report.update(recorder.report(elapsed))
+    return report
+
+
+def _print_table(report: dict):
+    header = f"{'paso':<28}{'n':>7}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'error':>8}"
+    print(header)
+    print("-" * len(header))
+    for section in ("steps", "journeys"):
+        for name, s in report[section].items():
+            ms = lambda v: f"{v * 1000:9.1f}" if v is not None else f"{'-':>9}"
+            print(f"{name:<28}{s['count']:>7}{s['rps']:>8.1f}{ms(s['p50'])}{ms(s['p95'])}{ms(s['p99'])}{s['error_rate']:>8.1%}")
+        print("-" * len(header))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pruebas de carga del FND con recorridos de usuario")
+    parser.add_argument("--base", default="http://localhost:8000", help="URL del FND")
+    parser.add_argument("--users", type=int, default=10, help="usuarios virtuales concurrentes")
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos de prueba")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="segundos en los que se reparten los arranques de usuarios")
+    parser.add_argument("--think", type=float, default=0.0, help="pausa media entre pasos en segundos")
+    parser.add_argument("--journeys", default="anonymous:6,buyer:3,studio:1",
+                        help="mezcla de recorridos con pesos (nombre:peso,...)")
+    parser.add_argument("--catalogue-size", type=int, default=1000, help="--size con el que se lanzó bench.stubs")
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout de cada petición en segundos")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="", help="fichero JSON del informe (por defecto, salida estándar)")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        _print_table(report)
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+
+
+if __name__ == "__main__":
+    main()
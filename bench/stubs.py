@@ -0,0 +1,789 @@
+"""
+MICROSERVICIOS SIMULADOS PARA PRUEBAS DE RENDIMIENTO DEL FND.
+
+Levanta SYU, TYA, TPP, PT y RYE en los puertos de `controller.msvc_servers`
+a partir de las especificaciones OpenAPI del repositorio:
+
+- Las rutas y métodos de cada servicio se leen de su YAML.
+- El catálogo (canciones, álbumes, artistas, merch, géneros) se genera con los
+  esquemas de TemasYArtistas.yaml, con identificadores coherentes entre sí
+  (el artista de una canción existe, sus géneros existen, etc.).
+- Las respuestas de las rutas sin comportamiento propio se sintetizan a partir
+  del esquema de su respuesta 200.
+- Una tabla de comportamientos (BEHAVIOURS) da estado a lo que lo necesita:
+  sesiones, favoritos, carrito, métodos de pago, altas/ediciones del catálogo.
+  También replica los campos que el FND espera aunque no figuren en la
+  especificación (p. ej. `session_token` en /login o `artistId` en /auth).
+
+Latencia y errores se inyectan por servicio. Uso:
+
+    python -m bench.stubs --size 5000 --latency 0.02 --jitter 0.01
+    python -m bench.stubs --set TYA.latency=0.1 --set PT.error_rate=0.2
+
+Usuarios de prueba: bench1 ... benchN con contraseña "bench"; cada uno está
+vinculado al artista con su mismo número.
+"""
+import argparse
+import asyncio
+import base64
+import datetime
+import itertools
+import os
+import random
+import re
+import secrets
+from urllib.parse import urlparse
+
+import uvicorn
+import yaml
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+import controller.msvc_servers as servers
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SPECS = {
+    "SYU": "UserAndSessions.yaml",
+    "TYA": "TemasYArtistas.yaml",
+    "TPP": "TiendaYPasarelaPago.yaml",
+    "PT": "ProveedorTracks.yaml",
+    "RYE": "RecsYEstadisticas.yaml",
+}
+
+# Esquema de TYA -> tipo de entidad del catálogo
+ENTITIES = {
+    "Song": "song",
+    "Album": "album",
+    "Artist": "artist",
+    "Merchandising": "merch",
+}
+
+# Rutas que el FND usa aunque no estén en la especificación
+EXTRA_ROUTES = [
+    ("SYU", "GET", "/logout"),
+]
+
+BENCH_PASSWORD = "bench"
+BENCH_USERS = 50
+PAGE_SIZE = 9
+
+# PNG de 1x1, suficiente para las portadas e imágenes en base64
+TINY_PNG = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+
+WORDS = (
+    "luz", "noche", "mar", "fuego", "cielo", "viento", "sombra", "camino", "río", "ciudad",
+    "sueño", "lluvia", "eco", "tierra", "alba", "niebla", "verano", "invierno", "corazón", "estrella",
+    "canción", "azul", "salvaje", "dorado", "silencio", "tormenta", "norte", "sur", "último", "primer",
+)
+GENRES = ("Pop", "Rock", "Jazz", "Flamenco", "Hip Hop", "Electrónica", "Indie", "Reggaeton",
+          "Clásica", "Metal", "Blues", "Folk")
+
+
+# ===================== ESPECIFICACIONES =====================
+class Spec():
+    """
+    Documento OpenAPI con resolución de referencias $ref locales.
+    """
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            self.doc = yaml.safe_load(f)
+
+    def resolve(self, node):
+        while isinstance(node, dict) and "$ref" in node:
+            target = self.doc
+            for part in node["$ref"].lstrip("#/").split("/"):
+                target = target[part]
+            node = target
+        return node
+
+    def schema(self, name: str) -> dict:
+        return self.doc["components"]["schemas"][name]
+
+    def operations(self):
+        for path, item in self.doc.get("paths", {}).items():
+            for method, op in item.items():
+                if method in ("get", "post", "put", "patch", "delete"):
+                    yield path, method.upper(), op
+
+    def response_schema(self, op: dict):
+        """
+        Esquema de la respuesta 200 (o None si no devuelve cuerpo JSON).
+        """
+        response = self.resolve(op.get("responses", {}).get("200") or {})
+        content = response.get("content", {})
+        media = content.get("application/json") or content.get("text/plain")
+        if not media or "schema" not in media:
+            return None
+        return media["schema"]
+
+
+class Synth():
+    """
+    Genera valores sintéticos a partir de un esquema, usando el nombre del
+    campo para que los datos sean verosímiles.
+    """
+
+    def __init__(self, spec: Spec, rng: random.Random):
+        self.spec = spec
+        self.rng = rng
+
+    def words(self, n: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(n))
+
+    def date(self) -> str:
+        day = datetime.date(1990, 1, 1) + datetime.timedelta(days=self.rng.randrange(35 * 365))
+        return day.isoformat()
+
+    def value(self, schema, name: str = ""):
+        schema = self.spec.resolve(schema)
+        if "allOf" in schema:
+            merged = {}
+            for part in schema["allOf"]:
+                merged.update(self.value(part, name) or {})
+            return merged
+        kind = schema.get("type", "object" if "properties" in schema else "string")
+        lname = name.lower()
+        if kind == "object":
+            return {key: self.value(prop, key) for key, prop in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self.value(schema.get("items", {}), name) for _ in range(self.rng.randint(0, 3))]
+        if kind == "integer":
+            if "minimum" in schema or "maximum" in schema:
+                return self.rng.randint(schema.get("minimum", 0), schema.get("maximum", 100))
+            if "duration" in lname:
+                return self.rng.randint(90, 420)
+            return self.rng.randint(1, 1000)
+        if kind == "number":
+            return round(self.rng.uniform(0.99, 29.99), 2)
+        if kind == "boolean":
+            return self.rng.random() < 0.5
+        if "enum" in schema:
+            return self.rng.choice(schema["enum"])
+        if schema.get("format") == "byte":
+            return base64.b64encode(self.rng.randbytes(32)).decode()
+        if "image" in lname or "cover" in lname:
+            return TINY_PNG
+        if "email" in lname:
+            return f"{self.words(1).replace(' ', '')}{self.rng.randint(1, 999)}@example.com"
+        if schema.get("format") == "uri" or "url" in lname:
+            return f"https://example.com/{self.rng.randint(1, 10 ** 6)}"
+        if "date" in lname or schema.get("format") in ("date", "date-time"):
+            return self.date()
+        if "description" in lname or "biography" in lname:
+            return self.words(12).capitalize() + "."
+        if "name" in lname or "title" in lname:
+            return self.words(self.rng.randint(1, 3)).title()
+        return self.words(2)
+
+    def conform(self, schema, source: dict) -> dict:
+        """
+        Objeto con la forma del esquema: los campos presentes en `source` se
+        copian y el resto se sintetizan.
+        """
+        schema = self.spec.resolve(schema)
+        result = {}
+        for key, prop in schema.get("properties", {}).items():
+            result[key] = source[key] if key in source else self.value(prop, key)
+        return result
+
+
+# ===================== CATÁLOGO =====================
+def catalogue_counts(size: int) -> dict:
+    """
+    Número de entidades de cada tipo para un catálogo de `size` canciones.
+    Los identificadores van de 1 al número de entidades.
+    """
+    return {
+        "song": size,
+        "album": max(1, size // 8),
+        "artist": max(5, size // 10),
+        "merch": max(1, size // 10),
+    }
+
+
+class Catalogue():
+    """
+    Datos sintéticos coherentes compartidos por todos los servicios simulados.
+    """
+
+    def __init__(self, spec: Spec, size: int, seed: int, track_bytes: int):
+        self.rng = random.Random(seed)
+        self.synth = Synth(spec, self.rng)
+        self.track_bytes = track_bytes
+        self.genres = [{"id": i, "name": name} for i, name in enumerate(GENRES, start=1)]
+        self.items = {"song": {}, "album": {}, "artist": {}, "merch": {}}
+        self._ids = {kind: itertools.count(1) for kind in self.items}
+        schemas = {kind: spec.schema(name) for name, kind in ENTITIES.items()}
+
+        counts = catalogue_counts(size)
+        for _ in range(counts["artist"]):
+            artist = self.synth.value(schemas["artist"])
+            artist["userId"] = None
+            self.add("artist", artist)
+        artist_ids = list(self.items["artist"])
+
+        for _ in range(counts["album"]):
+            album = self.synth.value(schemas["album"])
+            album.update(artistId=self.rng.choice(artist_ids), songs=[])
+            self.add("album", album)
+        album_ids = list(self.items["album"])
+
+        for _ in range(counts["song"]):
+            song = self.synth.value(schemas["song"])
+            song.update(artistId=self.rng.choice(artist_ids), albumId=None, albumOrder=None, linked_albums=[])
+            if self.rng.random() < 0.7:
+                album = self.items["album"][self.rng.choice(album_ids)]
+                album["songs"].append(None)
+                song.update(albumId=album["albumId"], albumOrder=len(album["songs"]), artistId=album["artistId"])
+            song_id = self.add("song", song)
+            song["trackId"] = song_id
+            if song["albumId"] is not None:
+                self.items["album"][song["albumId"]]["songs"][-1] = song_id
+
+        for _ in range(counts["merch"]):
+            merch = self.synth.value(schemas["merch"])
+            merch["artistId"] = self.rng.choice(artist_ids)
+            self.add("merch", merch)
+
+        for artist in self.items["artist"].values():
+            artist.update(owner_songs=[], owner_albums=[], owner_merch=[])
+        for kind in ("song", "album", "merch"):
+            for entity_id, entity in self.items[kind].items():
+                self.items["artist"][entity["artistId"]][f"owner_{kind}s" if kind != "merch" else "owner_merch"].append(entity_id)
+
+        # Usuarios de prueba: benchN vinculado al artista N
+        self.users = {}
+        for i, artist_id in enumerate(artist_ids[:BENCH_USERS], start=1):
+            self.users[f"bench{i}"] = {
+                "userId": i,
+                "username": f"bench{i}",
+                "regDate": self.synth.date(),
+                "name": f"Bench {i}",
+                "firstLastName": "Load",
+                "secondLastName": "Test",
+                "email": f"bench{i}@example.com",
+                "image": TINY_PNG,
+                "relatedArtist": artist_id,
+                "artistId": artist_id,
+            }
+            self.items["artist"][artist_id]["userId"] = i
+
+    def add(self, kind: str, entity: dict) -> int:
+        entity_id = next(self._ids[kind])
+        entity[f"{kind}Id"] = entity_id
+        if kind != "artist":
+            entity["genres"] = self.rng.sample(range(1, len(GENRES) + 1), self.rng.randint(1, 3))
+            collaborators = self.rng.sample(list(self.items["artist"]), min(2, len(self.items["artist"])))
+            entity["collaborators"] = collaborators[:self.rng.randint(0, 2)]
+        self.items[kind][entity_id] = entity
+        return entity_id
+
+    def filter(self, kind: str, params) -> list:
+        items = self.items[kind].values()
+        genres = _int_list(params.get("genres"))
+        artists = _int_list(params.get("artists"))
+        if genres:
+            if kind == "artist":
+                # Un artista pertenece a un género si alguna de sus canciones lo tiene
+                songs = self.items["song"]
+                items = [a for a in items if any(set(songs[s].get("genres") or ()) & genres for s in a.get("owner_songs", ()))]
+            else:
+                items = [e for e in items if set(e.get("genres") or ()) & genres]
+        if artists:
+            field = "artistId"
+            items = [e for e in items if e.get(field) in artists]
+        key = "registrationDate" if kind == "artist" else "releaseDate"
+        name = "artisticName" if kind == "artist" else "title"
+        order = params.get("order")
+        if order in ("date", "name"):
+            items = sorted(items, key=lambda e: str(e.get(key if order == "date" else name) or ""),
+                           reverse=params.get("direction") == "desc")
+        ids = [e[f"{kind}Id"] for e in items]
+        page = params.get("page")
+        if page and page.isdigit():
+            start = (int(page) - 1) * PAGE_SIZE
+            ids = ids[start:start + PAGE_SIZE]
+        return ids
+
+    def product(self, synth: Synth, schema, kind: str, entity: dict) -> dict:
+        """
+        Producto de TPP a partir de una entidad del catálogo.
+        """
+        songs = self.items["song"]
+        source = {
+            "songId": entity.get("songId"),
+            "albumId": entity.get("albumId") if kind == "album" else None,
+            "merchId": entity.get("merchId"),
+            "name": entity.get("title"),
+            "price": entity.get("price"),
+            "description": entity.get("description"),
+            "artist": entity.get("artistId"),
+            "colaborators": entity.get("collaborators", []),
+            "releaseDate": entity.get("releaseDate"),
+            "duration": entity.get("duration"),
+            "genre": (entity.get("genres") or [None])[0],
+            "cover": entity.get("cover"),
+            "songList": [songs[s]["title"] for s in entity.get("songs", ()) if s in songs] if kind == "album" else None,
+        }
+        return synth.conform(schema, source)
+
+    def track(self, track_id: int) -> str:
+        rng = random.Random(track_id)
+        return base64.b64encode(rng.randbytes(self.track_bytes)).decode()
+
+
+def _int_list(value) -> set:
+    if not value:
+        return set()
+    return {int(v) for v in value.split(",") if v.strip().lstrip("-").isdigit()}
+
+
+# ===================== ESTADO DE LOS SERVICIOS =====================
+class State():
+    """
+    Estado mutable de los servicios simulados (sesiones, favoritos, carritos...).
+    """
+
+    def __init__(self, catalogue: Catalogue):
+        self.catalogue = catalogue
+        self.sessions = {}
+        self.favs = {}
+        self.carts = {}
+        self.payments = {}
+        self.purchases = itertools.count(1)
+        self.payment_ids = itertools.count(1)
+
+    def user(self, request):
+        token = request.cookies.get("oversound_auth") or request.query_params.get("token")
+        username = self.sessions.get(token)
+        return self.catalogue.users.get(username) if username else None
+
+
+def _error(service: str, status: int, message: str) -> JSONResponse:
+    return JSONResponse({"code": f"{service}-{status}", "message": message}, status_code=status)
+
+
+async def _body(request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def _path_id(request) -> int:
+    value = next(iter(request.path_params.values()))
+    return int(value) if str(value).lstrip("-").isdigit() else None
+
+
+# ===================== COMPORTAMIENTOS =====================
+BEHAVIOURS = []
+
+
+def behaviour(service: str, method: str, pattern: str):
+    def register(handler):
+        BEHAVIOURS.append((service, method, re.compile(pattern), handler))
+        return handler
+    return register
+
+
+@behaviour("TYA", "GET", r"^/genres$")
+async def tya_genres(ctx, request, match):
+    return JSONResponse(ctx.state.catalogue.genres)
+
+
+@behaviour("TYA", "GET", r"^/(song|album|merch|artist)/list$")
+async def tya_list(ctx, request, match):
+    items = ctx.state.catalogue.items[match[1]]
+    ids = _int_list(request.query_params.get("ids"))
+    return JSONResponse([items[i] for i in sorted(ids) if i in items])
+
+
+@behaviour("TYA", "GET", r"^/(song|album|merch|artist)/filter$")
+async def tya_filter(ctx, request, match):
+    return JSONResponse(ctx.state.catalogue.filter(match[1], request.query_params))
+
+
+@behaviour("TYA", "GET", r"^/(song|album|merch|artist)/search$")
+async def tya_search(ctx, request, match):
+    kind = match[1]
+    name = "artisticName" if kind == "artist" else "title"
+    q = request.query_params.get("q", "").lower()
+    return JSONResponse([
+        {f"{kind}Id": entity_id}
+        for entity_id, entity in ctx.state.catalogue.items[kind].items()
+        if q in str(entity.get(name, "")).lower()
+    ])
+
+
+@behaviour("TYA", "GET", r"^/(song|album|merch|artist)/\{\w+\}$")
+async def tya_get(ctx, request, match):
+    entity = ctx.state.catalogue.items[match[1]].get(_path_id(request))
+    if entity is None:
+        return _error("TYA", 404, "No encontrado")
+    return JSONResponse(entity)
+
+
+@behaviour("TYA", "PATCH", r"^/(song|album|merch|artist)/\{\w+\}$")
+async def tya_update(ctx, request, match):
+    entity = ctx.state.catalogue.items[match[1]].get(_path_id(request))
+    if entity is None:
+        return _error("TYA", 404, "No encontrado")
+    entity.update({k: v for k, v in (await _body(request)).items() if not k.endswith("Id")})
+    return JSONResponse({})
+
+
+@behaviour("TYA", "DELETE", r"^/(song|album|merch|artist)/\{\w+\}$")
+async def tya_delete(ctx, request, match):
+    ctx.state.catalogue.items[match[1]].pop(_path_id(request), None)
+    return JSONResponse({})
+
+
+@behaviour("TYA", "POST", r"^/(song|album|merch|artist)/upload$")
+async def tya_upload(ctx, request, match):
+    kind = match[1]
+    catalogue = ctx.state.catalogue
+    entity = await _body(request)
+    user = ctx.state.user(request)
+    if kind != "artist":
+        entity.setdefault("artistId", user["artistId"] if user else next(iter(catalogue.items["artist"])))
+    entity_id = catalogue.add(kind, entity)
+    if kind == "song":
+        entity["trackId"] = entity_id
+    return JSONResponse({f"{kind}Id": entity_id})
+
+
+@behaviour("SYU", "POST", r"^/login$")
+async def syu_login(ctx, request, match):
+    body = await _body(request)
+    username = body.get("username")
+    if username not in ctx.state.catalogue.users or body.get("password") != BENCH_PASSWORD:
+        return _error("SYU", 401, "Credenciales incorrectas")
+    token = secrets.token_hex(32)
+    ctx.state.sessions[token] = username
+    # El FND lee `session_token` aunque la especificación lo llama `token`
+    return JSONResponse({"token": token, "session_token": token})
+
+
+@behaviour("SYU", "GET", r"^/auth$")
+async def syu_auth(ctx, request, match):
+    user = ctx.state.user(request)
+    if user is None:
+        return _error("SYU", 401, "Sesión no válida")
+    return JSONResponse(user)
+
+
+@behaviour("SYU", "POST", r"^/logout$")
+@behaviour("SYU", "GET", r"^/logout$")
+async def syu_logout(ctx, request, match):
+    ctx.state.sessions.pop(request.cookies.get("oversound_auth"), None)
+    return JSONResponse({"message": "Sesión cerrada"})
+
+
+@behaviour("SYU", "GET", r"^/user/\{\w+\}$")
+async def syu_user(ctx, request, match):
+    user = ctx.state.catalogue.users.get(request.path_params["username"])
+    if user is None:
+        return _error("SYU", 404, "Usuario no encontrado")
+    return JSONResponse(user)
+
+
+@behaviour("SYU", "GET", r"^/favs/(songs|artists|albums)$")
+async def syu_favs(ctx, request, match):
+    user = ctx.state.user(request)
+    if user is None:
+        return _error("SYU", 401, "Sesión no válida")
+    return JSONResponse(sorted(ctx.state.favs.get((user["userId"], match[1]), ())))
+
+
+@behaviour("SYU", "POST", r"^/favs/(songs|artists|albums)/\{\w+\}$")
+@behaviour("SYU", "DELETE", r"^/favs/(songs|artists|albums)/\{\w+\}$")
+async def syu_fav_toggle(ctx, request, match):
+    user = ctx.state.user(request)
+    if user is None:
+        return _error("SYU", 401, "Sesión no válida")
+    favs = ctx.state.favs.setdefault((user["userId"], match[1]), set())
+    if request.method == "POST":
+        favs.add(_path_id(request))
+    else:
+        favs.discard(_path_id(request))
+    return JSONResponse({"message": "ok"})
+
+
+def _product_ref(body: dict):
+    for kind in ("song", "album", "merch"):
+        if body.get(f"{kind}Id") is not None:
+            return kind, int(body[f"{kind}Id"])
+    return None, None
+
+
+@behaviour("TPP", "GET", r"^/cart$")
+async def tpp_cart(ctx, request, match):
+    user = ctx.state.user(request)
+    if user is None:
+        return _error("TPP", 401, "Sesión no válida")
+    catalogue = ctx.state.catalogue
+    schema = ctx.spec.schema("Product")
+    products = []
+    for (kind, entity_id), units in ctx.state.carts.get(user["userId"], {}).items():
+        entity = catalogue.items[kind].get(entity_id)
+        if entity is not None:
+            product = catalogue.product(ctx.synth, schema, kind, entity)
+            product["unidades"] = units
+            products.append(product)
+    return JSONResponse(products)
+
+
+@behaviour("TPP", "POST", r"^/cart$")
+async def tpp_cart_add(ctx, request, match):
+    user = ctx.state.user(request)
+    if user is None:
+        return _error("TPP", 401, "Sesión no válida")
+    body = await _body(request)
+    kind, entity_id = _product_ref(body)
+    if kind is None or entity_id not in ctx.state.catalogue.items[kind]:
+        return _error("TPP", 400, "Producto no válido")
+    cart = ctx.state.carts.setdefault(user["userId"], {})
+    cart[(kind, entity_id)] = cart.get((kind, entity_id), 0) + int(body.get("unidades") or 1)
+    return JSONResponse({"message": "Producto añadido al carrito"})
+
+
+@behaviour("TPP", "DELETE", r"^/cart/\{\w+\}$")
+async def tpp_cart_remove(ctx, request, match):
+    user = ctx.state.user(request)
+    if user is None:
+        return _error("TPP", 401, "Sesión no válida")
+    kinds = {"song": "song", "0": "song", "album": "album", "1": "album", "merch": "merch", "2": "merch"}
+    wanted = kinds.get(request.query_params.get("type"))
+    cart = ctx.state.carts.get(user["userId"], {})
+    for key in [k for k in cart if k[1] == _path_id(request) and (wanted is None or k[0] == wanted)]:
+        del cart[key]
+        return JSONResponse({"message": "Producto eliminado del carrito"})
+    return _error("TPP", 404, "Producto no encontrado en el carrito")
+
+
+@behaviour("TPP", "GET", r"^/payment$")
+async def tpp_payments(ctx, request, match):
+    user = ctx.state.user(request)
+    if user is None:
+        return _error("TPP", 401, "Sesión no válida")
+    return JSONResponse(list(ctx.state.payments.get(user["userId"], {}).values()))
+
+
+@behaviour("TPP", "POST", r"^/payment$")
+async def tpp_payment_add(ctx, request, match):
+    user = ctx.state.user(request)
+    if user is None:
+        return _error("TPP", 401, "Sesión no válida")
+    method = ctx.synth.conform(ctx.spec.schema("PaymentMethod"), await _body(request))
+    method["id"] = next(ctx.state.payment_ids)
+    method["cardNumber"] = "**** **** **** " + str(method.get("cardNumber", ""))[-4:]
+    ctx.state.payments.setdefault(user["userId"], {})[method["id"]] = method
+    return JSONResponse(method)
+
+
+@behaviour("TPP", "DELETE", r"^/payment/\{\w+\}$")
+async def tpp_payment_remove(ctx, request, match):
+    user = ctx.state.user(request)
+    if user is None:
+        return _error("TPP", 401, "Sesión no válida")
+    if ctx.state.payments.get(user["userId"], {}).pop(_path_id(request), None) is None:
+        return _error("TPP", 404, "Método de pago no encontrado")
+    return JSONResponse({"message": "Método de pago eliminado"})
+
+
+@behaviour("TPP", "POST", r"^/purchase$")
+async def tpp_purchase(ctx, request, match):
+    user = ctx.state.user(request)
+    if user is None:
+        return _error("TPP", 401, "Sesión no válida")
+    ctx.state.carts.pop(user["userId"], None)
+    return JSONResponse({"purchaseId": next(ctx.state.purchases)})
+
+
+@behaviour("TPP", "GET", r"^/store$")
+async def tpp_store(ctx, request, match):
+    catalogue = ctx.state.catalogue
+    schema = ctx.spec.schema("Product")
+    try:
+        page = max(1, int(request.query_params.get("page", 1)))
+        limit = max(1, int(request.query_params.get("limit", 20)))
+    except ValueError:
+        return _error("TPP", 400, "Paginación no válida")
+    refs = [(kind, i) for kind in ("song", "album", "merch") for i in catalogue.items[kind]]
+    window = refs[(page - 1) * limit:page * limit]
+    return JSONResponse({
+        "data": [catalogue.product(ctx.synth, schema, kind, catalogue.items[kind][i]) for kind, i in window],
+        "pagination": {"page": page, "limit": limit, "total": len(refs), "totalPages": -(-len(refs) // limit)},
+        "genres": catalogue.genres,
+        "artists": [{"artistId": a["artistId"], "artisticName": a["artisticName"]} for a in catalogue.items["artist"].values()],
+    })
+
+
+@behaviour("PT", "GET", r"^/track/\{\w+\}$")
+async def pt_track(ctx, request, match):
+    track_id = _path_id(request)
+    if track_id not in ctx.state.catalogue.items["song"]:
+        return _error("PT", 404, "Track no encontrado")
+    return JSONResponse({"idtrack": track_id, "track": ctx.state.catalogue.track(track_id)})
+
+
+@behaviour("RYE", "GET", r"^/statistics/top-10-songs$")
+async def rye_top_songs(ctx, request, match):
+    catalogue = ctx.state.catalogue
+    genres = {g["id"]: g["name"] for g in catalogue.genres}
+    return JSONResponse([
+        {"id": s["songId"], "name": s["title"], "genre": genres.get((s.get("genres") or [None])[0]), "image": s["cover"]}
+        for s in itertools.islice(catalogue.items["song"].values(), 10)
+    ])
+
+
+@behaviour("RYE", "GET", r"^/statistics/top-10-artists$")
+async def rye_top_artists(ctx, request, match):
+    return JSONResponse([
+        {"id": a["artistId"], "name": a["artisticName"], "image": a["artisticImage"]}
+        for a in itertools.islice(ctx.state.catalogue.items["artist"].values(), 10)
+    ])
+
+
+# ===================== SERVIDORES =====================
+class Faults():
+    """
+    Latencia y errores inyectados en un servicio.
+    """
+
+    __slots__ = ("latency", "jitter", "error_rate")
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+
+class Context():
+    __slots__ = ("service", "spec", "synth", "state", "faults", "rng")
+
+    def __init__(self, service, spec, synth, state, faults, rng):
+        self.service = service
+        self.spec = spec
+        self.synth = synth
+        self.state = state
+        self.faults = faults
+        self.rng = rng
+
+
+def _starlette_path(path: str, op: dict, spec: Spec) -> str:
+    """
+    Traduce la ruta OpenAPI a Starlette, con convertidor int para los parámetros enteros.
+    """
+    for param in op.get("parameters") or ():
+        param = spec.resolve(param)
+        if param.get("in") == "path" and spec.resolve(param.get("schema", {})).get("type") == "integer":
+            path = path.replace("{%s}" % param["name"], "{%s:int}" % param["name"])
+    return path
+
+
+def _generic(ctx: Context, op: dict):
+    schema = ctx.spec.response_schema(op) if op else None
+
+    async def handler(request):
+        if schema is None:
+            return JSONResponse({"message": "ok"})
+        body = ctx.synth.value(schema)
+        if isinstance(body, dict):
+            for name, value in request.path_params.items():
+                for key in ("id", name):
+                    if key in body:
+                        body[key] = value
+        if isinstance(body, str):
+            return PlainTextResponse(body)
+        return JSONResponse(body)
+    return handler
+
+
+def _endpoint(ctx: Context, method: str, path: str, op: dict):
+    handler = None
+    for service, b_method, pattern, b_handler in BEHAVIOURS:
+        match = pattern.match(path)
+        if service == ctx.service and b_method == method and match:
+            handler = (lambda h, m: lambda request: h(ctx, request, m))(b_handler, match)
+            break
+    if handler is None:
+        handler = _generic(ctx, op)
+
+    async def endpoint(request):
+        faults = ctx.faults
+        if faults.latency or faults.jitter:
+            await asyncio.sleep(max(0.0, faults.latency + ctx.rng.uniform(-faults.jitter, faults.jitter)))
+        if faults.error_rate and ctx.rng.random() < faults.error_rate:
+            return _error(ctx.service, 500, "Error inyectado")
+        return await handler(request)
+    return endpoint
+
+
+def build_app(service: str, state: State, faults: Faults, seed: int) -> Starlette:
+    spec = Spec(os.path.join(BASE_DIR, SPECS[service]))
+    rng = random.Random(seed)
+    ctx = Context(service, spec, Synth(spec, rng), state, faults, rng)
+    operations = list(spec.operations())
+    known = {(path, method) for path, method, _ in operations}
+    operations += [(path, method, {}) for svc, method, path in EXTRA_ROUTES if svc == service and (path, method) not in known]
+    # Las rutas fijas (/song/list) antes que las parametrizadas (/song/{songId})
+    operations.sort(key=lambda item: item[0].count("{"))
+    routes = [
+        Route(_starlette_path(path, op, spec), _endpoint(ctx, method, path, op), methods=[method])
+        for path, method, op in operations
+    ]
+    return Starlette(routes=routes)
+
+
+def _apply_overrides(faults: dict, overrides: list):
+    for item in overrides:
+        target, _, value = item.partition("=")
+        service, _, key = target.partition(".")
+        if service not in faults or key not in Faults.__slots__:
+            raise SystemExit(f"--set no válido: {item} (formato SERVICIO.latency|jitter|error_rate=valor)")
+        setattr(faults[service], key, float(value))
+
+
+async def serve(args):
+    tya_spec = Spec(os.path.join(BASE_DIR, SPECS["TYA"]))
+    catalogue = Catalogue(tya_spec, args.size, args.seed, args.track_bytes)
+    state = State(catalogue)
+    services = args.only.split(",") if args.only else list(SPECS)
+    faults = {s: Faults(args.latency, args.jitter, args.error_rate) for s in services}
+    _apply_overrides(faults, args.set)
+
+    tasks = []
+    for i, service in enumerate(services):
+        url = urlparse(getattr(servers, service))
+        app = build_app(service, state, faults[service], args.seed + i)
+        config = uvicorn.Config(app, host=url.hostname, port=url.port, log_level="warning", access_log=False)
+        tasks.append(uvicorn.Server(config).serve())
+        f = faults[service]
+        print(f"{service} en {url.geturl()} (latencia {f.latency}s ±{f.jitter}s, errores {f.error_rate:.0%})")
+    print(f"Catálogo: {len(catalogue.items['song'])} canciones, {len(catalogue.items['album'])} álbumes, "
+          f"{len(catalogue.items['artist'])} artistas, {len(catalogue.items['merch'])} merch, "
+          f"{len(catalogue.users)} usuarios (benchN / {BENCH_PASSWORD})")
+    await asyncio.gather(*tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microservicios simulados para pruebas de rendimiento del FND")
+    parser.add_argument("--size", type=int, default=1000, help="número de canciones del catálogo (el resto se deriva)")
+    parser.add_argument("--seed", type=int, default=42, help="semilla de los datos sintéticos")
+    parser.add_argument("--latency", type=float, default=0.0, help="latencia base de cada respuesta en segundos")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variación uniforme ± de la latencia en segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de respuestas 500")
+    parser.add_argument("--track-bytes", type=int, default=64 * 1024, help="tamaño del audio de cada track")
+    parser.add_argument("--only", default="", help="servicios a levantar, separados por comas (por defecto todos)")
+    parser.add_argument("--set", action="append", default=[], metavar="SERVICIO.clave=valor",
+                        help="ajuste por servicio, p. ej. TYA.latency=0.1 o PT.error_rate=0.2")
+    asyncio.run(serve(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+MICROBENCHMARKS DE LOS CONSTRUCTORES DE VISTAS (controller.viewmodels).
+
+Mide el coste de dar forma a los datos de `get_song`, `get_album` y `shop`
+sobre catálogos sintéticos de 10 a 100k elementos, sin red ni plantillas, y el
+de decodificar una respuesta de /song/list con `json` frente a los modelos
+tipados de `controller.models` y el de un filtro de la tienda resuelto con el
+índice local del catálogo (`controller.catalog`):
+
+    python -m bench.viewmodels --out base.json
+    python -m bench.viewmodels --baseline base.json --tolerance 1.3
+
+Con --baseline compara el mejor tiempo de cada caso con el guardado y termina
+con código 1 si alguno es más lento que tolerancia x base (regresión).
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from typing import List
+
+import msgspec
+
+import controller.catalog as catalog
+import controller.models as models
+import controller.upstream as upstream
+import controller.viewmodels as viewmodels
+
+TINY_PNG = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+
+
+def _artist(rng, artist_id: int, owner_albums=()) -> dict:
+    return {
+        "artistId": artist_id,
+        "artisticName": f"Artista {artist_id}",
+        "artisticBiography": "Biografía " * 5,
+        "artisticImage": TINY_PNG,
+        "owner_songs": [],
+        "owner_albums": list(owner_albums),
+        "owner_merch": [],
+    }
+
+
+def _song(rng, song_id: int, n_artists: int, n_genres: int, album_id=None, order=None) -> dict:
+    return {
+        "songId": song_id,
+        "title": f"Canción {song_id}",
+        "artistId": rng.randint(1, n_artists),
+        "collaborators": rng.sample(range(1, n_artists + 1), min(2, n_artists)),
+        "releaseDate": "2020-01-01",
+        "description": "Descripción " * 5,
+        "duration": rng.randint(90, 420),
+        "genres": rng.sample(range(1, n_genres + 1), min(3, n_genres)),
+        "cover": TINY_PNG,
+        "price": round(rng.uniform(0.99, 2.99), 2),
+        "albumId": album_id,
+        "albumOrder": order,
+        "trackId": song_id,
+        "linked_albums": [],
+    }
+
+
+def _album(rng, album_id: int, artist_id: int, song_ids: list, n_genres: int) -> dict:
+    return {
+        "albumId": album_id,
+        "title": f"Álbum {album_id}",
+        "artistId": artist_id,
+        "collaborators": [],
+        "description": "Descripción " * 5,
+        "releaseDate": "2020-01-01",
+        "genres": rng.sample(range(1, n_genres + 1), min(2, n_genres)),
+        "songs": song_ids,
+        "cover": TINY_PNG,
+        "price": "9.99",
+    }
+
+
+def _genres(n: int) -> list:
+    return [{"id": i, "name": f"Género {i}"} for i in range(1, n + 1)]
+
+
+# ===================== CASOS =====================
+# Cada caso recibe el tamaño y devuelve una función sin argumentos a medir
+
+def case_build_song(n: int):
+    """
+    Canción con n//10 colaboradores y álbumes enlazados sobre n géneros.
+    """
+    rng = random.Random(n)
+    related = max(1, n // 10)
+    all_genres = _genres(n)
+    artists = {i: _artist(rng, i) for i in range(1, related + 2)}
+    albums = {i: _album(rng, i, rng.randint(1, related + 1), [], n) for i in range(1, related + 2)}
+    song = _song(rng, 1, related + 1, n, album_id=1, order=1)
+    song["collaborators"] = list(range(2, related + 2))
+    song["linked_albums"] = list(range(2, related + 2))
+    song["genres"] = rng.sample(range(1, n + 1), min(n, 10))
+    return lambda: viewmodels.build_song(song, artists, all_genres, albums)
+
+
+def case_build_album(n: int):
+    """
+    Álbum de n canciones (desordenadas y algunas sin albumOrder) de n//10 artistas.
+    """
+    rng = random.Random(n)
+    n_artists = max(1, n // 10)
+    orders = list(range(1, n + 1))
+    rng.shuffle(orders)
+    songs = [_song(rng, i, n_artists, 12, album_id=1, order=orders[i - 1] if i % 10 else None) for i in range(1, n + 1)]
+    artists = {i: _artist(rng, i, owner_albums=range(1, 8)) for i in range(1, n_artists + 1)}
+    album = _album(rng, 1, 1, [s["songId"] for s in songs], 12)
+    related = msgspec.convert([_album(rng, i, 1, [], 12) for i in range(2, 8)], List[models.AlbumSummary], strict=False)
+    songs = msgspec.convert(songs, List[models.SongSummary], strict=False)
+    all_genres = _genres(12)
+    return lambda: viewmodels.build_album(album, artists, all_genres, songs, related)
+
+
+def case_shop_maps(n: int):
+    """
+    Mapas de la tienda con n artistas y n géneros.
+    """
+    rng = random.Random(n)
+    all_artists = msgspec.convert([_artist(rng, i) for i in range(1, n + 1)], List[models.ArtistSummary])
+    all_genres = msgspec.convert(_genres(n), List[models.Genre])
+    return lambda: viewmodels.shop_maps(all_artists, all_genres)
+
+
+def _song_list_body(n: int) -> bytes:
+    rng = random.Random(n)
+    return json.dumps([_song(rng, i, max(1, n // 10), 12) for i in range(1, n + 1)]).encode()
+
+
+def case_song_list_json(n: int):
+    """
+    Respuesta de /song/list con n canciones decodificada a diccionarios.
+    """
+    body = _song_list_body(n)
+    return lambda: json.loads(body)
+
+
+def case_song_list_models(n: int):
+    """
+    La misma respuesta decodificada a models.Song.
+    """
+    body = _song_list_body(n)
+    decoder = upstream._decoder(List[models.Song])
+    return lambda: decoder.decode(body)
+
+
+def _song_index(n: int):
+    rng = random.Random(n)
+    rows = {}
+    for i in range(1, n + 1):
+        song = _song(rng, i, max(1, n // 10), 12)
+        song["releaseDate"] = f"20{rng.randint(10, 24)}-{rng.randint(1, 12):02d}-01"
+        rows[i] = catalog._row("song", msgspec.convert(song, models.SongEntry, strict=False))
+    return catalog.Index(rows)
+
+
+def case_catalog_filter(n: int):
+    """
+    Página 2 de canciones de dos géneros ordenadas por nombre en un índice de n canciones.
+    """
+    index = _song_index(n)
+    return lambda: index.query({3, 7}, None, "name", "asc", 2)
+
+
+def case_catalog_facets(n: int):
+    """
+    Recuentos por género (con tres artistas marcados) y por artista (con dos
+    géneros marcados) en un índice de n canciones, sin la caché de `facets`.
+    """
+    index = _song_index(n)
+
+    def run():
+        index.genre_counts({1, 2, 3})
+        index.artist_counts({3, 7})
+    return run
+
+
+CASES = {
+    "build_song": case_build_song,
+    "build_album": case_build_album,
+    "shop_maps": case_shop_maps,
+    "song_list_json": case_song_list_json,
+    "song_list_models": case_song_list_models,
+    "catalog_filter": case_catalog_filter,
+    "catalog_facets": case_catalog_facets,
+}
+
+
+# ===================== MEDICIÓN =====================
+def measure(func, repeat: int, min_time: float) -> dict:
+    """
+    Ajusta el número de llamadas por medida para que dure al menos `min_time`
+    y repite la medida `repeat` veces. Devuelve tiempos por llamada.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 10 ** 6:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {"best": min(timings), "median": statistics.median(timings), "number": number}
+
+
+def run(cases: list, sizes: list, repeat: int, min_time: float) -> dict:
+    results = {}
+    for name in cases:
+        results[name] = {}
+        for size in sizes:
+            func = CASES[name](size)
+            results[name][str(size)] = measure(func, repeat, min_time)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Casos cuyo mejor tiempo supera tolerancia x el de la base.
+    """
+    regressions = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            base = baseline.get(name, {}).get(size)
+            if base and result["best"] > base["best"] * tolerance:
+                regressions.append((name, size, base["best"], result["best"]))
+    return regressions
+
+
+def _fmt(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.0f} ns"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks de los constructores de vistas del FND")
+    parser.add_argument("--cases", default=",".join(CASES), help="casos a medir, separados por comas")
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000", help="tamaños de catálogo")
+    parser.add_argument("--repeat", type=int, default=5, help="medidas por caso")
+    parser.add_argument("--min-time", type=float, default=0.05, help="segundos mínimos por medida")
+    parser.add_argument("--out", default="", help="fichero JSON donde guardar los resultados")
+    parser.add_argument("--baseline", default="", help="resultados previos con los que comparar")
+    parser.add_argument("--tolerance", type=float, default=1.3, help="factor de lentitud admitido frente a la base")
+    args = parser.parse_args(argv)
+
+    cases = args.cases.split(",")
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        raise SystemExit(f"Casos desconocidos: {', '.join(unknown)} (disponibles: {', '.join(CASES)})")
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    results = run(cases, sizes, args.repeat, args.min_time)
+    for name, by_size in results.items():
+        for size, r in by_size.items():
+            print(f"{name:<14}{size:>8}  mejor {_fmt(r['best'])}  mediana {_fmt(r['median'])}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, size, base, now in regressions:
+            print(f"REGRESIÓN {name} n={size}: {_fmt(base)} -> {_fmt(now)}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Control de admisión por clase de ruta.
+
+Con el FND saturado, cada tecla del buscador o cada página de la tienda de un
+anónimo compite igual que una compra o un login por los hilos del pool y por
+las conexiones a los microservicios. La middleware de admisión clasifica cada
+petición y le da un hueco de su clase:
+
+- critical: las escrituras de compra, métodos de pago, carrito, login,
+  registro y logout (POST /purchase, POST /cart, DELETE /cart/{id}...).
+- normal: el resto de páginas y endpoints, incluidas las lecturas de esas
+  mismas rutas (la página del carrito, /cart/summary, el sondeo de
+  GET /purchase/{id}), que no deben ocupar los huecos de las escrituras.
+- low: /api/search, /api/suggest y la tienda sin sesión.
+
+Cada clase tiene un máximo de peticiones en curso (LIMIT), una cola de
+espera (QUEUE) y un tiempo máximo en ella (TIMEOUT), de modo que las baratas
+no pueden ocupar los huecos de las críticas. Con la suma de los límites de
+normal y low por debajo del pool de hilos de las rutas síncronas (40 por
+defecto) siempre quedan hilos para las críticas. Además, mientras hay
+peticiones críticas esperando, las de clase low se rechazan sin encolarlas.
+
+Una petición sin hueco se rechaza pronto con 503 y Retry-After en lugar de
+esperar a que venza su timeout. Estáticos, sondas, métricas y /admin no pasan
+por el control. Los límites son por proceso (por worker de uvicorn).
+"""
+import asyncio
+import collections
+
+from fastapi.responses import JSONResponse
+
+import controller.metrics as metrics
+import controller.settings as settings
+
+CRITICAL, NORMAL, LOW = "critical", "normal", "low"
+
+# Rutas fuera del control de admisión
+EXEMPT_PREFIXES = ("/static", "/health", "/metrics", "/admin")
+# Rutas de clase critical solo para métodos que escriben
+CRITICAL_PREFIXES = ("/purchase", "/payment", "/cart", "/login", "/logout", "/register")
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+LOW_PREFIXES = ("/api/search", "/api/suggest")
+# Rutas de clase low solo para peticiones sin sesión
+ANONYMOUS_LOW_PREFIXES = ("/shop",)
+
+
+class Gate():
+    """
+    Huecos de una clase: como mucho `limit` peticiones en curso y `queue`
+    esperando, cada una un máximo de `timeout` segundos. Solo se usa desde el
+    event loop, así que no necesita locks.
+    """
+
+    __slots__ = ("name", "limit", "queue", "timeout", "active", "waiters")
+
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiters = collections.deque()
+
+    async def acquire(self) -> bool:
+        """
+        True si la petición consigue hueco; False si se rechaza.
+        """
+        if self.name == LOW and _gates[CRITICAL].waiters:
+            metrics.admission_rejected.inc(self.name, "priority")
+            return False
+        if self.active < self.limit and not self.waiters:
+            self._take()
+            return True
+        if len(self.waiters) >= self.queue:
+            metrics.admission_rejected.inc(self.name, "queue_full")
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        metrics.admission_queued.inc(self.name)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            # `release` pudo ceder el hueco justo al vencer el plazo
+            if waiter.done() and not waiter.cancelled():
+                return True
+            metrics.admission_rejected.inc(self.name, "timeout")
+            return False
+        except asyncio.CancelledError:
+            # El cliente se ha ido: si ya tenía hueco se devuelve
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            metrics.admission_queued.dec(self.name)
+            try:
+                self.waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def _take(self):
+        self.active += 1
+        metrics.admission_in_flight.inc(self.name)
+
+    def release(self):
+        # El hueco pasa al primero de la cola que siga esperando
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+        metrics.admission_in_flight.dec(self.name)
+
+
+_gates = {
+    CRITICAL: Gate(CRITICAL, settings.ADMISSION_CRITICAL_LIMIT, settings.ADMISSION_CRITICAL_QUEUE, settings.ADMISSION_CRITICAL_TIMEOUT),
+    NORMAL: Gate(NORMAL, settings.ADMISSION_NORMAL_LIMIT, settings.ADMISSION_NORMAL_QUEUE, settings.ADMISSION_NORMAL_TIMEOUT),
+    LOW: Gate(LOW, settings.ADMISSION_LOW_LIMIT, settings.ADMISSION_LOW_QUEUE, settings.ADMISSION_LOW_TIMEOUT),
+}
+
+
+def classify(method: str, path: str, has_session: bool):
+    """
+    Clase de la petición `method` a `path`, o None si no pasa por el control.
+    """
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    if method not in SAFE_METHODS and path.startswith(CRITICAL_PREFIXES):
+        return CRITICAL
+    if path.startswith(LOW_PREFIXES) or (not has_session and path.startswith(ANONYMOUS_LOW_PREFIXES)):
+        return LOW
+    return NORMAL
+
+
+def gate_for(request):
+    """
+    Gate de la clase de `request`, o None si el control está desactivado o la
+    ruta no pasa por él.
+    """
+    if not settings.ADMISSION_ENABLED:
+        return None
+    name = classify(request.method, request.url.path, "oversound_auth" in request.cookies)
+    return _gates[name] if name is not None else None
+
+
+def rejected() -> JSONResponse:
+    return JSONResponse(
+        content={"error": "Servicio saturado, inténtalo de nuevo en unos segundos"},
+        status_code=503,
+        headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+    )
+
+
+def status() -> dict:
+    return {name: {"active": gate.active, "limit": gate.limit, "queued": len(gate.waiters), "queue": gate.queue}
+            for name, gate in _gates.items()}
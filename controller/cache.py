@@ -0,0 +1,89 @@
+"""
+Cachés en memoria del FND.
+
+Todas las cachés se registran por nombre en `caches` para poder
+inspeccionarlas (tamaño, aciertos, fallos) desde otros módulos.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import controller.settings as settings
+
+caches = {}
+
+
+class TTLCache():
+    """
+    Caché LRU con caducidad por entrada, segura entre hilos.
+    Las rutas síncronas de FastAPI se ejecutan en un pool de hilos, por eso
+    todas las operaciones se protegen con un lock.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        caches[name] = self
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self) -> list:
+        """
+        Copia de las entradas (clave, valor) vigentes o no, sin alterar el orden LRU.
+        """
+        with self._lock:
+            return [(key, entry[1]) for key, entry in self._data.items()]
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Entidades de TYA (canciones, álbumes, artistas, merch y géneros)
+catalog = TTLCache("catalog", settings.CATALOG_CACHE_SIZE, settings.CATALOG_CACHE_TTL)
+# Listas top-10 de RYE (son globales, no dependen del usuario)
+top_lists = TTLCache("top_lists", 8, settings.TOP_LISTS_CACHE_TTL)
+# Productos de la tienda decodificados de /{kind}/list, por (tipo, id)
+listings = TTLCache("listings", settings.LISTINGS_CACHE_SIZE, settings.LISTINGS_CACHE_TTL)
+# Ids favoritos de cada usuario por tipo, por userId (ver `upstream.get_favorites`)
+favorites = TTLCache("favorites", settings.FAVORITES_CACHE_SIZE, settings.FAVORITES_CACHE_TTL)
+# Resumen del carrito de cada usuario, por userId (ver `controller.cart`)
+carts = TTLCache("carts", settings.CART_CACHE_SIZE, settings.CART_CACHE_TTL)
+# Audio ya decodificado desde PT
+audio = TTLCache("audio", settings.AUDIO_CACHE_SIZE, settings.AUDIO_CACHE_TTL)
@@ -0,0 +1,281 @@
+"""
+Resumen del carrito de cada usuario para el contador de la cabecera y las
+marcas de "En carrito" de las páginas de producto.
+
+El resumen guarda por producto ((tipo, id)) las unidades y el precio, y se
+cachea por usuario en `cache.carts`. Se construye con una sola llamada a
+GET /cart de TPP cuando no está en caché (o con el carrito que ya ha pedido la
+propia página del carrito) y después las rutas del FND lo mantienen al día sin
+volver a TPP:
+
+- `added`: tras añadir un producto; el precio sale del catálogo cacheado.
+- `removed`: tras quitarlo.
+- `emptied`: tras una compra, TPP vacía el carrito.
+
+Si un cambio no se puede aplicar con seguridad (precio desconocido, borrado
+ambiguo) se descarta el resumen y la siguiente consulta vuelve a TPP. Cada
+resumen es inmutable y se sustituye entero, como los índices del catálogo.
+
+`apply` ejecuta varias altas y bajas de POST /cart/bulk de una vez: TPP no
+tiene operaciones por lotes, así que se reparten entre CART_BULK_WORKERS
+hilos, manteniendo en orden las que tocan el mismo producto.
+"""
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import controller.cache as cache
+import controller.msvc_servers as servers
+import controller.settings as settings
+import controller.upstream as upstream
+
+logger = logging.getLogger(__name__)
+
+# Tipo de producto -> clave con sus ids en el resumen público
+SUMMARY_KEYS = {"song": "songs", "album": "albums", "merch": "merch"}
+
+# Operaciones de POST /cart/bulk
+OPERATIONS = ("add", "remove")
+
+# Valores del parámetro `type` de DELETE /cart/{productId} de TPP
+TYPE_ALIASES = {"song": "song", "0": "song", "album": "album", "1": "album", "merch": "merch", "2": "merch"}
+
+_lock = threading.Lock()
+
+
+def _product_key(product: dict):
+    # Un producto puede traer varios ids: el de merch o álbum decide el tipo.
+    # cart.js lee song_id, album_id y merch_id: se aceptan ambos nombres
+    for kind in ("merch", "album", "song"):
+        for field in (f"{kind}Id", f"{kind}_id"):
+            if product.get(field) is not None:
+                return kind, product[field]
+    return None
+
+
+def _price(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _units(value) -> int:
+    # TPP manda unidades null en canciones y álbumes
+    try:
+        return max(int(value or 1), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def parse_units(value):
+    """
+    Valida las `unidades` de un alta en el carrito: None (una) o un entero
+    positivo. Lanza ValueError si no lo son.
+    """
+    if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+        raise ValueError("`unidades` debe ser un entero positivo")
+    return value
+
+
+def refresh(user_id, products: list) -> dict:
+    """
+    Sustituye el resumen del usuario por el de `products` (respuesta de
+    GET /cart de TPP) y lo devuelve.
+    """
+    items = {}
+    for product in products or ():
+        key = _product_key(product) if isinstance(product, dict) else None
+        if key is not None:
+            items[key] = (_units(product.get("unidades")), _price(product.get("price")))
+    cache.carts.set(user_id, items)
+    return items
+
+
+def get(user_id, token: str, timeout: float = 5) -> dict:
+    """
+    {(tipo, id): (unidades, precio)} del carrito del usuario, pasando por la caché.
+    Lanza `requests.RequestException` si TPP no responde.
+    """
+    items = cache.carts.get(user_id)
+    if items is None:
+        headers = dict(upstream.JSON_HEADERS)
+        headers["Cookie"] = f"oversound_auth={token}"
+        resp = upstream.get(f"{servers.TPP}/cart", timeout=timeout, headers=headers, cache_status="miss")
+        resp.raise_for_status()
+        items = refresh(user_id, resp.json())
+    return items
+
+
+def summary(items: dict) -> dict:
+    """
+    Resumen público: número de productos distintos (`count`), unidades, total
+    y los ids de cada tipo.
+    """
+    result = {
+        "count": len(items),
+        "units": sum(units for units, _ in items.values()),
+        "total": round(sum((units * price for units, price in items.values()), 0.0), 2),
+    }
+    for kind, name in SUMMARY_KEYS.items():
+        result[name] = sorted(entity_id for key_kind, entity_id in items if key_kind == kind)
+    return result
+
+
+def contains(items, kind: str, entity_id: int):
+    # None si no se conoce el carrito
+    return None if items is None else (kind, entity_id) in items
+
+
+def added(user_id, body: dict):
+    """
+    Aplica al resumen cacheado un POST /cart aceptado por TPP con `body`.
+    El precio de un producto nuevo se pide fuera del lock para no bloquear
+    los carritos del resto de usuarios mientras responde TYA.
+    """
+    key = _product_key(body)
+    if key is None:
+        cache.carts.delete(user_id)
+        return
+    units = _units(body.get("unidades"))
+    items = cache.carts.get(user_id)
+    if items is None:
+        return
+    price = None
+    if key not in items:
+        try:
+            price = _price(upstream.get_entity(*key).get("price"))
+        except requests.RequestException as e:
+            logger.debug("Sin precio de %s %s para el resumen del carrito: %s", key[0], key[1], e)
+            cache.carts.delete(user_id)
+            return
+    with _lock:
+        # El resumen pudo cambiar mientras se pedía el precio
+        items = cache.carts.get(user_id)
+        if items is None:
+            return
+        if key in items:
+            price = items[key][1]
+            units += items[key][0]
+        elif price is None:
+            cache.carts.delete(user_id)
+            return
+        items = dict(items)
+        items[key] = (units, price)
+        cache.carts.set(user_id, items)
+
+
+def removed(user_id, product_id: int, type: str = None):
+    """
+    Aplica al resumen cacheado un DELETE /cart/{productId}?type= aceptado por TPP.
+    """
+    kind = TYPE_ALIASES.get(type)
+    with _lock:
+        items = cache.carts.get(user_id)
+        if items is None:
+            return
+        keys = [key for key in items if key[1] == product_id and (kind is None or key[0] == kind)]
+        if len(keys) != 1:
+            # Sin tipo y con el mismo id en varios tipos no se sabe cuál ha quitado TPP
+            cache.carts.delete(user_id)
+            return
+        items = dict(items)
+        del items[keys[0]]
+        cache.carts.set(user_id, items)
+
+
+def emptied(user_id):
+    """
+    Tras una compra TPP vacía el carrito.
+    """
+    cache.carts.set(user_id, {})
+
+
+def invalidate(user_id):
+    cache.carts.delete(user_id)
+
+
+def parse_operations(operations) -> list:
+    """
+    Valida las operaciones de POST /cart/bulk, una lista de
+    {"op": "add" | "remove", "type": "song" | "album" | "merch", "id": int,
+    "unidades": int (opcional, solo en altas)}. Devuelve [(op, tipo, id,
+    unidades)] o lanza ValueError con la primera operación no válida.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("Se esperaba una lista de operaciones")
+    if len(operations) > settings.CART_BULK_MAX:
+        raise ValueError(f"Como máximo {settings.CART_BULK_MAX} operaciones por petición")
+    parsed = []
+    for position, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise ValueError(f"Operación {position}: se esperaba un objeto")
+        op = operation.get("op")
+        kind = TYPE_ALIASES.get(str(operation.get("type")))
+        entity_id = operation.get("id")
+        units = operation.get("unidades")
+        if op not in OPERATIONS:
+            raise ValueError(f"Operación {position}: `op` debe ser add o remove")
+        if kind is None:
+            raise ValueError(f"Operación {position}: tipo de producto inválido")
+        if not isinstance(entity_id, int) or isinstance(entity_id, bool) or entity_id < 0:
+            raise ValueError(f"Operación {position}: `id` debe ser un entero")
+        try:
+            parse_units(units)
+        except ValueError as e:
+            raise ValueError(f"Operación {position}: {e}")
+        parsed.append((op, kind, entity_id, units))
+    return parsed
+
+
+_bulk_pool = ThreadPoolExecutor(max_workers=settings.CART_BULK_WORKERS, thread_name_prefix="fnd-cart")
+
+
+def _run(user_id, headers: dict, operation) -> dict:
+    op, kind, entity_id, units = operation
+    try:
+        if op == "add":
+            body = {f"{kind}Id": entity_id, "unidades": units, "userId": user_id}
+            resp = upstream.post(f"{servers.TPP}/cart", json=body, timeout=2, headers=headers)
+        else:
+            resp = upstream.delete(f"{servers.TPP}/cart/{entity_id}", params={"type": kind}, timeout=2, headers=headers)
+    except requests.RequestException as e:
+        logger.error("Error en la operación %s de %s %s del carrito: %s", op, kind, entity_id, e)
+        return {"status": 500, "error": "No se pudo contactar con la tienda"}
+    if not resp.ok:
+        return {"status": resp.status_code, "error": "La tienda rechazó la operación"}
+    if op == "add":
+        added(user_id, body)
+    else:
+        removed(user_id, entity_id, kind)
+    return {"status": resp.status_code}
+
+
+def _run_product(user_id, headers: dict, operations: list) -> list:
+    # Las operaciones de un mismo producto van en el orden pedido
+    return [(position, _run(user_id, headers, operation)) for position, operation in operations]
+
+
+def apply(user_id, token: str, operations: list) -> list:
+    """
+    Ejecuta en TPP las operaciones ya validadas por `parse_operations`, en
+    paralelo entre productos distintos, y actualiza el resumen del carrito.
+    Devuelve el resultado de cada operación en el mismo orden:
+    {"status": código de TPP} más "error" si ha fallado.
+    """
+    headers = dict(upstream.JSON_HEADERS)
+    headers["Cookie"] = f"oversound_auth={token}"
+    by_product = {}
+    for position, operation in enumerate(operations):
+        by_product.setdefault(operation[1:3], []).append((position, operation))
+    # Cada tarea lleva su copia del contexto para que sus llamadas queden en la traza de la petición
+    futures = [_bulk_pool.submit(contextvars.copy_context().run, _run_product, user_id, headers, group)
+               for group in by_product.values()]
+    results = [None] * len(operations)
+    for future in futures:
+        for position, result in future.result():
+            results[position] = result
+    return results
@@ -0,0 +1,653 @@
+"""
+Índice local del catálogo de TYA para los filtros de la tienda.
+
+`shop` filtra por géneros y artistas, ordena por fecha o nombre y pagina de 9 en
+9. En lugar de preguntar a TYA por cada combinación (/song/filter,
+/album/filter, /merch/filter, /artist/filter), el FND guarda por cada tipo de
+entidad un índice compacto:
+
+- ids: columna con los identificadores (la fila es la posición en el array).
+- by_genre / by_artist: listas de filas por género y por artista, y las
+  columnas inversas row_genres / row_artists.
+- orders: permutaciones de filas ya ordenadas por fecha y por nombre, en los
+  dos sentidos, y ranks: la posición de cada fila en cada permutación.
+- genre_bits: un mapa de bits de filas por género, y genre_flags: lo mismo
+  con un byte por fila y las filas agrupadas por artista (artist_spans da el
+  tramo de cada uno). Con ellos `facets` cuenta con operaciones sobre enteros
+  y bytes cuántos productos quedarían al marcar cada género o artista.
+
+Así filtrar, ordenar y paginar se resuelve en memoria y TYA solo se consulta
+para hidratar los elementos de la página visible (/list).
+
+Cada índice es inmutable y se sustituye entero al cambiar, de modo que las
+rutas lo leen sin bloqueos. Un hilo en segundo plano hace la carga inicial y
+luego lo mantiene al día de forma incremental: cada CATALOG_INDEX_REFRESH
+segundos compara los ids de TYA con los del índice y solo descarga las altas;
+las ediciones, altas y bajas hechas desde el FND se notifican con `changed()`
+y se aplican en cuanto el hilo las procesa. Las ediciones hechas directamente
+en TYA (nombre, precio, géneros) no cambian los ids, así que cada
+CATALOG_INDEX_FULL_RELOAD_EVERY comprobaciones se relee el catálogo entero.
+Mientras no hay índice, `filter` devuelve None y la ruta pregunta a TYA como
+antes.
+
+Los nombres de cada cambio se pasan también al índice de búsqueda
+(`controller.search`) y al trie de sugerencias (`controller.suggest`).
+"""
+import base64
+import bisect
+import itertools
+import logging
+import threading
+import time
+from array import array
+from typing import List
+
+import msgspec
+import requests
+
+import controller.metrics as metrics
+import controller.models as models
+import controller.msvc_servers as servers
+import controller.search as search
+import controller.settings as settings
+import controller.suggest as suggest
+import controller.upstream as upstream
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 9
+
+# Tipo -> (modelo decodificado, campo del id, campo de la fecha, campo del nombre)
+KINDS = {
+    "song": (models.SongEntry, "songId", "releaseDate", "title"),
+    "album": (models.AlbumEntry, "albumId", "releaseDate", "title"),
+    "merch": (models.MerchEntry, "merchId", "releaseDate", "title"),
+    "artist": (models.ArtistEntry, "artistId", "registrationDate", "artisticName"),
+}
+
+# Por debajo de esta fracción estimada de coincidencias se reúnen las filas de
+# las listas y se ordenan por rank; por encima se recorre la permutación
+# comprobando cada fila hasta completar la página
+_SORT_RATIO = 0.125
+
+# Criterio de orden -> columna de las filas
+_ORDER_COLUMNS = {"date": 0, "name": 1}
+
+# Selecciones distintas de la tienda cuyos recuentos se guardan
+FACETS_CACHE_SIZE = 256
+
+
+class Index():
+    """
+    Índice inmutable de un tipo de entidad.
+
+    `rows` es {id: (fecha, nombre, artistId, géneros)}; el resto se calcula a
+    partir de él. `has_genres` es False si TYA no envía géneros para el tipo
+    (merch): entonces los filtros por género se dejan a TYA y en los recuentos
+    sus filas no coinciden con ningún género.
+    """
+
+    __slots__ = ("rows", "ids", "by_genre", "by_artist", "row_genres", "row_artists", "genre_bits", "genre_flags",
+                 "artist_spans", "orders", "ranks", "has_genres", "built_at")
+
+    def __init__(self, rows: dict, has_genres: bool = True):
+        self.rows = rows
+        self.has_genres = has_genres
+        self.built_at = time.time()
+        ids = sorted(rows)
+        self.ids = array("q", ids)
+
+        by_genre, by_artist = {}, {}
+        self.row_genres = [frozenset(rows[entity_id][3]) for entity_id in ids]
+        self.row_artists = [rows[entity_id][2] for entity_id in ids]
+        for row, entity_id in enumerate(ids):
+            _, _, artist_id, genres = rows[entity_id]
+            for genre in genres:
+                by_genre.setdefault(genre, array("l")).append(row)
+            if artist_id is not None:
+                by_artist.setdefault(artist_id, array("l")).append(row)
+        self.by_genre = by_genre
+        self.by_artist = by_artist
+
+        self.genre_bits = {genre: _bitmap(rows_of_genre, len(ids)) for genre, rows_of_genre in by_genre.items()}
+        # Filas reordenadas por artista: el tramo de cada uno en los bytes de
+        # genre_flags se cuenta de una vez con bytes.count
+        self.artist_spans = {}
+        position = {}
+        for artist_id, artist_rows in by_artist.items():
+            start = len(position)
+            for row in artist_rows:
+                position[row] = len(position)
+            self.artist_spans[artist_id] = (start, len(position))
+        self.genre_flags = {}
+        for genre, genre_rows in by_genre.items():
+            flags = bytearray(len(position))
+            for row in genre_rows:
+                if row in position:
+                    flags[position[row]] = 1
+            self.genre_flags[genre] = int.from_bytes(flags, "little")
+
+        # Mismo criterio que TYA: texto del campo (vacío si falta) y, a igualdad,
+        # el orden de los ids, también en sentido descendente (ordenación estable)
+        self.orders = {}
+        self.ranks = {}
+        for order, column in _ORDER_COLUMNS.items():
+            keys = [rows[entity_id][column] for entity_id in ids]
+            for direction in ("asc", "desc"):
+                perm = sorted(range(len(ids)), key=keys.__getitem__, reverse=direction == "desc")
+                rank = array("l", [0]) * len(ids)
+                for position, row in enumerate(perm):
+                    rank[row] = position
+                self.orders[(order, direction)] = array("l", perm)
+                self.ranks[(order, direction)] = rank
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _postings(self, postings: dict, wanted) -> set:
+        rows = set()
+        for key in wanted:
+            rows.update(postings.get(key, ()))
+        return rows
+
+    def _estimate(self, postings: dict, wanted) -> int:
+        return sum(len(postings.get(key, ())) for key in wanted)
+
+    def query(self, genres=None, artists=None, order=None, direction=None, page=None, page_size: int = PAGE_SIZE,
+              after: int = 0) -> list:
+        """
+        Ids que cumplen los filtros (OR dentro de géneros y de artistas, AND
+        entre ambos), ordenados y paginados como /{kind}/filter de TYA. Con
+        `after` (de `position`) solo cuentan las filas desde esa posición del
+        orden, y `page` es relativa a ellas.
+        """
+        key = _order_key(order, direction)
+        start = (page - 1) * page_size if page else 0
+        stop = start + page_size if page else None
+
+        if not genres and not artists:
+            rows = self.orders[key] if key else range(len(self.ids))
+            return [self.ids[row] for row in rows[after + start:None if stop is None else after + stop]]
+
+        estimate = min(
+            self._estimate(self.by_genre, genres) if genres else len(self.ids),
+            self._estimate(self.by_artist, artists) if artists else len(self.ids),
+        )
+        if key is None or estimate < len(self.ids) * _SORT_RATIO:
+            match = self._postings(self.by_genre, genres) if genres else None
+            if artists:
+                artist_rows = self._postings(self.by_artist, artists)
+                match = artist_rows if match is None else match & artist_rows
+            rank = self.ranks[key].__getitem__ if key else int
+            rows = sorted(match, key=rank)
+            if after:
+                rows = rows[bisect.bisect_left(rows, after, key=rank):]
+            return [self.ids[row] for row in rows[start:stop]]
+
+        rows = []
+        row_genres, row_artists = self.row_genres, self.row_artists
+        for row in itertools.islice(self.orders[key], after, None):
+            if genres and genres.isdisjoint(row_genres[row]):
+                continue
+            if artists and row_artists[row] not in artists:
+                continue
+            rows.append(row)
+            if stop is not None and len(rows) >= stop:
+                break
+        return [self.ids[row] for row in rows[start:stop]]
+
+    def position(self, key, value, entity_id: int) -> int:
+        """
+        Posición en el orden `key` justo detrás de la fila (value, entity_id),
+        exista aún o no. El orden es el valor y, a igualdad, el id ascendente
+        en los dos sentidos; sin `key`, solo el id.
+        """
+        row = bisect.bisect_left(self.ids, entity_id)
+        if key is None:
+            return row + (row < len(self.ids) and self.ids[row] == entity_id)
+        column = _ORDER_COLUMNS[key[0]]
+        if row < len(self.ids) and self.ids[row] == entity_id and self.rows[entity_id][column] == value:
+            return self.ranks[key][row] + 1
+        # La fila ya no está o ha cambiado: se busca el hueco que ocupaba
+        wrap = _Descending if key[1] == "desc" else str
+        return bisect.bisect_right(self.orders[key], (wrap(value), entity_id),
+                                   key=lambda r: (wrap(self.rows[self.ids[r]][column]), self.ids[r]))
+
+    def genre_counts(self, artists=None) -> dict:
+        """
+        {género: filas con ese género} entre las de `artists` (todas si no hay).
+        """
+        if not artists:
+            return {genre: len(rows) for genre, rows in self.by_genre.items()}
+        selected = _bitmap(self._postings(self.by_artist, artists), len(self.ids))
+        return {genre: (bits & selected).bit_count() for genre, bits in self.genre_bits.items()}
+
+    def artist_counts(self, genres=None) -> dict:
+        """
+        {artista: filas de ese artista} con alguno de los `genres` (todas si no
+        hay).
+        """
+        if not genres:
+            return {artist_id: len(rows) for artist_id, rows in self.by_artist.items()}
+        flags = 0
+        for genre in genres:
+            flags |= self.genre_flags.get(genre, 0)
+        size = sum(len(rows) for rows in self.by_artist.values())
+        flags = flags.to_bytes(size, "little")
+        return {artist_id: flags.count(1, start, stop) for artist_id, (start, stop) in self.artist_spans.items()}
+
+
+class _Descending():
+    """
+    Envoltorio que invierte la comparación de un texto, para buscar con
+    bisect en los órdenes descendentes.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: str):
+        self.value = value
+
+    def __lt__(self, other) -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other) -> bool:
+        return self.value == other.value
+
+
+def _order_key(order, direction):
+    return (order, "desc" if direction == "desc" else "asc") if order in _ORDER_COLUMNS else None
+
+
+def _bitmap(rows, size: int) -> int:
+    """
+    Mapa de bits (entero) con un bit a 1 por cada fila de `rows`.
+    """
+    bits = bytearray((size + 7) // 8)
+    for row in rows:
+        bits[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(bits, "little")
+
+
+_indexes = {}
+_dirty = {kind: set() for kind in KINDS}
+_lock = threading.Lock()
+_wake = threading.Event()
+_stop = threading.Event()
+_thread = None
+_artist_summaries = (None, [])
+_facets_cache = (None, {})
+
+state = {
+    "enabled": settings.CATALOG_INDEX_ENABLED,
+    "loaded_at": None,
+    "refreshed_at": None,
+    "errors": 0,
+}
+
+
+def _int_list(value) -> set:
+    """
+    "1,2,3" -> {1, 2, 3}. Lanza ValueError si algún elemento no es un entero.
+    """
+    if value is None or value == "":
+        return set()
+    if isinstance(value, int):
+        return {value}
+    return {int(part) for part in str(value).split(",") if part.strip()}
+
+
+def filter(kind: str, params: dict):
+    """
+    Ids de /{kind}/filter calculados con el índice local a partir de los mismos
+    parámetros (genres, artists, order, direction, page). Devuelve None si el
+    índice no está cargado o la consulta debe resolverla TYA.
+    """
+    index = _indexes.get(kind)
+    if index is None:
+        return None
+    try:
+        genres = _int_list(params.get("genres"))
+        artists = _int_list(params.get("artists"))
+        page = int(params["page"]) if params.get("page") is not None else None
+    except ValueError:
+        return None
+    if (genres and not index.has_genres) or (page is not None and page < 1):
+        return None
+    metrics.catalog_queries.inc(kind)
+    return index.query(genres, artists, params.get("order"), params.get("direction"), page)
+
+
+def page(kind: str, params: dict, size: int, cursor: str = None):
+    """
+    Una página de `size` ids de `kind` con los filtros de /shop y el cursor de
+    la siguiente (None si no quedan más), o None si la consulta debe
+    resolverla TYA. Sin `cursor` se usa el número de página de `params`.
+
+    El cursor guarda el orden y la clave (valor, id) de la última fila: la
+    página siguiente empieza justo detrás de ella aunque entre medias haya
+    altas o bajas, sin saltarse ni repetir elementos como pasaría con un
+    desplazamiento. Un cursor mal formado o de otro orden lanza ValueError.
+    """
+    index = _indexes.get(kind)
+    if index is None:
+        return None
+    try:
+        genres = _int_list(params.get("genres"))
+        artists = _int_list(params.get("artists"))
+        number = int(params.get("page") or 1)
+    except ValueError:
+        return None
+    if (genres and not index.has_genres) or number < 1:
+        return None
+    order, direction = params.get("order"), params.get("direction")
+    key = _order_key(order, direction)
+    metrics.catalog_queries.inc(kind)
+    if cursor:
+        ids = index.query(genres, artists, order, direction, 1, size + 1, after=_cursor_position(index, key, cursor))
+        more = len(ids) > size
+        ids = ids[:size]
+    else:
+        ids = index.query(genres, artists, order, direction, number, size)
+        more = len(ids) == size
+    return ids, (_cursor(index, key, ids[-1]) if more and ids else None)
+
+
+def _cursor(index: Index, key, entity_id: int) -> str:
+    value = index.rows[entity_id][_ORDER_COLUMNS[key[0]]] if key else None
+    payload = msgspec.json.encode([key[0] if key else None, key[1] if key else None, value, entity_id])
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def _cursor_position(index: Index, key, cursor: str) -> int:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        order, direction, value, entity_id = msgspec.json.decode(payload)
+    except (ValueError, TypeError, msgspec.DecodeError):
+        raise ValueError("Cursor no válido")
+    if ((order, direction) if order else None) != key or not isinstance(entity_id, int):
+        raise ValueError("El cursor es de otro orden")
+    if key and not isinstance(value, str):
+        raise ValueError("Cursor no válido")
+    return index.position(key, value, entity_id)
+
+
+def artists_by_name() -> list:
+    """
+    Todos los artistas ordenados por nombre (como /artist/filter?order=name) en
+    forma de models.ArtistSummary, o None si el índice de artistas no está cargado.
+    """
+    global _artist_summaries
+    index = _indexes.get("artist")
+    if index is None:
+        return None
+    # La lista se construye una vez por versión del índice
+    built_for, summaries = _artist_summaries
+    if built_for is not index:
+        summaries = [
+            models.ArtistSummary(artistId=index.ids[row], artisticName=index.rows[index.ids[row]][1] or None)
+            for row in index.orders[("name", "asc")]
+        ]
+        _artist_summaries = (index, summaries)
+    return summaries
+
+
+def ids_by_artist(kind: str, artist_ids) -> list:
+    """
+    Ids de `kind` cuyo artista principal está en `artist_ids`.
+    """
+    index = _indexes.get(kind)
+    if index is None:
+        return []
+    return [index.ids[row] for artist_id in artist_ids for row in index.by_artist.get(artist_id, ())]
+
+
+def changed(kind: str, entity_id):
+    """
+    Marca una entidad creada, editada o borrada desde el FND para que el índice
+    la vuelva a leer de TYA. Un cambio de canciones afecta también a los géneros
+    de su artista, que se recalculan al aplicar el cambio.
+    """
+    if kind not in KINDS or entity_id is None or not state["enabled"]:
+        return
+    with _lock:
+        _dirty[kind].add(entity_id)
+    _wake.set()
+
+
+# ===================== CARGA DESDE TYA =====================
+def _fetch_ids(kind: str) -> set:
+    resp = upstream.get(f"{servers.TYA}/{kind}/filter", timeout=10, headers=upstream.JSON_HEADERS)
+    resp.raise_for_status()
+    return set(upstream.decode(resp, List[int]))
+
+
+def _fetch_entries(kind: str, ids) -> list:
+    model = KINDS[kind][0]
+    ids = sorted(ids)
+    entries = []
+    for i in range(0, len(ids), settings.CATALOG_INDEX_BATCH):
+        chunk = ids[i:i + settings.CATALOG_INDEX_BATCH]
+        resp = upstream.get(f"{servers.TYA}/{kind}/list", params={"ids": ",".join(map(str, chunk))},
+                            timeout=10, headers=upstream.JSON_HEADERS)
+        resp.raise_for_status()
+        entries.extend(upstream.decode(resp, List[model]))
+    return entries
+
+
+def _row(kind: str, entry) -> tuple:
+    _, _, date_field, name_field = KINDS[kind]
+    genres = tuple(getattr(entry, "genres", None) or ())
+    return (getattr(entry, date_field) or "", getattr(entry, name_field) or "", getattr(entry, "artistId", None), genres)
+
+
+def _artist_genres(song_rows: dict) -> dict:
+    """
+    Un artista pertenece a los géneros de sus canciones (como /artist/filter de TYA).
+    """
+    genres = {}
+    for _, _, artist_id, song_genres in song_rows.values():
+        if artist_id is not None:
+            genres.setdefault(artist_id, set()).update(song_genres)
+    return genres
+
+
+def facets(genres, artists, genre_ids, artist_ids):
+    """
+    Recuentos de la tienda para la selección actual (`genres` y `artists` como
+    en /shop): {"genres": {id: (canciones, álbumes, merch)}, "artists": {id:
+    (...)}} para los ids de `genre_ids` y `artist_ids`. Un género cuenta los
+    productos que quedarían al marcarlo con los artistas ya marcados, y un
+    artista los que quedarían con los géneros ya marcados (dentro de cada filtro
+    es un OR). El esquema de TYA no da géneros al merch, así que en los
+    recuentos no coincide con ninguno. Devuelve None si el índice no está
+    cargado o los parámetros no son válidos.
+    """
+    global _facets_cache
+    indexes = tuple(_indexes.get(kind) for kind in ("song", "album", "merch"))
+    if None in indexes:
+        return None
+    try:
+        genres = frozenset(_int_list(genres))
+        artists = frozenset(_int_list(artists))
+    except ValueError:
+        return None
+
+    # Los recuentos se guardan por versión de los índices: la paginación y el
+    # cambio de orden repiten la misma selección
+    built_for, cache = _facets_cache
+    if built_for != indexes:
+        cache = {}
+        _facets_cache = (indexes, cache)
+    counts = cache.get((genres, artists))
+    if counts is None:
+        counts = ([index.genre_counts(artists) for index in indexes], [index.artist_counts(genres) for index in indexes])
+        if len(cache) >= FACETS_CACHE_SIZE:
+            cache.clear()
+        cache[(genres, artists)] = counts
+    by_genre, by_artist = counts
+    return {
+        "genres": {genre: tuple(c.get(genre, 0) for c in by_genre) for genre in genre_ids},
+        "artists": {artist_id: tuple(c.get(artist_id, 0) for c in by_artist) for artist_id in artist_ids},
+    }
+
+
+def _publish(kind: str, rows: dict, touched=None):
+    """
+    Sustituye el índice de `kind` y pasa al índice de búsqueda los nombres de
+    los ids de `touched` (todos si es None).
+    """
+    if kind == "artist":
+        song_index = _indexes.get("song")
+        by_artist = _artist_genres(song_index.rows) if song_index else {}
+        # El filtro por artistas de /artist/filter usa el propio id del artista
+        rows = {aid: (date, name, aid, tuple(sorted(by_artist.get(aid, ())))) for aid, (date, name, _, _) in rows.items()}
+    _indexes[kind] = Index(rows, has_genres=kind != "merch")
+    metrics.catalog_entities.set(kind, value=len(rows))
+    if touched is None:
+        search.sync(kind, {entity_id: row[1] for entity_id, row in rows.items()})
+    elif touched:
+        search.sync(kind, {entity_id: rows[entity_id][1] for entity_id in touched if entity_id in rows}, touched)
+
+
+def _merge(kind: str, rows: dict, remove, entries):
+    id_field = KINDS[kind][1]
+    rows = {entity_id: row for entity_id, row in rows.items() if entity_id not in remove}
+    for entry in entries:
+        entity_id = getattr(entry, id_field)
+        if entity_id is not None:
+            rows[entity_id] = _row(kind, entry)
+    return rows
+
+
+def load():
+    """
+    Carga completa, al arrancar y cada CATALOG_INDEX_FULL_RELOAD_EVERY
+    comprobaciones. Las canciones van antes que los artistas porque los
+    géneros de un artista salen de sus canciones.
+    """
+    for kind in ("song", "album", "merch", "artist"):
+        _publish(kind, _merge(kind, {}, (), _fetch_entries(kind, _fetch_ids(kind))))
+    state["loaded_at"] = state["refreshed_at"] = time.time()
+    logger.info("Índice del catálogo cargado", extra={kind: len(index) for kind, index in _indexes.items()})
+
+
+def refresh():
+    """
+    Comparación de ids con TYA: descarga solo las altas y quita las bajas.
+    """
+    for kind in ("song", "album", "merch", "artist"):
+        index = _indexes.get(kind)
+        remote = _fetch_ids(kind)
+        local = index.rows.keys()
+        added = remote - local
+        removed = local - remote
+        if added or removed or (kind == "artist" and _song_genres_changed()):
+            _publish(kind, _merge(kind, index.rows, removed, _fetch_entries(kind, added)), added | removed)
+    state["refreshed_at"] = time.time()
+
+
+def _song_genres_changed() -> bool:
+    # Los géneros de los artistas dependen de las canciones: si el índice de
+    # canciones es más reciente que el de artistas hay que recalcularlos
+    return _indexes["song"].built_at > _indexes["artist"].built_at
+
+
+def apply_changes():
+    """
+    Vuelve a leer de TYA las entidades marcadas con `changed()`: las que ya no
+    devuelve /list se quitan del índice. Devuelve si había alguna.
+    """
+    with _lock:
+        pending = {kind: ids for kind, ids in _dirty.items() if ids}
+        for kind in pending:
+            _dirty[kind] = set()
+    for kind in ("song", "album", "merch", "artist"):
+        if kind not in pending and not (kind == "artist" and "song" in pending):
+            continue
+        ids = pending.get(kind, set())
+        entries = _fetch_entries(kind, ids) if ids else []
+        found = {getattr(entry, KINDS[kind][1]) for entry in entries}
+        _publish(kind, _merge(kind, _indexes[kind].rows, ids - found, entries), ids)
+    return bool(pending)
+
+
+def _rebuild_suggest():
+    suggest.rebuild({kind: {entity_id: (row[1], row[2]) for entity_id, row in index.rows.items()}
+                     for kind, index in _indexes.items()})
+
+
+def _run():
+    while not _stop.is_set():
+        try:
+            load()
+            _rebuild_suggest()
+            break
+        except requests.RequestException as e:
+            state["errors"] += 1
+            logger.warning("No se pudo cargar el índice del catálogo: %s", e)
+        except Exception:
+            state["errors"] += 1
+            logger.exception("Error inesperado cargando el índice del catálogo")
+        if _stop.wait(settings.CATALOG_INDEX_REFRESH):
+            return
+
+    next_refresh = time.monotonic() + settings.CATALOG_INDEX_REFRESH
+    refreshes = 0
+    while not _stop.is_set():
+        _wake.wait(max(0.0, next_refresh - time.monotonic()))
+        _wake.clear()
+        if _stop.is_set():
+            return
+        try:
+            changed = apply_changes()
+            if time.monotonic() >= next_refresh:
+                refreshes += 1
+                every = settings.CATALOG_INDEX_FULL_RELOAD_EVERY
+                if every > 0 and refreshes % every == 0:
+                    load()
+                else:
+                    refresh()
+                next_refresh = time.monotonic() + settings.CATALOG_INDEX_REFRESH
+                changed = True
+            if changed:
+                _rebuild_suggest()
+        except requests.RequestException as e:
+            state["errors"] += 1
+            logger.warning("No se pudo actualizar el índice del catálogo: %s", e)
+            next_refresh = time.monotonic() + settings.CATALOG_INDEX_REFRESH
+        except Exception:
+            # Cualquier otro error no debe parar el hilo: el índice se quedaría congelado
+            state["errors"] += 1
+            logger.exception("Error inesperado actualizando el índice del catálogo")
+            next_refresh = time.monotonic() + settings.CATALOG_INDEX_REFRESH
+
+
+def start():
+    """
+    Lanza la carga y el mantenimiento del índice en un hilo en segundo plano.
+    """
+    global _thread
+    if not state["enabled"] or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="fnd-catalog-index", daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread
+    _stop.set()
+    _wake.set()
+    _thread = None
+
+
+def status() -> dict:
+    return {
+        "enabled": state["enabled"],
+        "loaded": state["loaded_at"] is not None,
+        "loaded_at": state["loaded_at"],
+        "refreshed_at": state["refreshed_at"],
+        "errors": state["errors"],
+        "entities": {kind: len(index) for kind, index in _indexes.items()},
+    }
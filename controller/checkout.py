@@ -0,0 +1,211 @@
+"""
+Compras asíncronas para POST /purchase.
+
+La ruta ya no espera a TPP: valida la sesión, encola la compra y responde al
+momento con el id del pedido (checkoutId). Un pool de CHECKOUT_WORKERS hilos
+hace las llamadas a POST /purchase de TPP, de modo que por muy lento que vaya
+el pago nunca hay más de CHECKOUT_WORKERS compras en curso contra TPP ni
+ningún hilo de las rutas esperándolas. El navegador consulta el estado en
+GET /purchase/{checkoutId} hasta que el pedido termina.
+
+Cada compra lleva una clave de idempotencia obligatoria (cabecera
+Idempotency-Key). Si el mismo usuario repite la clave (doble clic, reintento
+tras un timeout) se devuelve el pedido que ya existe en lugar de crear otro,
+así que TPP solo recibe un cobro. Repetir la clave con otro cuerpo es un
+error.
+
+Pedidos y claves se guardan en diccionarios propios y no en una caché LRU:
+un pedido sin terminar nunca se descarta. Los terminados se recuerdan
+CHECKOUT_TTL segundos y, si pasan de CHECKOUT_JOBS_SIZE, se olvidan antes
+los más antiguos en done o failed; los unknown aguantan todo el plazo.
+
+Estados de un pedido: pending (en cola), processing (llamando a TPP), done
+(con el purchaseId de TPP), failed (TPP la ha rechazado, con el motivo) y
+unknown (timeout, error de conexión o 5xx: no se sabe si TPP llegó a
+cobrarla). Una compra en unknown no se reintenta sola y su clave sigue
+apuntando a ella, de modo que reintentar con la misma clave nunca cobra dos
+veces.
+"""
+import collections
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import controller.cart as cart
+import controller.msvc_servers as servers
+import controller.settings as settings
+import controller.upstream as upstream
+
+logger = logging.getLogger(__name__)
+
+PENDING, PROCESSING, DONE, FAILED, UNKNOWN = "pending", "processing", "done", "failed", "unknown"
+
+
+class QueueFull(Exception):
+    """
+    Hay CHECKOUT_QUEUE_MAX compras esperando: la ruta responde 503.
+    """
+
+
+class Job():
+    """
+    Una compra encolada. El token de sesión solo se guarda hasta llamar a TPP.
+    """
+
+    __slots__ = ("id", "user_id", "key", "fingerprint", "body", "token", "status", "purchase_id", "error", "created",
+                 "finished")
+
+    def __init__(self, user_id, key: str, fingerprint: str, body: dict, token: str):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.key = key
+        self.fingerprint = fingerprint
+        self.body = body
+        self.token = token
+        self.status = PENDING
+        self.purchase_id = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    def to_dict(self) -> dict:
+        return {
+            "checkoutId": self.id,
+            "status": self.status,
+            "purchaseId": self.purchase_id,
+            "error": self.error,
+        }
+
+
+_pool = ThreadPoolExecutor(max_workers=settings.CHECKOUT_WORKERS, thread_name_prefix="fnd-checkout")
+_lock = threading.Lock()
+_queued = 0
+_in_flight = 0
+# id -> pedido, (userId, clave) -> id y, por orden de terminación, id -> instante (monotonic)
+_jobs = {}
+_keys = {}
+_finished = collections.OrderedDict()
+
+
+def _json_object(resp) -> dict:
+    # TPP puede responder sin cuerpo o con algo que no es un objeto
+    try:
+        data = resp.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _fingerprint(body: dict) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _forget(job_id: str):
+    job = _jobs.pop(job_id)
+    _finished.pop(job_id, None)
+    _keys.pop((job.user_id, job.key), None)
+
+
+def _prune():
+    # Solo se olvidan pedidos terminados; se llama con `_lock` tomado
+    now = time.monotonic()
+    while _finished:
+        job_id, finished = next(iter(_finished.items()))
+        if now - finished < settings.CHECKOUT_TTL:
+            break
+        _forget(job_id)
+    extra = len(_finished) - settings.CHECKOUT_JOBS_SIZE
+    if extra > 0:
+        for job_id in [job_id for job_id in _finished if _jobs[job_id].status != UNKNOWN][:extra]:
+            _forget(job_id)
+
+
+def submit(user_id, token: str, body: dict, key: str):
+    """
+    Encola la compra `body` del usuario con la clave de idempotencia `key`.
+    Devuelve (pedido, nuevo): con una `key` ya usada por el usuario devuelve
+    su pedido y nuevo=False. Lanza ValueError si la clave se usó con otro
+    cuerpo y QueueFull si la cola está llena.
+    """
+    global _queued
+    fingerprint = _fingerprint(body)
+    with _lock:
+        _prune()
+        job = _jobs.get(_keys.get((user_id, key)))
+        if job is not None:
+            if job.fingerprint != fingerprint:
+                raise ValueError("La clave de idempotencia ya se usó con otra compra")
+            return job, False
+        if _queued >= settings.CHECKOUT_QUEUE_MAX:
+            raise QueueFull()
+        job = Job(user_id, key, fingerprint, body, token)
+        _jobs[job.id] = job
+        _keys[(user_id, key)] = job.id
+        _queued += 1
+    _pool.submit(_run, job)
+    return job, True
+
+
+def get(user_id, checkout_id: str):
+    """
+    El pedido `checkout_id` si existe y es del usuario; si no, None.
+    """
+    job = _jobs.get(checkout_id)
+    if job is None or job.user_id != user_id:
+        return None
+    return job
+
+
+def _run(job: Job):
+    global _queued, _in_flight
+    with _lock:
+        _queued -= 1
+        _in_flight += 1
+    job.status = PROCESSING
+    try:
+        resp = upstream.post(
+            f"{servers.TPP}/purchase",
+            json=job.body,
+            timeout=settings.CHECKOUT_TIMEOUT,
+            headers={"Accept": "application/json", "Cookie": f"oversound_auth={job.token}"}
+        )
+        if resp.ok:
+            job.status = DONE
+            cart.emptied(job.user_id)
+            job.purchase_id = _json_object(resp).get("purchaseId")
+        elif resp.status_code >= 500:
+            logger.error("TPP respondió %s a la compra %s", resp.status_code, job.id)
+            _unknown(job)
+        else:
+            job.error = _json_object(resp).get("message") or "No se pudo procesar la compra"
+            job.status = FAILED
+    except requests.RequestException as e:
+        logger.error("Error procesando la compra %s: %s", job.id, e)
+        _unknown(job)
+    except Exception:
+        logger.exception("Error inesperado procesando la compra %s", job.id)
+        if job.status != DONE:
+            _unknown(job)
+    finally:
+        job.token = None
+        job.finished = time.time()
+        with _lock:
+            _in_flight -= 1
+            _finished[job.id] = time.monotonic()
+
+
+def _unknown(job: Job):
+    # TPP puede haber cobrado: el carrito se vuelve a pedir y la clave se conserva
+    cart.invalidate(job.user_id)
+    job.error = "No se pudo confirmar la compra; revisa tus pedidos antes de volver a intentarlo"
+    job.status = UNKNOWN
+
+
+def status() -> dict:
+    return {"queued": _queued, "in_flight": _in_flight, "workers": settings.CHECKOUT_WORKERS, "jobs": len(_jobs)}
@@ -0,0 +1,170 @@
+"""
+Inyección de latencia y fallos en las llamadas a microservicios.
+
+Solo se activa por configuración (FND_FAULTS) para pruebas de resiliencia con
+`bench.load`: permite ver cómo se degradan `index`, `shop` o `get_song` cuando
+TYA, RYE o PT van lentos o fallan. Cada regla se aplica a un servicio o a un
+endpoint concreto (con la misma plantilla que las métricas) y la del endpoint
+tiene prioridad:
+
+    FND_FAULTS="TYA:delay=lognormal(0.05,0.8),error_rate=0.1;RYE/statistics/top-10-songs:delay=fixed(3);PT:truncate=0.2,reset=0.05"
+
+Claves de cada regla:
+
+- delay: distribución del retardo añadido, en segundos: fixed(s), uniform(a,b),
+  normal(media,desviación), exp(media) o lognormal(mediana,sigma). Si el retardo
+  supera el timeout de la llamada se espera el timeout y se lanza ReadTimeout,
+  como haría `requests`.
+- delay_rate: fracción de llamadas a las que se aplica el retardo (1 por defecto).
+- error_rate / error_status: fracción de llamadas que responden con error_status
+  (503 por defecto) sin llegar al microservicio.
+- reset: fracción de llamadas que fallan con un ConnectionError (conexión reiniciada).
+- truncate / truncate_ratio: fracción de respuestas cuyo cuerpo se corta a
+  truncate_ratio (0.5 por defecto) de su longitud.
+"""
+import json
+import logging
+import math
+import random
+import re
+import time
+
+import requests
+
+import controller.metrics as metrics
+import controller.settings as settings
+
+logger = logging.getLogger(__name__)
+
+_rng = random.Random(settings.FAULTS_SEED or None)
+
+_DISTRIBUTIONS = {
+    "fixed": (1, lambda s: s),
+    "uniform": (2, lambda a, b: _rng.uniform(a, b)),
+    "normal": (2, lambda mu, sigma: max(0.0, _rng.gauss(mu, sigma))),
+    "exp": (1, lambda mean: _rng.expovariate(1 / mean) if mean > 0 else 0.0),
+    "lognormal": (2, lambda median, sigma: _rng.lognormvariate(math.log(median), sigma)),
+}
+
+_FLOAT_KEYS = ("delay_rate", "error_rate", "reset", "truncate", "truncate_ratio")
+
+
+class Rule():
+    """
+    Fallos configurados para un servicio o endpoint.
+    """
+
+    __slots__ = ("delay", "delay_rate", "error_rate", "error_status", "reset", "truncate", "truncate_ratio")
+
+    def __init__(self):
+        self.delay = None
+        self.delay_rate = 1.0
+        self.error_rate = 0.0
+        self.error_status = 503
+        self.reset = 0.0
+        self.truncate = 0.0
+        self.truncate_ratio = 0.5
+
+    def sample_delay(self) -> float:
+        if self.delay is None or _rng.random() >= self.delay_rate:
+            return 0.0
+        func, args = self.delay
+        return func(*args)
+
+
+def _parse_delay(value: str):
+    match = re.fullmatch(r"(\w+)\(([^)]*)\)", value.strip())
+    if not match or match[1] not in _DISTRIBUTIONS:
+        raise ValueError(f"Distribución de retardo no válida: {value}")
+    arity, func = _DISTRIBUTIONS[match[1]]
+    args = tuple(float(a) for a in match[2].split(",") if a.strip())
+    if len(args) != arity:
+        raise ValueError(f"{match[1]} necesita {arity} parámetros: {value}")
+    return func, args
+
+
+def parse(spec: str) -> dict:
+    """
+    Convierte FND_FAULTS en {"SERVICIO" o "SERVICIO/endpoint": Rule}.
+    """
+    rules = {}
+    for item in filter(None, (part.strip() for part in spec.split(";"))):
+        target, sep, options = item.partition(":")
+        if not sep:
+            raise ValueError(f"Regla de fallos sin opciones: {item}")
+        rule = Rule()
+        # Las comas separan opciones salvo dentro de los paréntesis de delay
+        for option in re.split(r",(?![^(]*\))", options):
+            key, _, value = option.partition("=")
+            key = key.strip()
+            if key == "delay":
+                rule.delay = _parse_delay(value)
+            elif key == "error_status":
+                rule.error_status = int(value)
+            elif key in _FLOAT_KEYS:
+                setattr(rule, key, float(value))
+            else:
+                raise ValueError(f"Opción de fallos desconocida: {key}")
+        rules[target.strip()] = rule
+    return rules
+
+
+rules = parse(settings.FAULTS)
+
+
+def enabled() -> bool:
+    return bool(rules)
+
+
+def _match(service: str, endpoint: str):
+    return rules.get(f"{service}{endpoint}") or rules.get(service)
+
+
+def _read_timeout(timeout):
+    if isinstance(timeout, tuple):
+        return timeout[1]
+    return timeout
+
+
+def _error_response(method: str, url: str, status: int) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.reason = "Injected Fault"
+    resp.url = url
+    resp.headers["Content-Type"] = "application/json"
+    resp._content = json.dumps({"error": "Fallo inyectado por FND_FAULTS"}).encode()
+    resp.request = requests.Request(method, url).prepare()
+    return resp
+
+
+def send(service: str, endpoint: str, method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Hace la llamada con `requests.request` aplicando la regla que corresponda.
+    """
+    rule = _match(service, endpoint)
+    if rule is None:
+        return requests.request(method, url, **kwargs)
+
+    delay = rule.sample_delay()
+    if delay:
+        timeout = _read_timeout(kwargs.get("timeout"))
+        if timeout is not None and delay >= timeout:
+            time.sleep(timeout)
+            metrics.upstream_faults.inc(service, "timeout")
+            raise requests.ReadTimeout(f"Timeout inyectado tras {timeout}s ({url})")
+        metrics.upstream_faults.inc(service, "delay")
+        time.sleep(delay)
+
+    if rule.reset and _rng.random() < rule.reset:
+        metrics.upstream_faults.inc(service, "reset")
+        raise requests.ConnectionError(f"Conexión reiniciada (inyectado) ({url})")
+
+    if rule.error_rate and _rng.random() < rule.error_rate:
+        metrics.upstream_faults.inc(service, "error")
+        return _error_response(method, url, rule.error_status)
+
+    resp = requests.request(method, url, **kwargs)
+    if rule.truncate and _rng.random() < rule.truncate:
+        metrics.upstream_faults.inc(service, "truncate")
+        resp._content = resp.content[:int(len(resp.content) * rule.truncate_ratio)]
+    return resp
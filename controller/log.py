@@ -0,0 +1,122 @@
+"""
+Configuración del logging del FND.
+
+- Registros en JSON (una línea por evento) con los campos pasados en `extra`.
+- Las rutas solo encolan el registro (QueueHandler); un hilo aparte
+  (QueueListener) hace el formateo JSON y la escritura, fuera del hilo de la petición.
+- Nivel por módulo configurable con FND_LOG_LEVELS ("controller.upstream=DEBUG,...").
+- Los eventos DEBUG se muestrean con FND_LOG_DEBUG_SAMPLE_RATE para que activar
+  el nivel DEBUG no penalice el rendimiento con mucho tráfico.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+import controller.settings as settings
+
+ROOT_LOGGER = "controller"
+
+# Atributos propios de LogRecord, el resto provienen de `extra`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatea cada registro como un objeto JSON en una sola línea.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Encola el registro sin formatearlo: solo resuelve el mensaje y la traza de
+    la excepción (que no se pueden serializar más tarde) y deja el JSON al hilo
+    del listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class DebugSampler(logging.Filter):
+    """
+    Deja pasar solo una fracción de los eventos DEBUG. El resto de niveles pasan siempre.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup():
+    """
+    Instala el QueueHandler en el logger raíz del FND y arranca el hilo escritor.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers[:] = [handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    root.propagate = False
+    for name, level in _parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown():
+    """
+    Vacía la cola y detiene el hilo escritor.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
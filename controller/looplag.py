@@ -0,0 +1,104 @@
+"""
+Monitor del retardo del event loop.
+
+Varias rutas `async def` llaman a `requests` de forma bloqueante y congelan todas
+las peticiones concurrentes del worker. Este módulo:
+
+- mide con una corrutina periódica cuánto se retrasa el loop al planificarla
+  (histograma fnd_event_loop_lag_seconds);
+- vigila desde un hilo aparte el último latido de esa corrutina y, si el loop
+  lleva más de FND_LOOP_LAG_THRESHOLD segundos sin responder, captura la pila
+  del hilo del loop, identifica la ruta que lo está bloqueando y lo registra.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+import controller.metrics as metrics
+import controller.settings as settings
+
+logger = logging.getLogger(__name__)
+
+_state = {
+    "heartbeat": None,
+    "loop_thread": None,
+    "task": None,
+    "stop": None,
+    "routes": {},
+}
+
+
+def _route_for_stack(frame) -> str:
+    """
+    Recorre la pila desde el frame más interno y devuelve la ruta cuyo
+    endpoint aparece en ella.
+    """
+    routes = _state["routes"]
+    while frame is not None:
+        path = routes.get(frame.f_code)
+        if path is not None:
+            return path
+        frame = frame.f_back
+    return "unknown"
+
+
+async def _heartbeat():
+    interval = settings.LOOP_LAG_INTERVAL
+    while True:
+        expected = time.monotonic() + interval
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        _state["heartbeat"] = now
+        metrics.loop_lag.observe(value=max(0.0, now - expected))
+
+
+def _watchdog(stop: threading.Event):
+    reported = None
+    while not stop.wait(settings.LOOP_LAG_INTERVAL):
+        heartbeat = _state["heartbeat"]
+        if heartbeat is None:
+            continue
+        stalled = time.monotonic() - heartbeat
+        if stalled < settings.LOOP_LAG_THRESHOLD or reported == heartbeat:
+            continue
+        # Un solo aviso por bloqueo: hasta que llegue un latido nuevo no se repite
+        reported = heartbeat
+        frame = sys._current_frames().get(_state["loop_thread"])
+        if frame is None:
+            continue
+        route = _route_for_stack(frame)
+        metrics.loop_blocked.inc(route)
+        logger.warning(
+            "Event loop bloqueado",
+            extra={"route": route, "stalled": round(stalled, 3), "stack": "".join(traceback.format_stack(frame))},
+        )
+
+
+def start(app):
+    """
+    Arranca la corrutina de latido y el hilo vigilante. Debe llamarse desde el event loop.
+    """
+    if not settings.LOOP_LAG_ENABLED or _state["task"] is not None:
+        return
+    _state["routes"] = {
+        route.endpoint.__code__: route.path
+        for route in app.routes
+        if hasattr(getattr(route, "endpoint", None), "__code__")
+    }
+    _state["loop_thread"] = threading.get_ident()
+    _state["heartbeat"] = time.monotonic()
+    _state["task"] = asyncio.get_running_loop().create_task(_heartbeat())
+    _state["stop"] = threading.Event()
+    threading.Thread(target=_watchdog, args=(_state["stop"],), name="fnd-looplag", daemon=True).start()
+
+
+def stop():
+    if _state["task"] is None:
+        return
+    _state["task"].cancel()
+    _state["stop"].set()
+    _state["task"] = None
+    _state["heartbeat"] = None
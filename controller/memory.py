@@ -0,0 +1,185 @@
+"""
+Instrumentación de memoria del FND.
+
+- Instantáneas de tracemalloc bajo demanda, los puntos del código que más
+  memoria retienen y la diferencia entre dos instantáneas (para detectar fugas
+  en workers de larga duración).
+- Tamaño aproximado en bytes de cada caché registrada en `controller.cache`,
+  recorriendo recursivamente sus claves y valores.
+
+tracemalloc tiene un coste apreciable, así que solo se activa al arrancar si
+FND_MEMORY_TRACEMALLOC=1 o cuando lo pide un administrador.
+"""
+import os
+import sys
+import threading
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import controller.cache as cache
+import controller.settings as settings
+
+_snapshots = OrderedDict()
+_lock = threading.Lock()
+
+# Asignaciones propias de tracemalloc e importlib que no interesan
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def start(frames: int = None):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames or settings.MEMORY_TRACE_FRAMES)
+
+
+def is_tracing() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def stop():
+    """
+    Detiene tracemalloc y descarta las instantáneas, que ya no se pueden comparar.
+    """
+    tracemalloc.stop()
+    with _lock:
+        _snapshots.clear()
+
+
+def rss() -> int:
+    """
+    Memoria residente del proceso en bytes (None si no se puede leer).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Tipo -> nombres de sus atributos sin __dict__ (__slots__ y campos de msgspec.Struct)
+_slot_names = {}
+
+
+def _slots(cls) -> tuple:
+    names = _slot_names.get(cls)
+    if names is None:
+        names = set(getattr(cls, "__struct_fields__", ()))
+        for klass in cls.__mro__:
+            slots = klass.__dict__.get("__slots__", ())
+            names.update((slots,) if isinstance(slots, str) else slots)
+        names.discard("__dict__")
+        names.discard("__weakref__")
+        names = _slot_names[cls] = tuple(names)
+    return names
+
+
+def deep_size(obj, seen: set = None) -> int:
+    """
+    Tamaño aproximado de un objeto y de todo lo que contiene, también los
+    atributos de objetos con __slots__ y de los msgspec.Struct.
+    """
+    if seen is None:
+        seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        else:
+            if hasattr(item, "__dict__"):
+                stack.append(item.__dict__)
+            for name in _slots(type(item)):
+                value = getattr(item, name, None)
+                if value is not None:
+                    stack.append(value)
+    return size
+
+
+def cache_sizes() -> dict:
+    sizes = {}
+    for name, c in cache.caches.items():
+        seen = set()
+        sizes[name] = {
+            "entries": len(c),
+            "maxsize": c.maxsize,
+            "bytes": sum(deep_size(key, seen) + deep_size(value, seen) for key, value in c.items()),
+        }
+    return sizes
+
+
+def _stats(stats, limit: int) -> list:
+    return [
+        {
+            "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size": stat.size,
+            "count": stat.count,
+            "size_diff": getattr(stat, "size_diff", None),
+            "count_diff": getattr(stat, "count_diff", None),
+        }
+        for stat in stats[:limit]
+    ]
+
+
+def take_snapshot() -> dict:
+    """
+    Toma una instantánea, la guarda (acotadas a FND_MEMORY_SNAPSHOTS) y devuelve
+    su identificador con los puntos que más memoria retienen.
+    """
+    snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    snapshot_id = uuid.uuid4().hex[:12]
+    with _lock:
+        _snapshots[snapshot_id] = (datetime.now(timezone.utc).isoformat(timespec="milliseconds"), snapshot)
+        while len(_snapshots) > settings.MEMORY_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return {
+        "id": snapshot_id,
+        "traced": sum(stat.size for stat in snapshot.statistics("filename")),
+        "top": _stats(snapshot.statistics("traceback" if tracemalloc.get_traceback_limit() > 1 else "lineno"), settings.MEMORY_TOP),
+    }
+
+
+def snapshots() -> list:
+    with _lock:
+        return [{"id": snapshot_id, "ts": ts} for snapshot_id, (ts, _) in _snapshots.items()]
+
+
+def diff(old_id: str, new_id: str) -> list:
+    """
+    Diferencia entre dos instantáneas guardadas ordenada por crecimiento.
+    Devuelve None si alguna no existe.
+    """
+    with _lock:
+        old = _snapshots.get(old_id)
+        new = _snapshots.get(new_id)
+    if old is None or new is None:
+        return None
+    return _stats(new[1].compare_to(old[1], "lineno"), settings.MEMORY_TOP)
+
+
+def status() -> dict:
+    current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (None, None)
+    return {
+        "rss": rss(),
+        "tracemalloc": {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else None,
+            "current": current,
+            "peak": peak,
+        },
+        "caches": cache_sizes(),
+        "snapshots": snapshots(),
+    }
@@ -0,0 +1,172 @@
+"""
+Métricas del FND en formato de exposición de texto de Prometheus.
+
+Implementación mínima de contadores, gauges e histogramas con etiquetas,
+segura entre hilos, para no añadir dependencias al proyecto.
+"""
+import threading
+
+import controller.cache as cache
+
+# Límites de los histogramas de latencia, en segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+registry = []
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric():
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, *labels, value: float):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = [(labels, (list(e[0]), e[1], e[2])) for labels, e in self._values.items()]
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+# ===================== MÉTRICAS DE RUTAS DEL FND =====================
+http_requests = Counter("fnd_http_requests_total", "Peticiones HTTP atendidas por el FND", ("method", "route", "status"))
+http_latency = Histogram("fnd_http_request_duration_seconds", "Latencia de las peticiones HTTP del FND", ("method", "route"))
+http_in_flight = Gauge("fnd_http_requests_in_flight", "Peticiones HTTP en curso en el FND", ("method",))
+
+# ===================== MÉTRICAS DE LLAMADAS A MICROSERVICIOS =====================
+upstream_requests = Counter("fnd_upstream_requests_total", "Llamadas a microservicios", ("service", "method", "endpoint", "status"))
+upstream_latency = Histogram("fnd_upstream_request_duration_seconds", "Latencia de las llamadas a microservicios", ("service", "method", "endpoint", "status"))
+upstream_in_flight = Gauge("fnd_upstream_requests_in_flight", "Llamadas a microservicios en curso", ("service",))
+upstream_faults = Counter("fnd_upstream_faults_total", "Fallos inyectados en llamadas a microservicios (FND_FAULTS)", ("service", "kind"))
+
+# ===================== ÍNDICE DEL CATÁLOGO =====================
+catalog_entities = Gauge("fnd_catalog_index_entities", "Entidades en el índice local del catálogo", ("kind",))
+catalog_queries = Counter("fnd_catalog_index_queries_total", "Filtros de la tienda resueltos con el índice local", ("kind",))
+
+# ===================== CONTROL DE ADMISIÓN =====================
+admission_in_flight = Gauge("fnd_admission_in_flight", "Peticiones admitidas en curso por clase de ruta", ("class",))
+admission_queued = Gauge("fnd_admission_queued", "Peticiones esperando hueco por clase de ruta", ("class",))
+admission_rejected = Counter("fnd_admission_rejected_total", "Peticiones rechazadas con 503 por el control de admisión", ("class", "reason"))
+
+# ===================== EVENT LOOP =====================
+loop_lag = Histogram("fnd_event_loop_lag_seconds", "Retardo de planificación del event loop", (),
+                     buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+loop_blocked = Counter("fnd_event_loop_blocked_total", "Bloqueos del event loop por encima del umbral, por ruta", ("route",))
+
+
+def route_label(request) -> str:
+    """
+    Plantilla de la ruta de FastAPI que atendió la petición (p. ej. /song/{songId}).
+    """
+    route = request.scope.get("route")
+    if route is not None:
+        return route.path
+    if request.url.path.startswith("/static/"):
+        return "/static"
+    return "unmatched"
+
+
+def render() -> str:
+    """
+    Devuelve todas las métricas registradas más el estado de las cachés.
+    """
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+
+    lines.append("# HELP fnd_cache_hits_total Aciertos de caché")
+    lines.append("# TYPE fnd_cache_hits_total counter")
+    for name, c in cache.caches.items():
+        lines.append(f'fnd_cache_hits_total{{cache="{name}"}} {c.hits}')
+    lines.append("# HELP fnd_cache_misses_total Fallos de caché")
+    lines.append("# TYPE fnd_cache_misses_total counter")
+    for name, c in cache.caches.items():
+        lines.append(f'fnd_cache_misses_total{{cache="{name}"}} {c.misses}')
+    lines.append("# HELP fnd_cache_entries Entradas almacenadas en caché")
+    lines.append("# TYPE fnd_cache_entries gauge")
+    for name, c in cache.caches.items():
+        lines.append(f'fnd_cache_entries{{cache="{name}"}} {len(c)}')
+    return "\n".join(lines) + "\n"
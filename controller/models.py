@@ -0,0 +1,139 @@
+"""
+Modelos tipados de las respuestas de TYA.
+
+GENERADO por tools/gen_models.py a partir de TemasYArtistas.yaml: no editar a
+mano, regenerar con `python -m tools.gen_models`.
+
+Se decodifican directamente de los bytes de la respuesta con
+`upstream.decode(resp, List[models.Song])`. Los campos no obligatorios en el
+esquema valen None si TYA no los envía y los desconocidos se ignoran.
+"""
+from typing import List, Optional
+
+import msgspec
+
+
+class Genre(msgspec.Struct, gc=False):
+    id: int
+    name: str
+
+
+class Song(msgspec.Struct, gc=False):
+    songId: Optional[int] = None
+    title: Optional[str] = None
+    artistId: Optional[int] = None
+    collaborators: Optional[List[int]] = None
+    releaseDate: Optional[str] = None
+    description: Optional[str] = None
+    duration: Optional[int] = None
+    genres: Optional[List[int]] = None
+    cover: Optional[str] = None
+    price: Optional[float] = None
+    albumId: Optional[int] = None
+    trackId: Optional[int] = None
+    albumOrder: Optional[int] = None
+    linked_albums: Optional[List[int]] = None
+
+
+class Album(msgspec.Struct, gc=False):
+    albumId: Optional[int] = None
+    title: Optional[str] = None
+    artistId: Optional[int] = None
+    collaborators: Optional[List[int]] = None
+    description: Optional[str] = None
+    releaseDate: Optional[str] = None
+    genres: Optional[List[int]] = None
+    songs: Optional[List[int]] = None
+    cover: Optional[str] = None
+    price: Optional[float] = None
+
+
+class Artist(msgspec.Struct, gc=False):
+    artistId: Optional[int] = None
+    artisticName: Optional[str] = None
+    artisticBiography: Optional[str] = None
+    artisticEmail: Optional[str] = None
+    artisticImage: Optional[str] = None
+    socialMediaUrl: Optional[str] = None
+    registrationDate: Optional[str] = None
+    userId: Optional[int] = None
+    owner_songs: Optional[List[int]] = None
+    owner_albums: Optional[List[int]] = None
+    owner_merch: Optional[List[int]] = None
+
+
+class Merchandising(msgspec.Struct, gc=False):
+    merchId: Optional[int] = None
+    title: Optional[str] = None
+    artistId: Optional[int] = None
+    collaborators: Optional[List[int]] = None
+    releaseDate: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    cover: Optional[str] = None
+
+
+class ArtistSummary(msgspec.Struct, gc=False):
+    """Artist reducido para listas: artistId, artisticName."""
+
+    artistId: Optional[int] = None
+    artisticName: Optional[str] = None
+
+
+class SongSummary(msgspec.Struct, gc=False):
+    """Song reducido para listas: songId, title, artistId, duration, albumOrder, trackId."""
+
+    songId: Optional[int] = None
+    title: Optional[str] = None
+    artistId: Optional[int] = None
+    duration: Optional[int] = None
+    albumOrder: Optional[int] = None
+    trackId: Optional[int] = None
+
+
+class AlbumSummary(msgspec.Struct, gc=False):
+    """Album reducido para listas: albumId, title, artistId, releaseDate, cover, price."""
+
+    albumId: Optional[int] = None
+    title: Optional[str] = None
+    artistId: Optional[int] = None
+    releaseDate: Optional[str] = None
+    cover: Optional[str] = None
+    price: Optional[float] = None
+
+
+class SongEntry(msgspec.Struct, gc=False):
+    """Song reducido para el índice del catálogo: songId, title, artistId, releaseDate, genres."""
+
+    songId: Optional[int] = None
+    title: Optional[str] = None
+    artistId: Optional[int] = None
+    releaseDate: Optional[str] = None
+    genres: Optional[List[int]] = None
+
+
+class AlbumEntry(msgspec.Struct, gc=False):
+    """Album reducido para el índice del catálogo: albumId, title, artistId, releaseDate, genres."""
+
+    albumId: Optional[int] = None
+    title: Optional[str] = None
+    artistId: Optional[int] = None
+    releaseDate: Optional[str] = None
+    genres: Optional[List[int]] = None
+
+
+class MerchEntry(msgspec.Struct, gc=False):
+    """Merchandising reducido para el índice del catálogo: merchId, title, artistId, releaseDate."""
+
+    merchId: Optional[int] = None
+    title: Optional[str] = None
+    artistId: Optional[int] = None
+    releaseDate: Optional[str] = None
+
+
+class ArtistEntry(msgspec.Struct, gc=False):
+    """Artist reducido para el índice del catálogo: artistId, artisticName, registrationDate."""
+
+    artistId: Optional[int] = None
+    artisticName: Optional[str] = None
+    registrationDate: Optional[str] = None
@@ -1,28 +1,193 @@
-import json
+import hmac
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Query, Request, Response
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
+import logging
 import os
+import time
+from typing import List
 import requests
 import view.oversound_view as osv
 import controller.msvc_servers as servers
-
-app = FastAPI()
+import controller.admission as admission
+import controller.cart as cart
+import controller.catalog as catalog
+import controller.checkout as checkout
+import controller.faults as faults
+import controller.log as log
+import controller.looplag as looplag
+import controller.memory as memory
+import controller.metrics as metrics
+import controller.models as models
+import controller.profiler as profiler
+import controller.proxy as proxy
+import controller.search as search
+import controller.settings as settings
+import controller.slowlog as slowlog
+import controller.suggest as suggest
+import controller.tracing as tracing
+import controller.upstream as upstream
+import controller.viewmodels as viewmodels
+import controller.warmup as warmup
+from controller.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log.setup()
+    if faults.enabled():
+        logger.warning("Inyección de fallos activa", extra={"faults": settings.FAULTS})
+    if settings.MEMORY_TRACEMALLOC:
+        memory.start()
+    # Precargar en caché los top-10 de RYE sin bloquear el arranque
+    warmup.start()
+    # Cargar el índice local del catálogo para los filtros de la tienda
+    catalog.start()
+    # Detectar rutas async que bloquean el event loop
+    looplag.start(app)
+    yield
+    looplag.stop()
+    catalog.stop()
+    warmup.stop()
+    log.shutdown()
+
+app = FastAPI(lifespan=lifespan, default_response_class=JSONResponse)
 osv = osv.View()
 
 def obtain_user_data(token: str):
     if not token:
         return None
     try:
-        resp = requests.get(f"{servers.SYU}/auth", timeout=2, headers={"Accept": "application/json", "Cookie":f"oversound_auth={token}"})
+        resp = upstream.get(f"{servers.SYU}/auth", timeout=2, headers={"Accept": "application/json", "Cookie":f"oversound_auth={token}"})
         resp.raise_for_status()
         return resp.json()
     except requests.RequestException:
         return None
 
-# Configuración de CORS
+def obtain_favorites(token: str, userdata: dict):
+    """
+    Favoritos del usuario ({tipo: frozenset de ids}, ver `upstream.get_favorites`).
+    Sin sesión no tiene ninguno; None si SYU no responde.
+    """
+    if not userdata:
+        return {kind: frozenset() for kind in upstream.FAVORITE_TYPES}
+    try:
+        return upstream.get_favorites(userdata.get("userId"), token)
+    except requests.RequestException as e:
+        logger.warning("Error obteniendo los favoritos del usuario: %s", e)
+        return None
+
+def obtain_cart(request: Request, token: str, userdata: dict):
+    """
+    Carrito resumido del usuario ({(tipo, id): (unidades, precio)}, ver
+    `controller.cart`). Lo deja también en `request.state.cart_summary` para
+    que la cabecera pinte el contador. None sin sesión o si TPP no responde.
+    """
+    if not userdata:
+        return None
+    try:
+        items = cart.get(userdata.get("userId"), token)
+    except requests.RequestException as e:
+        logger.warning("Error obteniendo el resumen del carrito: %s", e)
+        return None
+    request.state.cart_summary = cart.summary(items)
+    return items
+
+def is_favorite(favorites: dict, content_type: str, content_id: int):
+    # None si no se conocen los favoritos: el navegador los consulta en /favs/state
+    return None if favorites is None else content_id in favorites[content_type]
+
+def is_admin(request: Request) -> bool:
+    # Los endpoints /admin solo están disponibles si se ha configurado FND_ADMIN_TOKEN
+    token = request.headers.get("X-Admin-Token")
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token, settings.ADMIN_TOKEN)
+
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    """
+    Da a la petición un hueco de su clase de ruta o la rechaza con 503 y
+    Retry-After si no lo hay (ver controller/admission.py). Va dentro de la
+    middleware de métricas para que los rechazos y la espera cuenten en ellas
+    """
+    gate = admission.gate_for(request)
+    if gate is None:
+        return await call_next(request)
+    if not await gate.acquire():
+        return admission.rejected()
+    try:
+        return await call_next(request)
+    finally:
+        gate.release()
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """
+    Registra número de peticiones, estado y latencia por ruta de FastAPI
+    """
+    method = request.method
+    status = "500"
+    metrics.http_in_flight.inc(method)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        route = metrics.route_label(request)
+        metrics.http_in_flight.dec(method)
+        metrics.http_requests.inc(method, route, status)
+        metrics.http_latency.observe(method, route, value=elapsed)
+
+@app.middleware("http")
+async def tracing_middleware(request: Request, call_next):
+    """
+    Abre la traza de llamadas a microservicios de la petición, la guarda en el
+    registro de peticiones lentas si supera el umbral y, si está activado, la
+    publica en la cabecera Server-Timing
+    """
+    trace, token = tracing.begin()
+    try:
+        response = await call_next(request)
+    except Exception:
+        slowlog.record(request, 500, trace)
+        raise
+    finally:
+        tracing.end(token)
+    slowlog.record(request, response.status_code, trace)
+    if settings.SERVER_TIMING_ENABLED:
+        render_timings = getattr(request.state, "render_timings", ())
+        response.headers["Server-Timing"] = tracing.server_timing(trace, render_timings)
+    return response
+
+@app.middleware("http")
+async def profiling_middleware(request: Request, call_next):
+    """
+    Perfila la petición si la pide un administrador con la cabecera X-Profile.
+    El identificador del perfil se devuelve en la cabecera X-Profile-Id
+    """
+    if not request.headers.get("X-Profile") or not is_admin(request):
+        return await call_next(request)
+    sampler = profiler.start(request)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        profile_id = profiler.finish(sampler, request, status, time.perf_counter() - start)
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+# Configuración de CORS: se añade después de las middlewares anteriores para
+# quedar por fuera de todas y poner sus cabeceras también en los 503 de admisión
 origins = [
     "http://localhost:8000",
     "http://localhost:8080",
@@ -46,44 +211,78 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+@app.get("/metrics")
+def get_metrics():
+    """
+    Métricas del FND en formato de texto de Prometheus
+    """
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/health/live")
+def health_live():
+    """
+    Sonda de vida: el proceso responde
+    """
+    return JSONResponse(content={"status": "ok"})
+
+@app.get("/health/ready")
+def health_ready():
+    """
+    Sonda de disponibilidad: listo cuando termina el calentamiento de cachés o vence su plazo
+    """
+    ready = warmup.is_ready()
+    content = {
+        "status": "ready" if ready else "warming",
+        "warmup": {
+            "enabled": warmup.state["enabled"],
+            "finished": warmup.state["finished_at"] is not None,
+            "entities": warmup.state["entities"],
+            "rounds": warmup.state["rounds"],
+            "errors": warmup.state["errors"],
+        },
+        "catalog_index": catalog.status(),
+        "search_index": search.status(),
+        "suggest": suggest.status(),
+        "checkout": checkout.status(),
+        "admission": admission.status(),
+    }
+    return JSONResponse(content=content, status_code=200 if ready else 503)
+
 @app.get("/")
 def index(request: Request):
     token = request.cookies.get("oversound_auth")
     userdata = obtain_user_data(token)
-    print(userdata)
+    logger.debug("Petición a la portada", extra={"userId": userdata.get('userId') if userdata else None})
     # Load top lists and recommendations from RYE (server-side to avoid CORS and speed up page)
     top_songs = []
     top_artists = []
     rec_songs = []
     rec_artists = []
 
+    # Los top-10 son globales, se sirven desde la caché (precargada al arrancar)
     try:
-        ts = requests.get(f"{servers.RYE}/statistics/top-10-songs", timeout=3, headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"})
-        if ts.ok:
-            top_songs = ts.json()
+        top_songs = upstream.get_top_list("songs")
     except requests.RequestException as e:
-        print(f"Error fetching top songs from RYE: {e}")
+        logger.warning("Error fetching top songs from RYE: %s", e)
 
     try:
-        ta = requests.get(f"{servers.RYE}/statistics/top-10-artists", timeout=3, headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"})
-        if ta.ok:
-            top_artists = ta.json()
+        top_artists = upstream.get_top_list("artists")
     except requests.RequestException as e:
-        print(f"Error fetching top artists from RYE: {e}")
+        logger.warning("Error fetching top artists from RYE: %s", e)
 
     try:
-        rs = requests.get(f"{servers.RYE}/recommendations/song", timeout=3, headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"})
+        rs = upstream.get(f"{servers.RYE}/recommendations/song", timeout=3, headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"})
         if rs.ok:
             rec_songs = rs.json()
     except requests.RequestException as e:
-        print(f"Error fetching recommended songs from RYE: {e}")
+        logger.warning("Error fetching recommended songs from RYE: %s", e)
 
     try:
-        ra = requests.get(f"{servers.RYE}/recommendations/artist", timeout=3, headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"})
+        ra = upstream.get(f"{servers.RYE}/recommendations/artist", timeout=3, headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"})
         if ra.ok:
             rec_artists = ra.json()
     except requests.RequestException as e:
-        print(f"Error fetching recommended artists from RYE: {e}")
+        logger.warning("Error fetching recommended artists from RYE: %s", e)
 
     return osv.get_home_view(request, userdata, servers.SYU, servers.RYE, servers.TYA, top_songs, top_artists, rec_songs, rec_artists)
 
@@ -100,7 +299,7 @@ async def login(request: Request):
     # Se obtienen los datos del formulario
     body = await request.json()
     # Se hace un post a SYU
-    resp = requests.post(
+    resp = upstream.post(
         f"{servers.SYU}/login", 
         json=body,
         timeout=2, 
@@ -119,12 +318,13 @@ async def login(request: Request):
 def logout(request: Request):
     try:
         token = request.cookies.get("oversound_auth")
-        resp = requests.get(f"{servers.SYU}/logout", timeout=2, headers={"Accept": "applications/json", "Cookie": f"oversound_auth={token}"})
+        resp = upstream.get(f"{servers.SYU}/logout", timeout=2, headers={"Accept": "applications/json", "Cookie": f"oversound_auth={token}"})
         resp.raise_for_status()
-        Response.delete_cookie("session")
-        return resp.json()
+        response = JSONResponse(content=resp.json())
+        response.delete_cookie("oversound_auth", path="/")
+        return response
     except requests.RequestException:
-        return Response(content=json.dumps({"error": "Couldn't connect with authentication service"}), media_type="application/json", status_code=500)
+        return JSONResponse(content={"error": "Couldn't connect with authentication service"}, status_code=500)
 
 @app.get("/register")
 def register_page(request: Request):
@@ -169,7 +369,7 @@ async def register(request: Request):
     # Se obtienen los datos del formulario
     body = await request.json()
     # Se hace un post a SYU
-    resp = requests.post(
+    resp = upstream.post(
         f"{servers.SYU}/register", 
         json=body,
         timeout=2, 
@@ -184,133 +384,177 @@ async def register(request: Request):
     else:
         return JSONResponse(content=response_data, status_code=resp.status_code)
 
+def _filter_ids(kind: str, filter_params: dict) -> list:
+    """
+    IDs de /{kind}/filter: del índice local del catálogo si está cargado, si no de TYA.
+    """
+    ids = catalog.filter(kind, filter_params)
+    if ids is not None:
+        return ids
+    resp = upstream.get(
+        f"{servers.TYA}/{kind}/filter",
+        params=filter_params,
+        timeout=10,
+        headers={"Accept": "application/json"}
+    )
+    return resp.json() if resp.ok else []
+
+
+def _shop_artists() -> list:
+    """
+    Todos los artistas de TYA ordenados por nombre, solo con id y nombre: el
+    decodificador se salta biografías e imágenes.
+    """
+    artists_resp = upstream.get(
+        f"{servers.TYA}/artist/filter",
+        params={"order": "name", "direction": "asc"},
+        timeout=10,
+        headers={"Accept": "application/json"}
+    )
+    artist_ids = artists_resp.json() if artists_resp.ok else []
+    if not artist_ids:
+        return []
+    artists_list_resp = upstream.get(
+        f"{servers.TYA}/artist/list",
+        params={"ids": ",".join(map(str, artist_ids))},
+        timeout=10,
+        headers={"Accept": "application/json"}
+    )
+    return upstream.decode(artists_list_resp, List[models.ArtistSummary]) if artists_list_resp.ok else []
+
+
+def _shop_ids(kind: str, filter_params: dict, size: int, cursor: str = None):
+    """
+    (ids de una página de `kind`, cursor de la siguiente). Con el índice del
+    catálogo la paginación es por cursor y admite cualquier tamaño; sin él, TYA
+    pagina con `page` de catalog.PAGE_SIZE en PAGE_SIZE y el cursor es el número
+    de la página siguiente. Lanza ValueError si el cursor no es válido.
+    """
+    if cursor and cursor.isdigit():
+        filter_params = dict(filter_params, page=int(cursor))
+        cursor = None
+    result = catalog.page(kind, filter_params, size, cursor)
+    if result is not None:
+        return result
+    if cursor:
+        raise ValueError("Cursor no válido")
+    ids = _filter_ids(kind, filter_params)
+    return ids, (str(int(filter_params["page"]) + 1) if len(ids) >= catalog.PAGE_SIZE else None)
+
+
+def _shop_prefetch(kind: str, filter_params: dict, size: int, cursor: str):
+    """
+    Precarga en la caché la página siguiente mientras se sirve la actual. Solo
+    con el índice del catálogo, que calcula sus ids sin preguntar a TYA.
+    """
+    if not settings.SHOP_PREFETCH or not cursor or cursor.isdigit():
+        return
+    try:
+        result = catalog.page(kind, filter_params, size, cursor)
+    except ValueError:
+        return
+    if result is not None:
+        upstream.prefetch_list(kind, result[0])
+
+
+def _shop_items(kind: str, ids) -> list:
+    try:
+        return upstream.get_list(kind, ids)
+    except requests.RequestException as e:
+        logger.warning("Error obteniendo productos de la tienda (%s): %s", kind, e)
+        return []
+
+
 @app.get("/shop")
 def shop(request: Request, 
          genres: str = Query(default=None),
          artists: str = Query(default=None),
          order: str = Query(default="date"),
          direction: str = Query(default="desc"),
-         page: int = Query(default=1)):
+         page: int = Query(default=1),
+         size: int = Query(default=None),
+         kind: str = Query(default=None),
+         cursor: str = Query(default=None)):
     """
     Renderiza la vista de la tienda con filtrado desde TYA.
+    Con Accept JSON devuelve la página de `kind` (song, album o merch) que
+    sigue a `cursor`, para el scroll infinito: {"items": [...], "next": cursor}.
     """
+    size = min(max(size or settings.SHOP_PAGE_SIZE, 1), settings.SHOP_PAGE_SIZE_MAX)
+
+    # Construir parámetros de filtrado
+    filter_params = {
+        "order": order,
+        "direction": direction,
+        "page": page
+    }
+
+    if genres:
+        filter_params["genres"] = genres
+
+    if artists:
+        filter_params["artists"] = artists
+
+    if "application/json" in request.headers.get("accept", ""):
+        if kind not in upstream.LIST_MODELS:
+            return JSONResponse(content={"error": "Tipo de producto no válido"}, status_code=400)
+        try:
+            ids, next_cursor = _shop_ids(kind, filter_params, size, cursor)
+        except ValueError:
+            return JSONResponse(content={"error": "Cursor no válido"}, status_code=400)
+        except requests.RequestException as e:
+            logger.error("Error filtrando la tienda: %s", e)
+            return JSONResponse(content={"error": "Error al obtener los productos"}, status_code=502)
+        _shop_prefetch(kind, filter_params, size, next_cursor)
+        return JSONResponse(content={"items": _shop_items(kind, ids), "next": next_cursor}, status_code=200)
+
     token = request.cookies.get("oversound_auth")
     userdata = obtain_user_data(token)
+    cursors = {}
 
     try:
-        # Construir parámetros de filtrado
-        filter_params = {
-            "order": order,
-            "direction": direction,
-            "page": page
-        }
-        
-        if genres:
-            filter_params["genres"] = genres
-        
-        if artists:
-            filter_params["artists"] = artists
-
-        # Obtener IDs filtrados desde TYA
-        song_ids_resp = requests.get(
-            f"{servers.TYA}/song/filter",
-            params=filter_params,
-            timeout=10,
-            headers={"Accept": "application/json"}
-        )
-        song_ids = song_ids_resp.json() if song_ids_resp.ok else []
-        
-        album_ids_resp = requests.get(
-            f"{servers.TYA}/album/filter",
-            params=filter_params,
-            timeout=10,
-            headers={"Accept": "application/json"}
-        )
-        album_ids = album_ids_resp.json() if album_ids_resp.ok else []
-        
-        merch_ids_resp = requests.get(
-            f"{servers.TYA}/merch/filter",
-            params=filter_params,
-            timeout=10,
-            headers={"Accept": "application/json"}
-        )
-        merch_ids = merch_ids_resp.json() if merch_ids_resp.ok else []
+        # Obtener IDs filtrados (índice local del catálogo o TYA) y el cursor de
+        # la página siguiente, que se empieza a precargar antes de hidratar esta
+        pages = {}
+        for shop_kind in ("song", "album", "merch"):
+            ids, cursors[shop_kind] = _shop_ids(shop_kind, filter_params, size)
+            _shop_prefetch(shop_kind, filter_params, size, cursors[shop_kind])
+            pages[shop_kind] = ids
 
-        # Obtener datos completos de los productos
-        songs = []
-        if song_ids:
-            songs_resp = requests.get(
-                f"{servers.TYA}/song/list",
-                params={"ids": ",".join(map(str, song_ids))},
-                timeout=10,
-                headers={"Accept": "application/json"}
-            )
-            songs = songs_resp.json() if songs_resp.ok else []
-
-        albums = []
-        if album_ids:
-            albums_resp = requests.get(
-                f"{servers.TYA}/album/list",
-                params={"ids": ",".join(map(str, album_ids))},
-                timeout=10,
-                headers={"Accept": "application/json"}
-            )
-            albums = albums_resp.json() if albums_resp.ok else []
-
-        merch = []
-        if merch_ids:
-            merch_resp = requests.get(
-                f"{servers.TYA}/merch/list",
-                params={"ids": ",".join(map(str, merch_ids))},
-                timeout=10,
-                headers={"Accept": "application/json"}
-            )
-            merch = merch_resp.json() if merch_resp.ok else []
+        # Obtener datos completos de los productos (caché de la tienda o /list)
+        songs = _shop_items("song", pages["song"])
+        albums = _shop_items("album", pages["album"])
+        merch = _shop_items("merch", pages["merch"])
 
         # Obtener géneros y artistas para los filtros
-        genres_resp = requests.get(f"{servers.TYA}/genres", timeout=5, headers={"Accept": "application/json"})
-        all_genres = genres_resp.json() if genres_resp.ok else []
-        
-        # Obtener todos los artistas (necesitamos un endpoint, por ahora usar búsqueda vacía o todos)
-        artists_resp = requests.get(
-            f"{servers.TYA}/artist/filter",
-            params={"order": "name", "direction": "asc"},
-            timeout=10,
-            headers={"Accept": "application/json"}
-        )
-        if artists_resp.ok:
-            artist_ids = artists_resp.json()
-            if artist_ids:
-                artists_list_resp = requests.get(
-                    f"{servers.TYA}/artist/list",
-                    params={"ids": ",".join(map(str, artist_ids))},
-                    timeout=10,
-                    headers={"Accept": "application/json"}
-                )
-                all_artists = artists_list_resp.json() if artists_list_resp.ok else []
-            else:
-                all_artists = []
-        else:
-            all_artists = []
+        genres_resp = upstream.get(f"{servers.TYA}/genres", timeout=5, headers={"Accept": "application/json"})
+        all_genres = upstream.decode(genres_resp, List[models.Genre]) if genres_resp.ok else []
+        
+        # Obtener todos los artistas ordenados por nombre: del índice local o de TYA
+        all_artists = catalog.artists_by_name()
+        if all_artists is None:
+            all_artists = _shop_artists()
 
         # Crear mapeos
-        artists_map = {a.get('artistId'): a.get('artisticName') for a in all_artists if isinstance(a, dict) and a.get('artistId')}
-        genres_map = {g.get('id'): g.get('name') for g in all_genres if isinstance(g, dict) and g.get('id')}
+        artists_map, genres_map = viewmodels.shop_maps(all_artists, all_genres)
 
-        print(f"[DEBUG] Shop filtered: {len(songs)} songs, {len(albums)} albums, {len(merch)} merch")
+        # Recuentos de cada género y artista para la selección actual (None sin índice)
+        facets = viewmodels.shop_facets(catalog.facets(genres, artists, genres_map, artists_map))
 
-    except Exception as e:
-        print(f"Error en shop: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.debug("Tienda filtrada", extra={"songs": len(songs), "albums": len(albums), "merch": len(merch)})
+
+    except Exception:
+        logger.exception("Error en shop")
         songs, albums, merch = [], [], []
         all_genres, all_artists = [], []
         artists_map, genres_map = {}, {}
+        facets = None
+        cursors = {}
 
     return osv.get_shop_view(
         request, userdata, 
         songs, all_genres, all_artists, albums, merch,
-        artists_map, genres_map, servers.TYA
+        artists_map, genres_map, servers.TYA, facets, cursors, size
     )
 
 @app.get("/cart")
@@ -321,7 +565,7 @@ async def get_cart(request: Request):
     - Si Accept contiene 'text/html': renderiza la página HTML del carrito
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
+    userdata = await run_in_threadpool(obtain_user_data, token)
     
     # Obtener el header Accept
     accept_header = request.headers.get("accept", "")
@@ -332,15 +576,16 @@ async def get_cart(request: Request):
             return JSONResponse(content={"error": "No autenticado"}, status_code=401)
         
         try:
-            cart_resp = requests.get(
-                f"{servers.TPP}/cart",
-                timeout=5,
-                headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
-            )
+            cart_resp = await proxy.send(request, "GET", f"{servers.TPP}/cart", timeout=5)
             cart_resp.raise_for_status()
-            return JSONResponse(content=cart_resp.json(), status_code=cart_resp.status_code)
+            # El carrito completo ya está aquí: se aprovecha para renovar el resumen
+            try:
+                cart.refresh(userdata.get("userId"), cart_resp.json())
+            except ValueError:
+                cart.invalidate(userdata.get("userId"))
+            return proxy.passthrough(cart_resp)
         except requests.RequestException as e:
-            print(f"Error obteniendo carrito: {e}")
+            logger.error("Error obteniendo carrito: %s", e)
             return JSONResponse(content={"error": "No se pudo obtener el carrito"}, status_code=500)
     
     # Si la petición espera HTML (navegación normal)
@@ -351,191 +596,114 @@ async def get_cart(request: Request):
         # Renderizar la vista del carrito
         return osv.get_cart_view(request, userdata, servers.TYA)
 
+
+@app.get("/cart/summary")
+def get_cart_summary(request: Request):
+    """
+    Resumen del carrito para el contador de la cabecera:
+    {"count", "units", "total", "songs", "albums", "merch"}.
+    Sale de la caché por usuario que mantienen las rutas del carrito y la compra.
+    """
+    token = request.cookies.get("oversound_auth")
+    userdata = obtain_user_data(token)
+
+    if not userdata:
+        return JSONResponse(content={"error": "No autenticado"}, status_code=401)
+
+    if obtain_cart(request, token, userdata) is None:
+        return JSONResponse(content={"error": "No se pudo obtener el carrito"}, status_code=500)
+    return JSONResponse(content=request.state.cart_summary, headers={"Cache-Control": "private, no-cache"})
+
 # ============ ENDPOINTS DE BÚSQUEDA ============
 
-@app.get("/api/search/song")
-def search_songs(q: str = Query(..., min_length=3)):
+def _search(kind: str, q: str, label: str):
     """
-    Busca canciones por query y devuelve los datos completos
+    Busca entidades de `kind` y devuelve los datos completos. El índice local
+    (`controller.search`) da los ids ya ordenados por relevancia; si no está al
+    día se usa /{kind}/search de TYA. Los datos se resuelven siempre con /list.
     """
     try:
-        # Buscar (devuelve lista de objetos con songId)
-        search_resp = requests.get(
-            f"{servers.TYA}/song/search",
-            params={"q": q},
-            timeout=5,
-            headers={"Accept": "application/json"}
-        )
-        
-        if not search_resp.ok:
-            return JSONResponse(content=[], status_code=200)
-        
-        song_objects = search_resp.json()
-        
-        if not song_objects or len(song_objects) == 0:
-            return JSONResponse(content=[], status_code=200)
-        
-        # Extraer IDs de los objetos
-        song_ids = [obj.get('songId') for obj in song_objects if obj.get('songId')]
-        
-        if not song_ids:
+        ids = None
+        if search.is_fresh(catalog.state["refreshed_at"]):
+            by_artist = None if kind == "artist" else (lambda artist_ids: catalog.ids_by_artist(kind, artist_ids))
+            ids = search.query(kind, q, by_artist=by_artist, limit=settings.SEARCH_INDEX_LIMIT)
+        if ids is None:
+            # Buscar en TYA (devuelve lista de objetos con {kind}Id)
+            search_resp = upstream.get(
+                f"{servers.TYA}/{kind}/search",
+                params={"q": q},
+                timeout=5,
+                headers={"Accept": "application/json"}
+            )
+            if not search_resp.ok:
+                return JSONResponse(content=[], status_code=200)
+            ids = [obj.get(f"{kind}Id") for obj in search_resp.json() or [] if obj.get(f"{kind}Id")]
+
+        if not ids:
             return JSONResponse(content=[], status_code=200)
-        
+
         # Resolver datos completos con IDs separados por comas en el parámetro
-        ids_string = ','.join(map(str, song_ids))
-        list_resp = requests.get(
-            f"{servers.TYA}/song/list",
-            params={"ids": ids_string},
+        list_resp = upstream.get(
+            f"{servers.TYA}/{kind}/list",
+            params={"ids": ",".join(map(str, ids))},
             timeout=5,
             headers={"Accept": "application/json"}
         )
-        
-        if list_resp.ok:
-            return JSONResponse(content=list_resp.json(), status_code=200)
-        else:
+        if not list_resp.ok:
             return JSONResponse(content=[], status_code=200)
-            
+
+        suggest.record(kind, q, ids)
+
+        # /list devuelve por id: se recupera el orden de la búsqueda
+        position = {entity_id: i for i, entity_id in enumerate(ids)}
+        items = sorted(list_resp.json(), key=lambda item: position.get(item.get(f"{kind}Id"), len(position)))
+        return JSONResponse(content=items, status_code=200)
+
     except requests.RequestException as e:
-        print(f"Error buscando canciones: {e}")
+        logger.error("Error buscando %s: %s", label, e)
         return JSONResponse(content=[], status_code=200)
 
+@app.get("/api/suggest")
+def suggest_names(q: str = Query("", max_length=100)):
+    """
+    Sugerencias para el buscador de la cabecera desde la primera letra: solo
+    tipo, id, nombre y artista de las mejores coincidencias por prefijo.
+    """
+    items = []
+    for kind, entity_id, name, artist in suggest.suggest(q):
+        item = {"type": kind, "id": entity_id, "name": name}
+        if artist:
+            item["artist"] = artist
+        items.append(item)
+    return JSONResponse(content=items, status_code=200, headers={"Cache-Control": "public, max-age=30"})
+
+@app.get("/api/search/song")
+def search_songs(q: str = Query(..., min_length=3)):
+    """
+    Busca canciones por query y devuelve los datos completos
+    """
+    return _search("song", q, "canciones")
+
 @app.get("/api/search/album")
 def search_albums(q: str = Query(..., min_length=3)):
     """
     Busca álbumes por query y devuelve los datos completos
     """
-    try:
-        # Buscar (devuelve lista de objetos con albumId)
-        search_resp = requests.get(
-            f"{servers.TYA}/album/search",
-            params={"q": q},
-            timeout=5,
-            headers={"Accept": "application/json"}
-        )
-        
-        if not search_resp.ok:
-            return JSONResponse(content=[], status_code=200)
-        
-        album_objects = search_resp.json()
-        
-        if not album_objects or len(album_objects) == 0:
-            return JSONResponse(content=[], status_code=200)
-        
-        # Extraer IDs de los objetos
-        album_ids = [obj.get('albumId') for obj in album_objects if obj.get('albumId')]
-        
-        if not album_ids:
-            return JSONResponse(content=[], status_code=200)
-        
-        # Resolver datos completos con IDs separados por comas en el parámetro
-        ids_string = ','.join(map(str, album_ids))
-        list_resp = requests.get(
-            f"{servers.TYA}/album/list",
-            params={"ids": ids_string},
-            timeout=5,
-            headers={"Accept": "application/json"}
-        )
-        
-        if list_resp.ok:
-            return JSONResponse(content=list_resp.json(), status_code=200)
-        else:
-            return JSONResponse(content=[], status_code=200)
-            
-    except requests.RequestException as e:
-        print(f"Error buscando álbumes: {e}")
-        return JSONResponse(content=[], status_code=200)
+    return _search("album", q, "álbumes")
 
 @app.get("/api/search/artist")
 def search_artists(q: str = Query(..., min_length=3)):
     """
     Busca artistas por query y devuelve los datos completos
     """
-    try:
-        # Buscar (devuelve lista de objetos con artistId)
-        search_resp = requests.get(
-            f"{servers.TYA}/artist/search",
-            params={"q": q},
-            timeout=5,
-            headers={"Accept": "application/json"}
-        )
-        
-        if not search_resp.ok:
-            return JSONResponse(content=[], status_code=200)
-        
-        artist_objects = search_resp.json()
-        
-        if not artist_objects or len(artist_objects) == 0:
-            return JSONResponse(content=[], status_code=200)
-        
-        # Extraer IDs de los objetos
-        artist_ids = [obj.get('artistId') for obj in artist_objects if obj.get('artistId')]
-        
-        if not artist_ids:
-            return JSONResponse(content=[], status_code=200)
-        
-        # Resolver datos completos con IDs separados por comas en el parámetro
-        ids_string = ','.join(map(str, artist_ids))
-        list_resp = requests.get(
-            f"{servers.TYA}/artist/list",
-            params={"ids": ids_string},
-            timeout=5,
-            headers={"Accept": "application/json"}
-        )
-        
-        if list_resp.ok:
-            return JSONResponse(content=list_resp.json(), status_code=200)
-        else:
-            return JSONResponse(content=[], status_code=200)
-            
-    except requests.RequestException as e:
-        print(f"Error buscando artistas: {e}")
-        return JSONResponse(content=[], status_code=200)
+    return _search("artist", q, "artistas")
 
 @app.get("/api/search/merch")
 def search_merch(q: str = Query(..., min_length=3)):
     """
     Busca merchandising por query y devuelve los datos completos
     """
-    try:
-        # Buscar (devuelve lista de objetos con merchId)
-        search_resp = requests.get(
-            f"{servers.TYA}/merch/search",
-            params={"q": q},
-            timeout=5,
-            headers={"Accept": "application/json"}
-        )
-        
-        if not search_resp.ok:
-            return JSONResponse(content=[], status_code=200)
-        
-        merch_objects = search_resp.json()
-        
-        if not merch_objects or len(merch_objects) == 0:
-            return JSONResponse(content=[], status_code=200)
-        
-        # Extraer IDs de los objetos
-        merch_ids = [obj.get('merchId') for obj in merch_objects if obj.get('merchId')]
-        
-        if not merch_ids:
-            return JSONResponse(content=[], status_code=200)
-        
-        # Resolver datos completos con IDs separados por comas en el parámetro
-        ids_string = ','.join(map(str, merch_ids))
-        list_resp = requests.get(
-            f"{servers.TYA}/merch/list",
-            params={"ids": ids_string},
-            timeout=5,
-            headers={"Accept": "application/json"}
-        )
-        
-        if list_resp.ok:
-            return JSONResponse(content=list_resp.json(), status_code=200)
-        else:
-            return JSONResponse(content=[], status_code=200)
-            
-    except requests.RequestException as e:
-        print(f"Error buscando merchandising: {e}")
-        return JSONResponse(content=[], status_code=200)
+    return _search("merch", q, "merchandising")
 
 @app.get("/giftcard")
 def giftcard(request: Request):
@@ -599,7 +767,7 @@ async def purchase_giftcard(request: Request):
         }, status_code=200)
     
     except Exception as e:
-        print(e)
+        logger.error("Error comprando tarjeta regalo: %s", e)
         return JSONResponse(content={"error": "Error al procesar la compra"}, status_code=500)
 
 @app.get("/terms")
@@ -665,7 +833,7 @@ def get_help(request: Request):
 @app.get("/user/{username}")
 def register(request: Request, username: str):
     token = request.cookies.get("session")
-    userdata = requests.get(f"{servers.SYU}/user/{username}", timeout=2, headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"})
+    userdata = upstream.get(f"{servers.SYU}/user/{username}", timeout=2, headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"})
     userdata.raise_for_status()
     return userdata.json()
 
@@ -683,7 +851,7 @@ async def delete_song(request: Request, songId: int):
     
     try:
         # Primero obtener los datos de la canción para verificar la propiedad
-        song_resp = requests.get(f"{servers.TYA}/song/{songId}", timeout=2, headers={"Accept": "application/json"})
+        song_resp = upstream.get(f"{servers.TYA}/song/{songId}", timeout=2, headers={"Accept": "application/json"})
         song_resp.raise_for_status()
         song_data = song_resp.json()
         
@@ -692,20 +860,23 @@ async def delete_song(request: Request, songId: int):
             return JSONResponse(content={"error": "No tienes permisos para eliminar esta canción"}, status_code=403)
         
         # Eliminar la canción
-        delete_resp = requests.delete(
+        delete_resp = upstream.delete(
             f"{servers.TYA}/song/{songId}",
             timeout=5,
             headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
         )
         
         if delete_resp.ok:
+            upstream.invalidate_entity("song", songId)
+            catalog.changed("song", songId)
+            upstream.invalidate_entity("artist", song_data.get('artistId'))
             return JSONResponse(content={"message": "Canción eliminada exitosamente"})
         else:
             error_data = delete_resp.json() if delete_resp.text else {"error": "Error desconocido"}
             return JSONResponse(content=error_data, status_code=delete_resp.status_code)
     
     except requests.RequestException as e:
-        print(f"Error eliminando canción: {e}")
+        logger.error("Error eliminando canción: %s", e)
         return JSONResponse(content={"error": "Error al eliminar la canción"}, status_code=500)
 
 
@@ -716,94 +887,39 @@ def get_song(request: Request, songId: int):
     
     try:
         # Obtener información de la canción
-        song_resp = requests.get(f"{servers.TYA}/song/{songId}", timeout=2, headers={"Accept": "application/json"})
-        song_resp.raise_for_status()
-        song_data = song_resp.json()
-        
-        # Resolver artista principal
-        try:
-            artist_resp = requests.get(f"{servers.TYA}/artist/{song_data['artistId']}", timeout=2, headers={"Accept": "application/json"})
-            artist_resp.raise_for_status()
-            song_data['artist'] = artist_resp.json()
-        except requests.RequestException:
-            song_data['artist'] = {"artistId": song_data['artistId'], "nombre": "Artista desconocido"}
-        
-        # Resolver colaboradores
-        collaborators = []
-        if song_data.get('collaborators'):
-            for collab_id in song_data['collaborators']:
-                try:
-                    collab_resp = requests.get(f"{servers.TYA}/artist/{collab_id}", timeout=2, headers={"Accept": "application/json"})
-                    collab_resp.raise_for_status()
-                    collaborators.append(collab_resp.json())
-                except requests.RequestException:
-                    collaborators.append({"artistId": collab_id, "nombre": "Artista desconocido"})
-        song_data['collaborators_data'] = collaborators
-        
-        # Resolver géneros
-        genres = []
-        if song_data.get('genres'):
+        song = upstream.get_entity("song", songId)
+
+        # Resolver álbum original y álbumes linkeados (se ignoran los que no se puedan cargar)
+        albums = {}
+        album_ids = [song['albumId']] if song.get('albumId') is not None else []
+        album_ids.extend(song.get('linked_albums') or [])
+        for album_id in album_ids:
             try:
-                genres_resp = requests.get(f"{servers.TYA}/genres", timeout=2, headers={"Accept": "application/json"})
-                genres_resp.raise_for_status()
-                all_genres = genres_resp.json()
-                genres = [g for g in all_genres if g['id'] in song_data['genres']]
+                albums[album_id] = upstream.get_entity("album", album_id)
             except requests.RequestException:
                 pass
-        song_data['genres_data'] = genres
-        
-        # Resolver álbum original si existe
-        if song_data.get('albumId') is not None:
+
+        # Resolver artista principal, colaboradores y artistas de los álbumes
+        artists = {}
+        for artist_id in viewmodels.song_artist_ids(song, albums):
             try:
-                album_resp = requests.get(f"{servers.TYA}/album/{song_data['albumId']}", timeout=2, headers={"Accept": "application/json"})
-                album_resp.raise_for_status()
-                album_data = album_resp.json()
-                
-                # Resolver artista del álbum
-                try:
-                    album_artist_resp = requests.get(f"{servers.TYA}/artist/{album_data['artistId']}", timeout=2, headers={"Accept": "application/json"})
-                    album_artist_resp.raise_for_status()
-                    album_data['artist'] = album_artist_resp.json()
-                except requests.RequestException:
-                    album_data['artist'] = {"artistId": album_data['artistId'], "nombre": "Artista desconocido"}
-                
-                song_data['original_album'] = album_data
+                artists[artist_id] = upstream.get_entity("artist", artist_id)
             except requests.RequestException:
-                song_data['original_album'] = None
-        else:
-            song_data['original_album'] = None
-        
-        # Resolver álbumes linkeados
-        linked_albums_data = []
-        if song_data.get('linked_albums'):
-            for linked_album_id in song_data['linked_albums']:
-                try:
-                    linked_album_resp = requests.get(f"{servers.TYA}/album/{linked_album_id}", timeout=2, headers={"Accept": "application/json"})
-                    linked_album_resp.raise_for_status()
-                    linked_album_data = linked_album_resp.json()
-                    
-                    # Resolver artista del álbum linkeado
-                    try:
-                        linked_artist_resp = requests.get(f"{servers.TYA}/artist/{linked_album_data['artistId']}", timeout=2, headers={"Accept": "application/json"})
-                        linked_artist_resp.raise_for_status()
-                        linked_album_data['artist'] = linked_artist_resp.json()
-                    except requests.RequestException:
-                        linked_album_data['artist'] = {"artistId": linked_album_data['artistId'], "nombre": "Artista desconocido"}
-                    
-                    linked_albums_data.append(linked_album_data)
-                except requests.RequestException:
-                    pass  # Ignorar álbumes que no se puedan cargar
-        song_data['linked_albums_data'] = linked_albums_data
-        
-        # Asegurarse de que el precio sea un número
-        try:
-            song_data['price'] = float(song_data.get('price', 0))
-        except ValueError:
-            song_data['price'] = 0.0
+                pass
+
+        # Resolver géneros
+        all_genres = []
+        if song.get('genres'):
+            try:
+                all_genres = upstream.get_genres()
+            except requests.RequestException:
+                pass
+
+        song_data = viewmodels.build_song(song, artists, all_genres, albums)
         
-        # Determinar si está en favoritos y carrito (por ahora False, implementar después)
-        isLiked = False
-        inCarrito = False
+        # Determinar si está en favoritos y carrito
+        isLiked = is_favorite(obtain_favorites(token, userdata), "songs", songId)
+        inCarrito = cart.contains(obtain_cart(request, token, userdata), "song", songId)
         
         # Determinar tipo de usuario (0: no autenticado, 1: usuario, 2: artista)
         tipoUsuario = 0
@@ -812,24 +928,20 @@ def get_song(request: Request, songId: int):
 
         metrics = None
         try:
-            metrics_resp = requests.get(f"{servers.RYE}/statistics/metrics/song/{songId}", timeout=5)
+            metrics_resp = upstream.get(f"{servers.RYE}/statistics/metrics/song/{songId}", timeout=5)
             metrics_resp.raise_for_status()
             metrics_data = metrics_resp.json()
-            print(f"[DEBUG] Metrics response data: {metrics_data}")
-            metrics = {
-            "sales": metrics_data.get("sales", 0),
-            "downloads": metrics_data.get("downloads", 0),
-            "playbacks": metrics_data.get("playbacks", 0)
-            }
+            logger.debug("Métricas de la canción", extra={"songId": songId, "metrics": metrics_data})
+            metrics = viewmodels.song_metrics(metrics_data)
         except requests.RequestException as e:
-            print(f"Error obteniendo métricas del artista: {e}")
+            logger.warning("Error obteniendo métricas del artista: %s", e)
             metrics = {"playbacks": 0, "sales": 0, "downloads": 0}
         
         return osv.get_song_view(request, song_data, tipoUsuario, userdata, isLiked, inCarrito, servers.SYU, metrics, servers.TYA, servers.RYE, servers.PT)
         
     except requests.RequestException as e:
         # En caso de error, mostrar página de error
-        print(e)
+        logger.error("Error cargando la canción: %s", e)
         return osv.get_error_view(request, userdata, f"No se pudo cargar la canción", str(e))
 
 
@@ -850,7 +962,7 @@ def get_song_edit_page(request: Request, songId: int):
     
     try:
         # Obtener datos de la canción
-        song_resp = requests.get(f"{servers.TYA}/song/{songId}", timeout=5, headers={"Accept": "application/json"})
+        song_resp = upstream.get(f"{servers.TYA}/song/{songId}", timeout=5, headers={"Accept": "application/json"})
         song_resp.raise_for_status()
         song_data = song_resp.json()
         
@@ -860,7 +972,7 @@ def get_song_edit_page(request: Request, songId: int):
         
         # Obtener géneros disponibles
         try:
-            genres_resp = requests.get(f"{servers.TYA}/genres", timeout=5, headers={"Accept": "application/json"})
+            genres_resp = upstream.get(f"{servers.TYA}/genres", timeout=5, headers={"Accept": "application/json"})
             genres_resp.raise_for_status()
             genres = genres_resp.json()
         except requests.RequestException:
@@ -868,7 +980,7 @@ def get_song_edit_page(request: Request, songId: int):
         
         # Obtener artistas para colaboradores
         try:
-            artists_resp = requests.get(f"{servers.TYA}/artist/list?ids=1", timeout=5, headers={"Accept": "application/json"})
+            artists_resp = upstream.get(f"{servers.TYA}/artist/list?ids=1", timeout=5, headers={"Accept": "application/json"})
             artists_resp.raise_for_status()
             artists = artists_resp.json()
         except requests.RequestException:
@@ -880,7 +992,7 @@ def get_song_edit_page(request: Request, songId: int):
         return osv.get_song_edit_view(request, userdata, song_data, servers.TYA)
         
     except requests.RequestException as e:
-        print(f"Error obteniendo datos de la canción: {e}")
+        logger.error("Error obteniendo datos de la canción: %s", e)
         return osv.get_error_view(request, userdata, "No se pudo cargar los datos de la canción", str(e))
 
 
@@ -900,7 +1012,7 @@ async def update_song(request: Request, songId: int):
     
     try:
         # Primero verificar propiedad
-        song_resp = requests.get(f"{servers.TYA}/song/{songId}", timeout=2, headers={"Accept": "application/json"})
+        song_resp = upstream.get(f"{servers.TYA}/song/{songId}", timeout=2, headers={"Accept": "application/json"})
         song_resp.raise_for_status()
         song_data = song_resp.json()
         
@@ -911,13 +1023,15 @@ async def update_song(request: Request, songId: int):
         body = await request.json()
         
         # Enviar actualización a TYA
-        update_resp = requests.patch(
+        update_resp = upstream.patch(
             f"{servers.TYA}/song/{songId}",
             json=body,
             timeout=5,
             headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
         )
         update_resp.raise_for_status()
+        upstream.invalidate_entity("song", songId)
+        catalog.changed("song", songId)
         
         return JSONResponse(content={"message": "Canción actualizada correctamente", "songId": songId}, status_code=200)
         
@@ -943,7 +1057,7 @@ async def delete_album(request: Request, albumId: int):
     
     try:
         # Primero obtener los datos del álbum para verificar la propiedad
-        album_resp = requests.get(f"{servers.TYA}/album/{albumId}", timeout=2, headers={"Accept": "application/json"})
+        album_resp = upstream.get(f"{servers.TYA}/album/{albumId}", timeout=2, headers={"Accept": "application/json"})
         album_resp.raise_for_status()
         album_data = album_resp.json()
         
@@ -952,20 +1066,23 @@ async def delete_album(request: Request, albumId: int):
             return JSONResponse(content={"error": "No tienes permisos para eliminar este álbum"}, status_code=403)
         
         # Eliminar el álbum
-        delete_resp = requests.delete(
+        delete_resp = upstream.delete(
             f"{servers.TYA}/album/{albumId}",
             timeout=5,
             headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
         )
         
         if delete_resp.ok:
+            upstream.invalidate_entity("album", albumId)
+            catalog.changed("album", albumId)
+            upstream.invalidate_entity("artist", album_data.get('artistId'))
             return JSONResponse(content={"message": "Álbum eliminado exitosamente"})
         else:
             error_data = delete_resp.json() if delete_resp.text else {"error": "Error desconocido"}
             return JSONResponse(content=error_data, status_code=delete_resp.status_code)
     
     except requests.RequestException as e:
-        print(f"Error eliminando álbum: {e}")
+        logger.error("Error eliminando álbum: %s", e)
         return JSONResponse(content={"error": "Error al eliminar el álbum"}, status_code=500)
 
 
@@ -979,94 +1096,57 @@ def get_album(request: Request, albumId: int):
     
     try:
         # Obtener información del álbum
-        album_resp = requests.get(f"{servers.TYA}/album/{albumId}", timeout=2, headers={"Accept": "application/json"})
-        album_resp.raise_for_status()
-        album_data = album_resp.json()
-        
+        album = upstream.get_entity("album", albumId)
+
         # Resolver artista principal del álbum
+        artists = {}
         try:
-            artist_resp = requests.get(f"{servers.TYA}/artist/{album_data['artistId']}", timeout=2, headers={"Accept": "application/json"})
-            artist_resp.raise_for_status()
-            album_data['artist'] = artist_resp.json()
+            artists[album['artistId']] = upstream.get_entity("artist", album['artistId'])
         except requests.RequestException:
-            album_data['artist'] = {"artistId": album_data['artistId'], "artisticName": "Artista desconocido"}
-        
+            pass
+
         # Resolver géneros
-        genres = []
-        if album_data.get('genres'):
+        all_genres = []
+        if album.get('genres'):
             try:
-                genres_resp = requests.get(f"{servers.TYA}/genres", timeout=2, headers={"Accept": "application/json"})
-                genres_resp.raise_for_status()
-                all_genres = genres_resp.json()
-                genres = [g for g in all_genres if g['id'] in album_data['genres']]
+                all_genres = upstream.get_genres()
             except requests.RequestException:
                 pass
-        album_data['genres_data'] = genres
-        
-        # Resolver canciones del álbum usando /song/list
+
+        # Resolver canciones del álbum usando /song/list y sus artistas
         songs = []
-        if album_data.get('songs'):
+        if album.get('songs'):
             try:
                 # Obtener todas las canciones en una sola petición
-                song_ids = ','.join(str(sid) for sid in album_data['songs'])
-                songs_resp = requests.get(f"{servers.TYA}/song/list?ids={song_ids}", timeout=2, headers={"Accept": "application/json"})
+                song_ids = ','.join(str(sid) for sid in album['songs'])
+                songs_resp = upstream.get(f"{servers.TYA}/song/list?ids={song_ids}", timeout=2, headers={"Accept": "application/json"})
                 songs_resp.raise_for_status()
-                songs_list = songs_resp.json()
-                
-                # Resolver artistas de las canciones
-                for song_data in songs_list:
+                songs = upstream.decode(songs_resp, List[models.SongSummary])
+                for artist_id in {song.artistId for song in songs} - artists.keys() - {None}:
                     try:
-                        song_artist_resp = requests.get(f"{servers.TYA}/artist/{song_data['artistId']}", timeout=2, headers={"Accept": "application/json"})
-                        song_artist_resp.raise_for_status()
-                        song_data['artist'] = song_artist_resp.json()
+                        artists[artist_id] = upstream.get_entity("artist", artist_id)
                     except requests.RequestException:
-                        song_data['artist'] = {"artistId": song_data['artistId'], "artisticName": "Artista desconocido"}
-                    songs.append(song_data)
+                        pass
             except requests.RequestException:
                 pass  # Si no se pueden cargar, dejar vacío
-        
-        # Ordenar canciones por albumOrder si existe (None se trata como 999 para ordenar al final)
-        songs = sorted(songs, key=lambda x: x.get('albumOrder') if x.get('albumOrder') is not None else 999)
-        album_data['songs_data'] = songs
-        
+
         # Resolver álbumes relacionados del mismo artista usando el campo owner_albums del artista
         related_albums = []
-        if album_data.get('artist') and album_data['artist'].get('owner_albums'):
+        related_ids = viewmodels.related_album_ids(albumId, artists.get(album['artistId']))
+        if related_ids:
             try:
-                # Excluir el álbum actual y tomar máximo 6
-                related_ids = [aid for aid in album_data['artist']['owner_albums'] if aid != albumId][:6]
-                if related_ids:
-                    related_ids_str = ','.join(str(aid) for aid in related_ids)
-                    related_resp = requests.get(f"{servers.TYA}/album/list?ids={related_ids_str}", timeout=2, headers={"Accept": "application/json"})
-                    related_resp.raise_for_status()
-                    related_albums = related_resp.json()
+                related_ids_str = ','.join(str(aid) for aid in related_ids)
+                related_resp = upstream.get(f"{servers.TYA}/album/list?ids={related_ids_str}", timeout=2, headers={"Accept": "application/json"})
+                related_resp.raise_for_status()
+                related_albums = upstream.decode(related_resp, List[models.AlbumSummary])
             except requests.RequestException:
                 pass  # Si no se pueden cargar, dejar vacío
-        album_data['related_albums'] = related_albums
-        
-        # Asegurarse de que el precio sea un número
-        try:
-            album_data['price'] = float(album_data.get('price', 0))
-        except ValueError:
-            album_data['price'] = 0.0
-        
-        # Calcular duración total del álbum
-        total_duration = 0
-        for song in songs:
-            if song.get('duration'):
-                try:
-                    total_duration += int(song['duration'])
-                except (ValueError, TypeError):
-                    pass  # Si no se puede convertir, ignorar
-        
-        # Formatear duración total
-        minutes = total_duration // 60
-        seconds = total_duration % 60
-        tiempo_formateado = f"{minutes}:{seconds:02d}"
+
+        album_data, tiempo_formateado = viewmodels.build_album(album, artists, all_genres, songs, related_albums)
         
-        # Determinar si está en favoritos y carrito (por ahora False, implementar después)
-        isLiked = False
-        inCarrito = False
+        # Determinar si está en favoritos y carrito
+        isLiked = is_favorite(obtain_favorites(token, userdata), "albums", albumId)
+        inCarrito = cart.contains(obtain_cart(request, token, userdata), "album", albumId)
         
         # Determinar tipo de usuario (0: no autenticado, 1: usuario, 2: artista)
         tipoUsuario = 0
@@ -1097,7 +1177,7 @@ def get_album_edit_page(request: Request, albumId: int):
     
     try:
         # Obtener datos del álbum
-        album_resp = requests.get(f"{servers.TYA}/album/{albumId}", timeout=5, headers={"Accept": "application/json"})
+        album_resp = upstream.get(f"{servers.TYA}/album/{albumId}", timeout=5, headers={"Accept": "application/json"})
         album_resp.raise_for_status()
         album_data = album_resp.json()
         
@@ -1107,7 +1187,7 @@ def get_album_edit_page(request: Request, albumId: int):
         
         # Obtener canciones disponibles del artista
         try:
-            songs_resp = requests.get(f"{servers.TYA}/artist/{userdata.get('artistId')}/songs", timeout=5, headers={"Accept": "application/json"})
+            songs_resp = upstream.get(f"{servers.TYA}/artist/{userdata.get('artistId')}/songs", timeout=5, headers={"Accept": "application/json"})
             songs_resp.raise_for_status()
             artist_songs = songs_resp.json()
         except requests.RequestException:
@@ -1118,7 +1198,7 @@ def get_album_edit_page(request: Request, albumId: int):
         return osv.get_album_edit_view(request, userdata, album_data, servers.TYA)
         
     except requests.RequestException as e:
-        print(f"Error obteniendo datos del álbum: {e}")
+        logger.error("Error obteniendo datos del álbum: %s", e)
         return osv.get_error_view(request, userdata, "No se pudo cargar los datos del álbum", str(e))
 
 
@@ -1138,7 +1218,7 @@ async def update_album(request: Request, albumId: int):
     
     try:
         # Primero verificar propiedad
-        album_resp = requests.get(f"{servers.TYA}/album/{albumId}", timeout=2, headers={"Accept": "application/json"})
+        album_resp = upstream.get(f"{servers.TYA}/album/{albumId}", timeout=2, headers={"Accept": "application/json"})
         album_resp.raise_for_status()
         album_data = album_resp.json()
         
@@ -1149,13 +1229,15 @@ async def update_album(request: Request, albumId: int):
         body = await request.json()
         
         # Enviar actualización a TYA
-        update_resp = requests.patch(
+        update_resp = upstream.patch(
             f"{servers.TYA}/album/{albumId}",
             json=body,
             timeout=5,
             headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
         )
         update_resp.raise_for_status()
+        upstream.invalidate_entity("album", albumId)
+        catalog.changed("album", albumId)
         
         return JSONResponse(content={"message": "Álbum actualizado correctamente", "albumId": albumId}, status_code=200)
         
@@ -1181,7 +1263,7 @@ async def delete_merch(request: Request, merchId: int):
     
     try:
         # Primero obtener los datos del merch para verificar la propiedad
-        merch_resp = requests.get(f"{servers.TYA}/merch/{merchId}", timeout=2, headers={"Accept": "application/json"})
+        merch_resp = upstream.get(f"{servers.TYA}/merch/{merchId}", timeout=2, headers={"Accept": "application/json"})
         merch_resp.raise_for_status()
         merch_data = merch_resp.json()
         
@@ -1190,20 +1272,23 @@ async def delete_merch(request: Request, merchId: int):
             return JSONResponse(content={"error": "No tienes permisos para eliminar este producto"}, status_code=403)
         
         # Eliminar el merchandising
-        delete_resp = requests.delete(
+        delete_resp = upstream.delete(
             f"{servers.TYA}/merch/{merchId}",
             timeout=5,
             headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
         )
         
         if delete_resp.ok:
+            upstream.invalidate_entity("merch", merchId)
+            catalog.changed("merch", merchId)
+            upstream.invalidate_entity("artist", merch_data.get('artistId'))
             return JSONResponse(content={"message": "Producto eliminado exitosamente"})
         else:
             error_data = delete_resp.json() if delete_resp.text else {"error": "Error desconocido"}
             return JSONResponse(content=error_data, status_code=delete_resp.status_code)
     
     except requests.RequestException as e:
-        print(f"Error eliminando merchandising: {e}")
+        logger.error("Error eliminando merchandising: %s", e)
         return JSONResponse(content={"error": "Error al eliminar el producto"}, status_code=500)
 
 
@@ -1217,15 +1302,11 @@ def get_merch(request: Request, merchId: int):
     
     try:
         # Obtener información del merch
-        merch_resp = requests.get(f"{servers.TYA}/merch/{merchId}", timeout=2, headers={"Accept": "application/json"})
-        merch_resp.raise_for_status()
-        merch_data = merch_resp.json()
+        merch_data = upstream.get_entity("merch", merchId)
         
         # Resolver artista principal del merch
         try:
-            artist_resp = requests.get(f"{servers.TYA}/artist/{merch_data['artistId']}", timeout=2, headers={"Accept": "application/json"})
-            artist_resp.raise_for_status()
-            merch_data['artist'] = artist_resp.json()
+            merch_data['artist'] = upstream.get_entity("artist", merch_data['artistId'])
         except requests.RequestException:
             merch_data['artist'] = {"artistId": merch_data['artistId'], "artisticName": "Artista desconocido"}
         
@@ -1237,7 +1318,7 @@ def get_merch(request: Request, merchId: int):
                 related_ids = [mid for mid in merch_data['artist']['owner_merch'] if mid != merchId][:6]
                 if related_ids:
                     related_ids_str = ','.join(str(mid) for mid in related_ids)
-                    related_resp = requests.get(f"{servers.TYA}/merch/list?ids={related_ids_str}", timeout=2, headers={"Accept": "application/json"})
+                    related_resp = upstream.get(f"{servers.TYA}/merch/list?ids={related_ids_str}", timeout=2, headers={"Accept": "application/json"})
                     related_resp.raise_for_status()
                     related_merch = related_resp.json()
             except requests.RequestException:
@@ -1250,9 +1331,9 @@ def get_merch(request: Request, merchId: int):
         except ValueError:
             merch_data['price'] = 0.0
         
-        # Determinar si está en favoritos y carrito (por ahora False, implementar después)
-        isLiked = False
-        inCarrito = False
+        # Determinar si está en favoritos y carrito
+        isLiked = is_favorite(obtain_favorites(token, userdata), "merch", merchId)
+        inCarrito = cart.contains(obtain_cart(request, token, userdata), "merch", merchId)
         
         # Determinar tipo de usuario (0: no autenticado, 1: usuario, 2: artista)
         tipoUsuario = 0
@@ -1264,7 +1345,7 @@ def get_merch(request: Request, merchId: int):
         
     except requests.RequestException as e:
         # En caso de error, mostrar página de error
-        print(e)
+        logger.error("Error cargando el merchandising: %s", e)
         return osv.get_error_view(request, userdata, f"No se pudo cargar el producto de merchandising", str(e))
 
 
@@ -1285,7 +1366,7 @@ def get_merch_edit_page(request: Request, merchId: int):
     
     try:
         # Obtener datos del merchandising
-        merch_resp = requests.get(f"{servers.TYA}/merch/{merchId}", timeout=5, headers={"Accept": "application/json"})
+        merch_resp = upstream.get(f"{servers.TYA}/merch/{merchId}", timeout=5, headers={"Accept": "application/json"})
         merch_resp.raise_for_status()
         merch_data = merch_resp.json()
         
@@ -1296,7 +1377,7 @@ def get_merch_edit_page(request: Request, merchId: int):
         return osv.get_merch_edit_view(request, userdata, merch_data, servers.TYA)
         
     except requests.RequestException as e:
-        print(f"Error obteniendo datos del merchandising: {e}")
+        logger.error("Error obteniendo datos del merchandising: %s", e)
         return osv.get_error_view(request, userdata, "No se pudo cargar los datos del producto", str(e))
 
 
@@ -1316,7 +1397,7 @@ async def update_merch(request: Request, merchId: int):
     
     try:
         # Primero verificar propiedad
-        merch_resp = requests.get(f"{servers.TYA}/merch/{merchId}", timeout=2, headers={"Accept": "application/json"})
+        merch_resp = upstream.get(f"{servers.TYA}/merch/{merchId}", timeout=2, headers={"Accept": "application/json"})
         merch_resp.raise_for_status()
         merch_data = merch_resp.json()
         
@@ -1327,13 +1408,15 @@ async def update_merch(request: Request, merchId: int):
         body = await request.json()
         
         # Enviar actualización a TYA
-        update_resp = requests.patch(
+        update_resp = upstream.patch(
             f"{servers.TYA}/merch/{merchId}",
             json=body,
             timeout=5,
             headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
         )
         update_resp.raise_for_status()
+        upstream.invalidate_entity("merch", merchId)
+        catalog.changed("merch", merchId)
         
         return JSONResponse(content={"message": "Producto actualizado correctamente", "merchId": merchId}, status_code=200)
         
@@ -1356,7 +1439,7 @@ def get_label(request: Request, labelId: int):
     
     try:
         # Obtener información de la discográfica
-        label_resp = requests.get(f"{servers.TYA}/label/{labelId}", timeout=2, headers={"Accept": "application/json"})
+        label_resp = upstream.get(f"{servers.TYA}/label/{labelId}", timeout=2, headers={"Accept": "application/json"})
         label_resp.raise_for_status()
         label_data = label_resp.json()
         
@@ -1365,7 +1448,7 @@ def get_label(request: Request, labelId: int):
         if label_data.get('artists'):
             for artist_id in label_data['artists']:
                 try:
-                    artist_resp = requests.get(f"{servers.TYA}/artist/{artist_id}", timeout=2, headers={"Accept": "application/json"})
+                    artist_resp = upstream.get(f"{servers.TYA}/artist/{artist_id}", timeout=2, headers={"Accept": "application/json"})
                     artist_resp.raise_for_status()
                     artists.append(artist_resp.json())
                 except requests.RequestException:
@@ -1380,7 +1463,7 @@ def get_label(request: Request, labelId: int):
         return osv.get_label_view(request, label_data, is_owner, is_member, userdata, servers.SYU)
         
     except requests.RequestException as e:
-        print(e)
+        logger.error("Error cargando la discográfica: %s", e)
         return osv.get_error_view(request, userdata, "No se pudo cargar la discográfica", str(e))
 
 
@@ -1397,7 +1480,7 @@ def get_label_create(request: Request):
     
     # Verificar si el usuario ya tiene una discográfica
     try:
-        existing_label_resp = requests.get(f"{servers.TYA}/user/{userdata.get('userId')}/label", timeout=2, headers={"Accept": "application/json"})
+        existing_label_resp = upstream.get(f"{servers.TYA}/user/{userdata.get('userId')}/label", timeout=2, headers={"Accept": "application/json"})
         if existing_label_resp.ok:
             existing_label = existing_label_resp.json()
             if existing_label:
@@ -1421,7 +1504,7 @@ def get_label_edit(request: Request, labelId: int):
     
     try:
         # Obtener información de la discográfica
-        label_resp = requests.get(f"{servers.TYA}/label/{labelId}", timeout=2, headers={"Accept": "application/json"})
+        label_resp = upstream.get(f"{servers.TYA}/label/{labelId}", timeout=2, headers={"Accept": "application/json"})
         label_resp.raise_for_status()
         label_data = label_resp.json()
         
@@ -1432,7 +1515,7 @@ def get_label_edit(request: Request, labelId: int):
         return osv.get_label_create_view(request, label_data, userdata, servers.SYU)
         
     except requests.RequestException as e:
-        print(e)
+        logger.error("Error cargando la discográfica para editar: %s", e)
         return osv.get_error_view(request, userdata, "No se pudo cargar la discográfica", str(e))
 
 
@@ -1454,7 +1537,7 @@ async def create_label(request: Request):
         body['ownerId'] = userdata.get('userId')
         
         # Crear la discográfica en la API
-        label_resp = requests.post(
+        label_resp = upstream.post(
             f"{servers.TYA}/label",
             json=body,
             timeout=2,
@@ -1469,7 +1552,7 @@ async def create_label(request: Request):
             return JSONResponse(content=error_data, status_code=label_resp.status_code)
     
     except Exception as e:
-        print(e)
+        logger.error("Error creando la discográfica: %s", e)
         return JSONResponse(content={"error": "Error al crear la discográfica"}, status_code=500)
 
 
@@ -1486,7 +1569,7 @@ async def update_label(request: Request, labelId: int):
     
     try:
         # Verificar que sea propietario
-        label_resp = requests.get(f"{servers.TYA}/label/{labelId}", timeout=2, headers={"Accept": "application/json"})
+        label_resp = upstream.get(f"{servers.TYA}/label/{labelId}", timeout=2, headers={"Accept": "application/json"})
         label_resp.raise_for_status()
         label_data = label_resp.json()
         
@@ -1496,7 +1579,7 @@ async def update_label(request: Request, labelId: int):
         body = await request.json()
         
         # Actualizar la discográfica
-        update_resp = requests.put(
+        update_resp = upstream.put(
             f"{servers.TYA}/label/{labelId}",
             json=body,
             timeout=2,
@@ -1510,7 +1593,7 @@ async def update_label(request: Request, labelId: int):
             return JSONResponse(content=error_data, status_code=update_resp.status_code)
     
     except Exception as e:
-        print(e)
+        logger.error("Error actualizando la discográfica: %s", e)
         return JSONResponse(content={"error": "Error al actualizar la discográfica"}, status_code=500)
 
 
@@ -1527,7 +1610,7 @@ async def delete_label(request: Request, labelId: int):
     
     try:
         # Verificar que sea propietario
-        label_resp = requests.get(f"{servers.TYA}/label/{labelId}", timeout=2, headers={"Accept": "application/json"})
+        label_resp = upstream.get(f"{servers.TYA}/label/{labelId}", timeout=2, headers={"Accept": "application/json"})
         label_resp.raise_for_status()
         label_data = label_resp.json()
         
@@ -1535,7 +1618,7 @@ async def delete_label(request: Request, labelId: int):
             return JSONResponse(content={"error": "No tienes permisos"}, status_code=403)
         
         # Eliminar la discográfica
-        delete_resp = requests.delete(
+        delete_resp = upstream.delete(
             f"{servers.TYA}/label/{labelId}",
             timeout=2,
             headers={"Accept": "application/json"}
@@ -1548,7 +1631,7 @@ async def delete_label(request: Request, labelId: int):
             return JSONResponse(content=error_data, status_code=delete_resp.status_code)
     
     except Exception as e:
-        print(e)
+        logger.error("Error eliminando la discográfica: %s", e)
         return JSONResponse(content={"error": "Error al eliminar la discográfica"}, status_code=500)
 
 
@@ -1565,7 +1648,7 @@ async def join_label(request: Request, labelId: int):
     
     try:
         # Unirse a la discográfica
-        join_resp = requests.post(
+        join_resp = upstream.post(
             f"{servers.TYA}/label/{labelId}/artist/{userdata.get('artistId')}",
             timeout=2,
             headers={"Accept": "application/json"}
@@ -1578,7 +1661,7 @@ async def join_label(request: Request, labelId: int):
             return JSONResponse(content=error_data, status_code=join_resp.status_code)
     
     except Exception as e:
-        print(e)
+        logger.error("Error uniéndose a la discográfica: %s", e)
         return JSONResponse(content={"error": "Error al unirse"}, status_code=500)
 
 
@@ -1595,7 +1678,7 @@ async def leave_label(request: Request, labelId: int):
     
     try:
         # Salir de la discográfica
-        leave_resp = requests.delete(
+        leave_resp = upstream.delete(
             f"{servers.TYA}/label/{labelId}/artist/{userdata.get('artistId')}",
             timeout=2,
             headers={"Accept": "application/json"}
@@ -1608,7 +1691,7 @@ async def leave_label(request: Request, labelId: int):
             return JSONResponse(content=error_data, status_code=leave_resp.status_code)
     
     except Exception as e:
-        print(e)
+        logger.error("Error saliendo de la discográfica: %s", e)
         return JSONResponse(content={"error": "Error al salir"}, status_code=500)
 
 
@@ -1625,7 +1708,7 @@ async def remove_artist_from_label(request: Request, labelId: int, artistId: int
     
     try:
         # Verificar que sea propietario
-        label_resp = requests.get(f"{servers.TYA}/label/{labelId}", timeout=2, headers={"Accept": "application/json"})
+        label_resp = upstream.get(f"{servers.TYA}/label/{labelId}", timeout=2, headers={"Accept": "application/json"})
         label_resp.raise_for_status()
         label_data = label_resp.json()
         
@@ -1633,7 +1716,7 @@ async def remove_artist_from_label(request: Request, labelId: int, artistId: int
             return JSONResponse(content={"error": "No tienes permisos"}, status_code=403)
         
         # Eliminar artista
-        remove_resp = requests.delete(
+        remove_resp = upstream.delete(
             f"{servers.TYA}/label/{labelId}/artist/{artistId}",
             timeout=2,
             headers={"Accept": "application/json"}
@@ -1646,7 +1729,7 @@ async def remove_artist_from_label(request: Request, labelId: int, artistId: int
             return JSONResponse(content=error_data, status_code=remove_resp.status_code)
     
     except Exception as e:
-        print(e)
+        logger.error("Error eliminando artista de la discográfica: %s", e)
         return JSONResponse(content={"error": "Error al eliminar artista"}, status_code=500)
 
 
@@ -1706,7 +1789,7 @@ def get_profile(request: Request):
         # Obtener métodos de pago del usuario
         payment_methods = []
         try:
-            payment_resp = requests.get(
+            payment_resp = upstream.get(
                 f"{servers.SYU}/user/{userdata.get('userId')}/payment-methods",
                 timeout=2,
                 headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
@@ -1734,7 +1817,7 @@ def get_profile(request: Request):
         )
         
     except Exception as e:
-        print(e)
+        logger.error("Error cargando el perfil: %s", e)
         return osv.get_error_view(request, userdata, "No se pudo cargar el perfil", str(e))
 
 
@@ -1748,7 +1831,7 @@ def get_user_profile(request: Request, username: str):
     
     try:
         # Obtener información del usuario
-        user_resp = requests.get(
+        user_resp = upstream.get(
             f"{servers.SYU}/user/{username}",
             timeout=2,
             headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
@@ -1763,7 +1846,7 @@ def get_user_profile(request: Request, username: str):
         payment_methods = []
         if is_own_profile:
             try:
-                payment_resp = requests.get(
+                payment_resp = upstream.get(
                     f"{servers.SYU}/user/{userdata.get('userId')}/payment-methods",
                     timeout=2,
                     headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
@@ -1808,7 +1891,7 @@ def get_payment_methods(request: Request):
     
     try:
         # Llamar al microservicio TPP para obtener métodos de pago
-        response = requests.get(
+        response = upstream.get(
             f"{servers.TPP}/payment",
             timeout=5,
             headers={
@@ -1818,12 +1901,12 @@ def get_payment_methods(request: Request):
         )
         
         if response.ok:
-            return JSONResponse(content=response.json(), status_code=200)
+            return proxy.passthrough(response)
         else:
             return JSONResponse(content={"error": "No se pudo obtener los métodos de pago"}, status_code=response.status_code)
             
     except requests.RequestException as e:
-        print(f"Error obteniendo métodos de pago: {e}")
+        logger.error("Error obteniendo métodos de pago: %s", e)
         return JSONResponse(content={"error": "Error de conexión con el servicio de pagos"}, status_code=500)
 
 
@@ -1833,7 +1916,7 @@ async def add_payment_method(request: Request):
     Agregar un nuevo método de pago
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
+    userdata = await run_in_threadpool(obtain_user_data, token)
     
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
@@ -1882,8 +1965,9 @@ async def add_payment_method(request: Request):
             "cardNumber": masked_card
         }
         
-        # Enviar al microservicio TPP
-        response = requests.post(
+        # Enviar al microservicio TPP (en el pool de hilos, sin bloquear el event loop)
+        response = await run_in_threadpool(
+            upstream.post,
             f"{servers.TPP}/payment",
             json=payment_data,
             timeout=5,
@@ -1895,7 +1979,7 @@ async def add_payment_method(request: Request):
         )
         
         if response.ok:
-            return JSONResponse(content=response.json(), status_code=200)
+            return proxy.passthrough(response)
         else:
             error_msg = "No se pudo agregar el método de pago"
             try:
@@ -1906,10 +1990,10 @@ async def add_payment_method(request: Request):
             return JSONResponse(content={"error": error_msg}, status_code=response.status_code)
             
     except requests.RequestException as e:
-        print(f"Error agregando método de pago: {e}")
+        logger.error("Error agregando método de pago: %s", e)
         return JSONResponse(content={"error": "Error de conexión con el servicio de pagos"}, status_code=500)
     except Exception as e:
-        print(f"Error inesperado: {e}")
+        logger.error("Error inesperado: %s", e)
         return JSONResponse(content={"error": "Error al procesar la solicitud"}, status_code=500)
 
 
@@ -1970,7 +2054,7 @@ async def update_profile(request: Request):
         
         # Hacer PATCH al microservicio SYU
         username = userdata.get('username')
-        resp = requests.patch(
+        resp = upstream.patch(
             f"{servers.SYU}/user/{username}",
             data=update_data,
             files=files,
@@ -1998,27 +2082,39 @@ async def add_to_cart(request: Request):
     Proxea la llamada a TPP /cart
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
+    userdata = await run_in_threadpool(obtain_user_data, token)
     
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
     
     try:
         body = await request.json()
+    except ValueError:
+        return JSONResponse(content={"error": "Cuerpo JSON inválido"}, status_code=400)
+    if not isinstance(body, dict):
+        return JSONResponse(content={"error": "Cuerpo JSON inválido"}, status_code=400)
+    try:
+        cart.parse_units(body.get("unidades"))
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    try:
         # Agregar ID de usuario al body
         body['userId'] = userdata.get('userId')
         
-        # Enviar a TPP
-        cart_resp = requests.post(
+        # Enviar a TPP (en el pool de hilos, sin bloquear el event loop)
+        cart_resp = await run_in_threadpool(
+            upstream.post,
             f"{servers.TPP}/cart",
             json=body,
             timeout=2,
             headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
         )
         cart_resp.raise_for_status()
+        await run_in_threadpool(cart.added, userdata.get('userId'), body)
         return JSONResponse(content=cart_resp.json(), status_code=cart_resp.status_code)
     except requests.RequestException as e:
-        print(f"Error añadiendo al carrito: {e}")
+        logger.error("Error añadiendo al carrito: %s", e)
         return JSONResponse(content={"error": "No se pudo añadir al carrito"}, status_code=500)
 
 
@@ -2029,7 +2125,7 @@ async def remove_from_cart(request: Request, product_id: int, type: str = None):
     Proxea la llamada a TPP DELETE /cart/{productId}?type={type}
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
+    userdata = await run_in_threadpool(obtain_user_data, token)
     
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
@@ -2041,104 +2137,99 @@ async def remove_from_cart(request: Request, product_id: int, type: str = None):
             url += f"?type={type}"
         
         # Enviar a TPP
-        cart_resp = requests.delete(
-            url,
-            timeout=2,
-            headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
-        )
+        cart_resp = await proxy.send(request, "DELETE", url, timeout=2)
         cart_resp.raise_for_status()
-        return JSONResponse(content=cart_resp.json(), status_code=cart_resp.status_code)
+        cart.removed(userdata.get('userId'), product_id, type)
+        return proxy.passthrough(cart_resp)
     except requests.RequestException as e:
-        print(f"Error eliminando del carrito: {e}")
+        logger.error("Error eliminando del carrito: %s", e)
         return JSONResponse(content={"error": "No se pudo eliminar del carrito"}, status_code=500)
 
 
-@app.post("/purchase")
-async def process_purchase(request: Request):
+@app.post("/cart/bulk")
+async def bulk_cart(request: Request):
     """
-    Procesa una compra
-    Proxea la llamada a TPP POST /purchase
-    Body esperado: {cartId, paymentMethodId, shippingAddress}
+    Aplica varias altas y bajas del carrito en una sola petición
+    Body esperado: {"operations": [{"op": "add" | "remove", "type": "song" | "album" | "merch", "id": int, "unidades": int}]}
+    Valida todas antes de enviar ninguna a TPP y responde con el resultado de
+    cada una y el resumen actualizado del carrito: {"results": [...], "summary": {...}}
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
-    
+    userdata = await run_in_threadpool(obtain_user_data, token)
+
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
-    
+
     try:
         body = await request.json()
-        # Agregar ID de usuario al body
-        body['userId'] = userdata.get('userId')
-        
-        # Enviar a TPP
-        purchase_resp = requests.post(
-            f"{servers.TPP}/purchase",
-            json=body,
-            timeout=5,
-            headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
-        )
-        purchase_resp.raise_for_status()
-        return JSONResponse(content=purchase_resp.json(), status_code=purchase_resp.status_code)
-    except requests.RequestException as e:
-        print(f"Error procesando compra: {e}")
-        return JSONResponse(content={"error": "No se pudo procesar la compra"}, status_code=500)
+        operations = cart.parse_operations(body.get("operations") if isinstance(body, dict) else None)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
 
+    results = await run_in_threadpool(cart.apply, userdata.get('userId'), token, operations)
+    items = await run_in_threadpool(obtain_cart, request, token, userdata)
+    return JSONResponse(content={"results": results, "summary": cart.summary(items) if items is not None else None})
 
-# ===================== PAYMENT METHODS ENDPOINTS =====================
-@app.get("/payment")
-async def get_payment_methods(request: Request):
+
+@app.post("/purchase")
+async def process_purchase(request: Request):
     """
-    Obtiene los métodos de pago del usuario autenticado
-    Proxea la llamada a TPP GET /payment
+    Encola una compra y responde al momento (202) con el id del pedido
+    Body esperado: {cartId, paymentMethodId, shippingAddress}
+    La cabecera Idempotency-Key es obligatoria y evita cobrar dos veces la misma
+    compra: repetirla devuelve el pedido ya creado. El estado se consulta en
+    GET /purchase/{checkoutId}
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
+    userdata = await run_in_threadpool(obtain_user_data, token)
     
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
+
+    key = request.headers.get("Idempotency-Key", "").strip()
+    if not key:
+        return JSONResponse(content={"error": "Falta la cabecera Idempotency-Key"}, status_code=400)
     
     try:
-        payment_resp = requests.get(
-            f"{servers.TPP}/payment",
-            timeout=2,
-            headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
-        )
-        payment_resp.raise_for_status()
-        return JSONResponse(content=payment_resp.json(), status_code=payment_resp.status_code)
-    except requests.RequestException as e:
-        print(f"Error obteniendo métodos de pago: {e}")
-        return JSONResponse(content={"error": "No se pudo obtener métodos de pago"}, status_code=500)
+        body = await request.json()
+    except ValueError:
+        return JSONResponse(content={"error": "Cuerpo JSON inválido"}, status_code=400)
+    if not isinstance(body, dict):
+        return JSONResponse(content={"error": "Cuerpo JSON inválido"}, status_code=400)
+    # Agregar ID de usuario al body
+    body['userId'] = userdata.get('userId')
 
+    try:
+        job, created = checkout.submit(userdata.get('userId'), token, body, key)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=422)
+    except checkout.QueueFull:
+        logger.warning("Cola de compras llena")
+        return JSONResponse(content={"error": "Hay demasiadas compras en curso, inténtalo de nuevo en unos segundos"},
+                            status_code=503, headers={"Retry-After": "5"})
+    return JSONResponse(content=job.to_dict(), status_code=202 if created else 200,
+                        headers={"Location": f"/purchase/{job.id}"})
 
-@app.post("/payment")
-async def add_payment_method(request: Request):
+
+@app.get("/purchase/{checkout_id}")
+def get_purchase_status(request: Request, checkout_id: str):
     """
-    Agrega un nuevo método de pago
-    Proxea la llamada a TPP POST /payment
+    Estado de un pedido encolado con POST /purchase:
+    {checkoutId, status: pending | processing | done | failed | unknown, purchaseId, error}
     """
     token = request.cookies.get("oversound_auth")
     userdata = obtain_user_data(token)
-    
+
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
-    
-    try:
-        body = await request.json()
-        
-        payment_resp = requests.post(
-            f"{servers.TPP}/payment",
-            json=body,
-            timeout=2,
-            headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
-        )
-        payment_resp.raise_for_status()
-        return JSONResponse(content=payment_resp.json(), status_code=payment_resp.status_code)
-    except requests.RequestException as e:
-        print(f"Error añadiendo método de pago: {e}")
-        return JSONResponse(content={"error": "No se pudo añadir el método de pago"}, status_code=500)
+
+    job = checkout.get(userdata.get('userId'), checkout_id)
+    if job is None:
+        return JSONResponse(content={"error": "Pedido no encontrado"}, status_code=404)
+    return JSONResponse(content=job.to_dict(), headers={"Cache-Control": "no-store"})
 
 
+# ===================== PAYMENT METHODS ENDPOINTS =====================
 @app.put("/payment/{payment_method_id}")
 async def update_payment_method(request: Request, payment_method_id: int):
     """
@@ -2146,24 +2237,17 @@ async def update_payment_method(request: Request, payment_method_id: int):
     Proxea la llamada a TPP PUT /payment/{paymentMethodId}
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
+    userdata = await run_in_threadpool(obtain_user_data, token)
     
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
     
     try:
-        body = await request.json()
-        
-        payment_resp = requests.put(
-            f"{servers.TPP}/payment/{payment_method_id}",
-            json=body,
-            timeout=2,
-            headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
-        )
+        payment_resp = await proxy.send(request, "PUT", f"{servers.TPP}/payment/{payment_method_id}", timeout=2, forward_body=True)
         payment_resp.raise_for_status()
-        return JSONResponse(content=payment_resp.json(), status_code=payment_resp.status_code)
+        return proxy.passthrough(payment_resp)
     except requests.RequestException as e:
-        print(f"Error actualizando método de pago: {e}")
+        logger.error("Error actualizando método de pago: %s", e)
         return JSONResponse(content={"error": "No se pudo actualizar el método de pago"}, status_code=500)
 
 
@@ -2174,25 +2258,41 @@ async def delete_payment_method(request: Request, payment_method_id: int):
     Proxea la llamada a TPP DELETE /payment/{paymentMethodId}
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
+    userdata = await run_in_threadpool(obtain_user_data, token)
     
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
     
     try:
-        payment_resp = requests.delete(
-            f"{servers.TPP}/payment/{payment_method_id}",
-            timeout=2,
-            headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
-        )
+        payment_resp = await proxy.send(request, "DELETE", f"{servers.TPP}/payment/{payment_method_id}", timeout=2)
         payment_resp.raise_for_status()
-        return JSONResponse(content=payment_resp.json(), status_code=payment_resp.status_code)
+        return proxy.passthrough(payment_resp)
     except requests.RequestException as e:
-        print(f"Error eliminando método de pago: {e}")
+        logger.error("Error eliminando método de pago: %s", e)
         return JSONResponse(content={"error": "No se pudo eliminar el método de pago"}, status_code=500)
 
 
 # ===================== FAVORITES ENDPOINTS =====================
+@app.get("/favs/state")
+def get_favorites_state(request: Request):
+    """
+    Ids favoritos del usuario de los cuatro tipos en una sola respuesta:
+    {"songs": [...], "albums": [...], "artists": [...], "merch": [...]}.
+    Sale de la caché por usuario que invalidan las altas y bajas de favoritos.
+    """
+    token = request.cookies.get("oversound_auth")
+    userdata = obtain_user_data(token)
+
+    if not userdata:
+        return JSONResponse(content={"error": "No autenticado"}, status_code=401)
+
+    favorites = obtain_favorites(token, userdata)
+    if favorites is None:
+        return JSONResponse(content={"error": "No se pudieron obtener los favoritos"}, status_code=500)
+    return JSONResponse(content={kind: sorted(ids) for kind, ids in favorites.items()},
+                        headers={"Cache-Control": "private, no-cache"})
+
+
 @app.get("/favs/{content_type}")
 async def get_favorites(request: Request, content_type: str):
     """
@@ -2200,7 +2300,7 @@ async def get_favorites(request: Request, content_type: str):
     Proxea la llamada a SYU GET /favs/{contentType}
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
+    userdata = await run_in_threadpool(obtain_user_data, token)
     
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
@@ -2209,15 +2309,11 @@ async def get_favorites(request: Request, content_type: str):
         return JSONResponse(content={"error": "Tipo de contenido inválido"}, status_code=400)
     
     try:
-        fav_resp = requests.get(
-            f"{servers.SYU}/favs/{content_type}",
-            timeout=2,
-            headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
-        )
+        fav_resp = await proxy.send(request, "GET", f"{servers.SYU}/favs/{content_type}", timeout=2)
         fav_resp.raise_for_status()
-        return JSONResponse(content=fav_resp.json(), status_code=fav_resp.status_code)
+        return proxy.passthrough(fav_resp)
     except requests.RequestException as e:
-        print(f"Error obteniendo favoritos: {e}")
+        logger.error("Error obteniendo favoritos: %s", e)
         return JSONResponse(content={"error": "No se pudieron obtener los favoritos"}, status_code=500)
 
 
@@ -2228,7 +2324,7 @@ async def add_favorite(request: Request, content_type: str, content_id: int):
     Proxea la llamada a SYU POST /favs/{contentType}/{contentId}
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
+    userdata = await run_in_threadpool(obtain_user_data, token)
     
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
@@ -2237,15 +2333,12 @@ async def add_favorite(request: Request, content_type: str, content_id: int):
         return JSONResponse(content={"error": "Tipo de contenido inválido"}, status_code=400)
     
     try:
-        fav_resp = requests.post(
-            f"{servers.SYU}/favs/{content_type}/{content_id}",
-            timeout=2,
-            headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
-        )
+        fav_resp = await proxy.send(request, "POST", f"{servers.SYU}/favs/{content_type}/{content_id}", timeout=2)
+        upstream.invalidate_favorites(userdata.get("userId"))
         fav_resp.raise_for_status()
-        return JSONResponse(content=fav_resp.json(), status_code=fav_resp.status_code)
+        return proxy.passthrough(fav_resp)
     except requests.RequestException as e:
-        print(f"Error añadiendo a favoritos: {e}")
+        logger.error("Error añadiendo a favoritos: %s", e)
         return JSONResponse(content={"error": "No se pudo añadir a favoritos"}, status_code=500)
 
 
@@ -2256,7 +2349,7 @@ async def remove_favorite(request: Request, content_type: str, content_id: int):
     Proxea la llamada a SYU DELETE /favs/{contentType}/{contentId}
     """
     token = request.cookies.get("oversound_auth")
-    userdata = obtain_user_data(token)
+    userdata = await run_in_threadpool(obtain_user_data, token)
     
     if not userdata:
         return JSONResponse(content={"error": "No autenticado"}, status_code=401)
@@ -2265,15 +2358,12 @@ async def remove_favorite(request: Request, content_type: str, content_id: int):
         return JSONResponse(content={"error": "Tipo de contenido inválido"}, status_code=400)
     
     try:
-        fav_resp = requests.delete(
-            f"{servers.SYU}/favs/{content_type}/{content_id}",
-            timeout=2,
-            headers={"Accept": "application/json", "Cookie": f"oversound_auth={token}"}
-        )
+        fav_resp = await proxy.send(request, "DELETE", f"{servers.SYU}/favs/{content_type}/{content_id}", timeout=2)
+        upstream.invalidate_favorites(userdata.get("userId"))
         fav_resp.raise_for_status()
-        return JSONResponse(content=fav_resp.json(), status_code=fav_resp.status_code)
+        return proxy.passthrough(fav_resp)
     except requests.RequestException as e:
-        print(f"Error eliminando de favoritos: {e}")
+        logger.error("Error eliminando de favoritos: %s", e)
         return JSONResponse(content={"error": "No se pudo eliminar de favoritos"}, status_code=500)
 
 
@@ -2318,7 +2408,7 @@ async def create_artist(request: Request):
         body['userId'] = userdata.get('userId')
         
         # Enviar a TYA para crear el artista
-        artist_resp = requests.post(
+        artist_resp = upstream.post(
             f"{servers.TYA}/artist/upload",
             json=body,
             timeout=15,
@@ -2331,7 +2421,7 @@ async def create_artist(request: Request):
             
             # Actualizar el usuario en SYU con el relatedArtist
             try:
-                user_update_resp = requests.patch(
+                user_update_resp = upstream.patch(
                     f"{servers.SYU}/user/{userdata.get('username')}",
                     json={"relatedArtist": artist_id},
                     timeout=5,
@@ -2339,10 +2429,10 @@ async def create_artist(request: Request):
                 )
                 
                 if not user_update_resp.ok:
-                    print(f"Advertencia: No se pudo actualizar el usuario con relatedArtist. Status: {user_update_resp.status_code}")
+                    logger.warning("Advertencia: No se pudo actualizar el usuario con relatedArtist. Status: %s", user_update_resp.status_code)
                     # No fallar la operación, el artista ya fue creado
             except requests.RequestException as e:
-                print(f"Advertencia: Error al actualizar usuario con relatedArtist: {e}")
+                logger.warning("Advertencia: Error al actualizar usuario con relatedArtist: %s", e)
                 # No fallar la operación, el artista ya fue creado
             
             return JSONResponse(content={
@@ -2354,7 +2444,7 @@ async def create_artist(request: Request):
             return JSONResponse(content=error_data, status_code=artist_resp.status_code)
     
     except Exception as e:
-        print(f"Error creando perfil de artista: {e}")
+        logger.error("Error creando perfil de artista: %s", e)
         return JSONResponse(content={"error": "Error al crear el perfil de artista"}, status_code=500)
 
 
@@ -2369,22 +2459,17 @@ def get_artist_profile(request: Request, artistId: int):
     
     try:
         # Obtener información del artista
-        artist_resp = requests.get(
-            f"{servers.TYA}/artist/{artistId}",
-            timeout=15,
-            headers={"Accept": "application/json"}
-        )
-        artist_resp.raise_for_status()
-        artist_data = artist_resp.json()
+        artist_data = upstream.get_entity("artist", artistId, timeout=15)
         
-        # Determinar si es el propio perfil
+        # Determinar si es el propio perfil y si el usuario ya lo sigue
         is_own_profile = userdata and userdata.get('artistId') == artistId
+        isFollowing = is_favorite(obtain_favorites(token, userdata), "artists", artistId)
         
         # Obtener canciones del artista si tiene
         if artist_data.get('owner_songs'):
             try:
                 song_ids = ','.join(str(sid) for sid in artist_data['owner_songs'])
-                songs_resp = requests.get(
+                songs_resp = upstream.get(
                     f"{servers.TYA}/song/list?ids={song_ids}",
                     timeout=15,
                     headers={"Accept": "application/json"}
@@ -2392,14 +2477,14 @@ def get_artist_profile(request: Request, artistId: int):
                 if songs_resp.ok:
                     artist_data['owner_songs'] = songs_resp.json()
             except requests.RequestException as e:
-                print(f"Error obteniendo canciones del artista: {e}")
+                logger.warning("Error obteniendo canciones del artista: %s", e)
                 artist_data['owner_songs'] = []
         
         # Obtener álbumes del artista si tiene
         if artist_data.get('owner_albums'):
             try:
                 album_ids = ','.join(str(aid) for aid in artist_data['owner_albums'])
-                albums_resp = requests.get(
+                albums_resp = upstream.get(
                     f"{servers.TYA}/album/list?ids={album_ids}",
                     timeout=15,
                     headers={"Accept": "application/json"}
@@ -2407,14 +2492,14 @@ def get_artist_profile(request: Request, artistId: int):
                 if albums_resp.ok:
                     artist_data['owner_albums'] = albums_resp.json()
             except requests.RequestException as e:
-                print(f"Error obteniendo álbumes del artista: {e}")
+                logger.warning("Error obteniendo álbumes del artista: %s", e)
                 artist_data['owner_albums'] = []
         
         # Obtener merchandising del artista si tiene
         if artist_data.get('owner_merch'):
             try:
                 merch_ids = ','.join(str(mid) for mid in artist_data['owner_merch'])
-                merch_resp = requests.get(
+                merch_resp = upstream.get(
                     f"{servers.TYA}/merch/list?ids={merch_ids}",
                     timeout=15,
                     headers={"Accept": "application/json"}
@@ -2422,12 +2507,12 @@ def get_artist_profile(request: Request, artistId: int):
                 if merch_resp.ok:
                     artist_data['owner_merch'] = merch_resp.json()
             except requests.RequestException as e:
-                print(f"Error obteniendo merchandising del artista: {e}")
+                logger.warning("Error obteniendo merchandising del artista: %s", e)
                 artist_data['owner_merch'] = []
 
         metrics = None
         try:
-            metrics_resp = requests.get(f"{servers.RYE}/statistics/metrics/artist/{artistId}", timeout=5)
+            metrics_resp = upstream.get(f"{servers.RYE}/statistics/metrics/artist/{artistId}", timeout=5)
             metrics_resp.raise_for_status()
             metrics_data = metrics_resp.json()  # Expecting JSON like {"playbacks": 123, "songs": 5, "popularity": 12}
             metrics = {
@@ -2436,13 +2521,13 @@ def get_artist_profile(request: Request, artistId: int):
                 "popularity": metrics_data.get("popularity", None)
             }
         except requests.RequestException as e:
-            print(f"Error obteniendo métricas del artista: {e}")
+            logger.warning("Error obteniendo métricas del artista: %s", e)
             metrics = {"playbacks": 0, "songs": 0, "popularity": None}
         
-        return osv.get_artist_profile_view(request, artist_data, userdata, is_own_profile, servers.SYU, metrics, servers.TYA, servers.RYE, servers.PT)
+        return osv.get_artist_profile_view(request, artist_data, userdata, is_own_profile, servers.SYU, metrics, servers.TYA, servers.RYE, servers.PT, isFollowing)
         
     except requests.RequestException as e:
-        print(f"Error obteniendo perfil del artista: {e}")
+        logger.error("Error obteniendo perfil del artista: %s", e)
         return osv.get_error_view(request, userdata, "No se pudo cargar el perfil del artista", str(e))
 
 
@@ -2465,7 +2550,7 @@ def get_artist_studio_page(request: Request):
         artist_id = userdata.get('artistId')
         
         # Obtener datos del artista
-        artist_resp = requests.get(
+        artist_resp = upstream.get(
             f"{servers.TYA}/artist/{artist_id}",
             timeout=5,
             headers={"Accept": "application/json"}
@@ -2475,7 +2560,7 @@ def get_artist_studio_page(request: Request):
         
         # Obtener canciones del artista
         try:
-            songs_resp = requests.get(
+            songs_resp = upstream.get(
                 f"{servers.TYA}/artist/{artist_id}/songs",
                 timeout=5,
                 headers={"Accept": "application/json"}
@@ -2487,7 +2572,7 @@ def get_artist_studio_page(request: Request):
         
         # Obtener álbumes del artista
         try:
-            albums_resp = requests.get(
+            albums_resp = upstream.get(
                 f"{servers.TYA}/artist/{artist_id}/albums",
                 timeout=5,
                 headers={"Accept": "application/json"}
@@ -2499,7 +2584,7 @@ def get_artist_studio_page(request: Request):
         
         # Obtener merchandising del artista
         try:
-            merch_resp = requests.get(
+            merch_resp = upstream.get(
                 f"{servers.TPP}/artist/{artist_id}/merch",
                 timeout=5,
                 headers={"Accept": "application/json"}
@@ -2512,7 +2597,7 @@ def get_artist_studio_page(request: Request):
         return osv.get_artist_studio_view(request, artist_data, userdata, servers.SYU)
         
     except requests.RequestException as e:
-        print(f"Error obteniendo datos del estudio del artista: {e}")
+        logger.error("Error obteniendo datos del estudio del artista: %s", e)
         return osv.get_error_view(request, userdata, "No se pudo cargar el estudio del artista", str(e))
 
 
@@ -2533,7 +2618,7 @@ def get_artist_edit_page(request: Request):
     
     try:
         # Obtener datos actuales del artista
-        artist_resp = requests.get(
+        artist_resp = upstream.get(
             f"{servers.TYA}/artist/{userdata.get('artistId')}",
             timeout=5,
             headers={"Accept": "application/json"}
@@ -2544,7 +2629,7 @@ def get_artist_edit_page(request: Request):
         return osv.get_artist_profile_edit_view(request, userdata, artist_data, servers.TYA)
         
     except requests.RequestException as e:
-        print(f"Error obteniendo datos del artista: {e}")
+        logger.error("Error obteniendo datos del artista: %s", e)
         return osv.get_error_view(request, userdata, "No se pudo cargar los datos del artista", str(e))
 
 
@@ -2565,7 +2650,7 @@ def get_specific_artist_edit_page(request: Request, artistId: int):
     
     try:
         # Obtener datos actuales del artista
-        artist_resp = requests.get(
+        artist_resp = upstream.get(
             f"{servers.TYA}/artist/{artistId}",
             timeout=5,
             headers={"Accept": "application/json"}
@@ -2576,7 +2661,7 @@ def get_specific_artist_edit_page(request: Request, artistId: int):
         return osv.get_artist_profile_edit_view(request, userdata, artist_data, servers.TYA)
         
     except requests.RequestException as e:
-        print(f"Error obteniendo datos del artista: {e}")
+        logger.error("Error obteniendo datos del artista: %s", e)
         return osv.get_error_view(request, userdata, "No se pudo cargar los datos del artista", str(e))
 
 
@@ -2622,7 +2707,7 @@ async def update_artist_profile(request: Request):
         
         # Hacer PATCH al microservicio TYA
         artist_id = userdata.get('artistId')
-        resp = requests.patch(
+        resp = upstream.patch(
             f"{servers.TYA}/artist/{artist_id}",
             data=update_data,
             files=files,
@@ -2630,6 +2715,8 @@ async def update_artist_profile(request: Request):
             headers={"Cookie": f"oversound_auth={token}"}
         )
         resp.raise_for_status()
+        upstream.invalidate_entity("artist", artist_id)
+        catalog.changed("artist", artist_id)
         
         return JSONResponse(content={
             "message": "Perfil de artista actualizado correctamente",
@@ -2685,7 +2772,7 @@ async def update_specific_artist_profile(request: Request, artistId: int):
             files = None
         
         # Hacer PATCH al microservicio TYA
-        resp = requests.patch(
+        resp = upstream.patch(
             f"{servers.TYA}/artist/{artistId}",
             data=update_data,
             files=files,
@@ -2693,6 +2780,8 @@ async def update_specific_artist_profile(request: Request, artistId: int):
             headers={"Cookie": f"oversound_auth={token}"}
         )
         resp.raise_for_status()
+        upstream.invalidate_entity("artist", artistId)
+        catalog.changed("artist", artistId)
         
         return JSONResponse(content={
             "message": "Perfil de artista actualizado correctamente",
@@ -2748,7 +2837,7 @@ async def upload_song(request: Request):
         body['artistId'] = userdata.get('artistId')
         
         # Enviar a TYA para crear la canción
-        song_resp = requests.post(
+        song_resp = upstream.post(
             f"{servers.TYA}/song/upload",
             json=body,
             timeout=15,
@@ -2757,6 +2846,9 @@ async def upload_song(request: Request):
         
         if song_resp.ok:
             song_data = song_resp.json()
+            # La lista de contenidos del artista ha cambiado
+            upstream.invalidate_entity("artist", userdata.get('artistId'))
+            catalog.changed("song", song_data.get('songId'))
             return JSONResponse(content={
                 "message": "Canción subida exitosamente",
                 "songId": song_data.get('songId')
@@ -2766,7 +2858,7 @@ async def upload_song(request: Request):
             return JSONResponse(content=error_data, status_code=song_resp.status_code)
     
     except Exception as e:
-        print(f"Error subiendo canción: {e}")
+        logger.error("Error subiendo canción: %s", e)
         return JSONResponse(content={"error": "Error al subir la canción"}, status_code=500)
 
 
@@ -2809,7 +2901,7 @@ async def upload_album(request: Request):
         body['artistId'] = userdata.get('artistId')
         
         # Enviar a TYA para crear el álbum
-        album_resp = requests.post(
+        album_resp = upstream.post(
             f"{servers.TYA}/album/upload",
             json=body,
             timeout=15,
@@ -2818,6 +2910,9 @@ async def upload_album(request: Request):
         
         if album_resp.ok:
             album_data = album_resp.json()
+            # La lista de contenidos del artista ha cambiado
+            upstream.invalidate_entity("artist", userdata.get('artistId'))
+            catalog.changed("album", album_data.get('albumId'))
             return JSONResponse(content={
                 "message": "Álbum creado exitosamente",
                 "albumId": album_data.get('albumId')
@@ -2827,7 +2922,7 @@ async def upload_album(request: Request):
             return JSONResponse(content=error_data, status_code=album_resp.status_code)
     
     except Exception as e:
-        print(f"Error creando álbum: {e}")
+        logger.error("Error creando álbum: %s", e)
         return JSONResponse(content={"error": "Error al crear el álbum"}, status_code=500)
 
 
@@ -2871,7 +2966,7 @@ async def upload_merch(request: Request):
         body['artistId'] = userdata.get('artistId')
         
         # Enviar a TYA para crear el merchandising
-        merch_resp = requests.post(
+        merch_resp = upstream.post(
             f"{servers.TYA}/merch/upload",
             json=body,
             timeout=15,
@@ -2880,6 +2975,9 @@ async def upload_merch(request: Request):
         
         if merch_resp.ok:
             merch_data = merch_resp.json()
+            # La lista de contenidos del artista ha cambiado
+            upstream.invalidate_entity("artist", userdata.get('artistId'))
+            catalog.changed("merch", merch_data.get('merchId'))
             return JSONResponse(content={
                 "message": "Merchandising subido exitosamente",
                 "merchId": merch_data.get('merchId')
@@ -2889,13 +2987,13 @@ async def upload_merch(request: Request):
             return JSONResponse(content=error_data, status_code=merch_resp.status_code)
     
     except Exception as e:
-        print(f"Error subiendo merchandising: {e}")
+        logger.error("Error subiendo merchandising: %s", e)
         return JSONResponse(content={"error": "Error al subir el merchandising"}, status_code=500)
 
 
 # ===================== TRACK PROVIDER ROUTES =====================
 @app.get("/track/{trackId}")
-async def get_track(request: Request, trackId: int):
+def get_track(request: Request, trackId: int):
     """
     Ruta proxy para obtener el audio de una canción desde el Proveedor de Tracks (PT)
     Obtiene el track en base64 desde PT y lo devuelve como audio
@@ -2903,27 +3001,12 @@ async def get_track(request: Request, trackId: int):
     token = request.cookies.get("oversound_auth")
     
     try:
-        # Obtener el track desde el microservicio PT
-        track_resp = requests.get(
-            f"{servers.PT}/track/{trackId}",
-            timeout=10,
-            headers={
-                "Accept": "application/json",
-                "Cookie": f"oversound_auth={token}"
-            }
-        )
-        track_resp.raise_for_status()
+        # Obtener el track desde el microservicio PT (ya decodificado, con caché)
+        audio_bytes = upstream.get_track_audio(trackId, token)
         
-        # La respuesta contiene {"idtrack": int, "track": "base64string"}
-        track_data = track_resp.json()
-        
-        if not track_data.get('track'):
+        if audio_bytes is None:
             return JSONResponse(content={"error": "Track no encontrado"}, status_code=404)
         
-        # Decodificar el base64
-        import base64
-        audio_bytes = base64.b64decode(track_data['track'])
-        
         # Devolver el audio como respuesta binaria
         # El tipo de contenido se determina por las primeras cabeceras del archivo
         # Por defecto usamos audio/mpeg (MP3)
@@ -2933,18 +3016,18 @@ async def get_track(request: Request, trackId: int):
             headers={
                 "Content-Disposition": f"inline; filename=track_{trackId}.mp3",
                 "Accept-Ranges": "bytes",
-                "Cache-Control": "public, max-age=3600"
+                "Cache-Control": "private, max-age=3600"
             }
         )
         
     except requests.RequestException as e:
-        print(f"Error obteniendo track desde PT: {e}")
+        logger.error("Error obteniendo track desde PT: %s", e)
         return JSONResponse(
             content={"error": f"No se pudo obtener el track: {str(e)}"},
             status_code=500
         )
     except Exception as e:
-        print(f"Error procesando track: {e}")
+        logger.error("Error procesando track: %s", e)
         return JSONResponse(
             content={"error": f"Error al procesar el track: {str(e)}"},
             status_code=500
@@ -2954,58 +3037,149 @@ async def get_track(request: Request, trackId: int):
 @app.post('/stats/history/songs')
 async def proxy_stats_songs(request: Request):
     """Proxy para estadísticas de canciones -> reenvía a RYE/history/songs evitando CORS en el navegador"""
-    token = request.cookies.get('oversound_auth')
-    try:
-        body = await request.json()
-    except Exception:
-        return JSONResponse(content={"error": "JSON inválido"}, status_code=400)
-
+    # El cuerpo se reenvía sin decodificar y RYE lo valida; su respuesta, de éxito o de error, llega tal cual
     try:
-        headers = {"Accept": "application/json", "Content-Type": "application/json"}
-        if token:
-            headers["Cookie"] = f"oversound_auth={token}"
-
-        resp = requests.post(f"{servers.RYE}/history/songs", json=body, timeout=5, headers=headers)
-        resp.raise_for_status()
-        return JSONResponse(content=resp.json(), status_code=resp.status_code)
+        resp = await proxy.send(request, "POST", f"{servers.RYE}/history/songs", timeout=5, forward_body=True)
+        return proxy.passthrough(resp)
     except requests.RequestException as e:
-        print(f"Error proxying song stats to RYE: {e}")
-        # intentar devolver el body de respuesta si existe
-        try:
-            if 'resp' in locals() and resp is not None:
-                return JSONResponse(content=resp.json(), status_code=resp.status_code)
-        except Exception:
-            pass
+        logger.error("Error proxying song stats to RYE: %s", e)
         return JSONResponse(content={"error": "No se pudo enviar la estadística"}, status_code=500)
 
 
 @app.post('/stats/history/artists')
 async def proxy_stats_artists(request: Request):
     """Proxy para estadísticas de artistas -> reenvía a RYE/history/artists evitando CORS en el navegador"""
-    token = request.cookies.get('oversound_auth')
+    # El cuerpo se reenvía sin decodificar y RYE lo valida; su respuesta, de éxito o de error, llega tal cual
     try:
-        body = await request.json()
-    except Exception:
-        return JSONResponse(content={"error": "JSON inválido"}, status_code=400)
+        resp = await proxy.send(request, "POST", f"{servers.RYE}/history/artists", timeout=5, forward_body=True)
+        return proxy.passthrough(resp)
+    except requests.RequestException as e:
+        logger.error("Error proxying artist stats to RYE: %s", e)
+        return JSONResponse(content={"error": "No se pudo enviar la estadística"}, status_code=500)
+
+
+
 
+# ===================== ADMIN ROUTES =====================
+@app.get("/admin/slow-requests")
+def get_slow_requests(request: Request):
+    """
+    Devuelve las peticiones lentas registradas con la traza de sus llamadas a microservicios
+    """
+    if not is_admin(request):
+        return JSONResponse(content={"error": "No autorizado"}, status_code=403)
+    return JSONResponse(content={
+        "threshold": settings.SLOW_REQUEST_THRESHOLD,
+        "entries": slowlog.entries()
+    })
+
+
+@app.post("/admin/slow-requests/dump")
+def dump_slow_requests(request: Request):
+    """
+    Vuelca el registro de peticiones lentas al fichero configurado
+    """
+    if not is_admin(request):
+        return JSONResponse(content={"error": "No autorizado"}, status_code=403)
     try:
-        headers = {"Accept": "application/json", "Content-Type": "application/json"}
-        if token:
-            headers["Cookie"] = f"oversound_auth={token}"
+        written = slowlog.dump()
+    except OSError as e:
+        logger.error("Error volcando peticiones lentas: %s", e)
+        return JSONResponse(content={"error": "No se pudo escribir el fichero"}, status_code=500)
+    return JSONResponse(content={"written": written, "file": settings.SLOW_REQUEST_DUMP_FILE})
 
-        resp = requests.post(f"{servers.RYE}/history/artists", json=body, timeout=5, headers=headers)
-        resp.raise_for_status()
-        return JSONResponse(content=resp.json(), status_code=resp.status_code)
-    except requests.RequestException as e:
-        print(f"Error proxying artist stats to RYE: {e}")
-        try:
-            if 'resp' in locals() and resp is not None:
-                return JSONResponse(content=resp.json(), status_code=resp.status_code)
-        except Exception:
-            pass
-        return JSONResponse(content={"error": "No se pudo enviar la estadística"}, status_code=500)
+
+@app.delete("/admin/slow-requests")
+def clear_slow_requests(request: Request):
+    """
+    Vacía el registro de peticiones lentas
+    """
+    if not is_admin(request):
+        return JSONResponse(content={"error": "No autorizado"}, status_code=403)
+    slowlog.clear()
+    return JSONResponse(content={"message": "Registro vaciado"})
+
+
+@app.get("/admin/profiles")
+def get_profiles(request: Request):
+    """
+    Lista los perfiles de petición guardados
+    """
+    if not is_admin(request):
+        return JSONResponse(content={"error": "No autorizado"}, status_code=403)
+    return JSONResponse(content={"profiles": profiler.summaries()})
+
+
+@app.get("/admin/profiles/{profile_id}")
+def get_request_profile(request: Request, profile_id: str, fmt: str = Query("collapsed", alias="format")):
+    """
+    Devuelve un perfil en formato collapsed-stack (texto) o JSON con sus metadatos
+    """
+    if not is_admin(request):
+        return JSONResponse(content={"error": "No autorizado"}, status_code=403)
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return JSONResponse(content={"error": "Perfil no encontrado"}, status_code=404)
+    if fmt == "json":
+        return JSONResponse(content=profile)
+    return Response(content=profile["collapsed"] + "\n", media_type="text/plain; charset=utf-8")
+
+
+@app.get("/admin/memory")
+def get_memory(request: Request):
+    """
+    Memoria del proceso, estado de tracemalloc y tamaño en bytes de cada caché
+    """
+    if not is_admin(request):
+        return JSONResponse(content={"error": "No autorizado"}, status_code=403)
+    return JSONResponse(content=memory.status())
 
 
+@app.post("/admin/memory/tracemalloc")
+def start_tracemalloc(request: Request, frames: int = Query(None, ge=1, le=50)):
+    """
+    Activa tracemalloc
+    """
+    if not is_admin(request):
+        return JSONResponse(content={"error": "No autorizado"}, status_code=403)
+    memory.start(frames)
+    return JSONResponse(content={"message": "tracemalloc activado"})
+
+
+@app.delete("/admin/memory/tracemalloc")
+def stop_tracemalloc(request: Request):
+    """
+    Desactiva tracemalloc y descarta las instantáneas
+    """
+    if not is_admin(request):
+        return JSONResponse(content={"error": "No autorizado"}, status_code=403)
+    memory.stop()
+    return JSONResponse(content={"message": "tracemalloc desactivado"})
+
+
+@app.post("/admin/memory/snapshots")
+def take_memory_snapshot(request: Request):
+    """
+    Toma una instantánea de tracemalloc y devuelve los puntos que más memoria retienen
+    """
+    if not is_admin(request):
+        return JSONResponse(content={"error": "No autorizado"}, status_code=403)
+    if not memory.is_tracing():
+        return JSONResponse(content={"error": "tracemalloc no está activado"}, status_code=409)
+    return JSONResponse(content=memory.take_snapshot())
+
+
+@app.get("/admin/memory/snapshots/{snapshot_id}/diff")
+def diff_memory_snapshots(request: Request, snapshot_id: str, base: str = Query(...)):
+    """
+    Compara la instantánea con otra anterior (`base`) y devuelve dónde ha crecido la memoria
+    """
+    if not is_admin(request):
+        return JSONResponse(content={"error": "No autorizado"}, status_code=403)
+    stats = memory.diff(base, snapshot_id)
+    if stats is None:
+        return JSONResponse(content={"error": "Instantánea no encontrada"}, status_code=404)
+    return JSONResponse(content={"base": base, "snapshot": snapshot_id, "top": stats})
 
 
 @app.exception_handler(RequestValidationError)
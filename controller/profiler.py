@@ -0,0 +1,131 @@
+"""
+Perfilado bajo demanda de una única petición.
+
+Un administrador añade la cabecera `X-Profile: 1` (junto con X-Admin-Token) y
+solo esa petición se ejecuta con un muestreador: un hilo que cada
+FND_PROFILE_SAMPLE_INTERVAL segundos recorre las pilas de todos los hilos
+(`sys._current_frames`) y se queda con las que están ejecutando el endpoint de
+esa petición, tanto en el event loop (rutas async) como en el pool de hilos
+(rutas síncronas). Las muestras en las que la petición no está en ninguna pila
+(esperando en un `await`) se cuentan como `<await>`.
+
+El perfil se guarda en formato collapsed-stack (una línea `pila;de;frames N`),
+compatible con flamegraph.pl y speedscope, en un buffer acotado. El resto del
+tráfico no paga nada: sin la cabecera no se arranca ningún hilo.
+"""
+import os
+import sys
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+
+import controller.settings as settings
+
+_profiles = OrderedDict()
+_lock = threading.Lock()
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler(threading.Thread):
+    """
+    Hilo que muestrea las pilas de la petición identificada por su scope ASGI.
+    """
+
+    def __init__(self, scope: dict):
+        super().__init__(name="fnd-profiler", daemon=True)
+        self.scope = scope
+        self.counts = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(settings.PROFILE_SAMPLE_INTERVAL):
+            self._sample()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def _owns(self, frame) -> bool:
+        # Con varias peticiones concurrentes a la misma ruta se distingue la
+        # nuestra por el objeto Request del endpoint
+        request = frame.f_locals.get("request")
+        return request is None or getattr(request, "scope", None) is self.scope
+
+    def _sample(self):
+        route = self.scope.get("route")
+        endpoint = getattr(getattr(route, "endpoint", None), "__code__", None)
+        if endpoint is None:
+            # Todavía no se ha resuelto la ruta
+            return
+        self.samples += 1
+        me = threading.get_ident()
+        found = False
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame)
+                frame = frame.f_back
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i].f_code is endpoint and self._owns(stack[i]):
+                    self.counts[";".join(_label(f) for f in reversed(stack[:i + 1]))] += 1
+                    found = True
+                    break
+        if not found:
+            self.counts[f"{route.path};<await>"] += 1
+
+
+def start(request) -> Sampler:
+    sampler = Sampler(request.scope)
+    sampler.start()
+    return sampler
+
+
+def finish(sampler: Sampler, request, status_code: int, duration: float) -> str:
+    """
+    Detiene el muestreo, guarda el perfil y devuelve su identificador.
+    """
+    sampler.stop()
+    route = request.scope.get("route")
+    profile_id = uuid.uuid4().hex
+    profile = {
+        "id": profile_id,
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "method": request.method,
+        "route": route.path if route is not None else request.url.path,
+        "path": request.url.path,
+        "query": dict(request.query_params),
+        "status": status_code,
+        "duration": duration,
+        "interval": settings.PROFILE_SAMPLE_INTERVAL,
+        "samples": sampler.samples,
+        "collapsed": "\n".join(f"{stack} {count}" for stack, count in sampler.counts.most_common()),
+    }
+    with _lock:
+        _profiles[profile_id] = profile
+        while len(_profiles) > settings.PROFILE_BUFFER_SIZE:
+            _profiles.popitem(last=False)
+    return profile_id
+
+
+def get(profile_id: str):
+    with _lock:
+        return _profiles.get(profile_id)
+
+
+def summaries() -> list:
+    """
+    Devuelve los perfiles guardados sin las pilas, del más reciente al más antiguo.
+    """
+    with _lock:
+        return [
+            {key: value for key, value in profile.items() if key != "collapsed"}
+            for profile in reversed(_profiles.values())
+        ]
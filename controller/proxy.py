@@ -0,0 +1,60 @@
+"""
+Reenvío directo de respuestas de los microservicios.
+
+Para las rutas JSON que no transforman los datos (carrito, favoritos, métodos
+de pago, estadísticas): en lugar de `JSONResponse(content=resp.json())`, que
+decodifica el cuerpo y lo vuelve a codificar, se devuelven tal cual el estado,
+las cabeceras útiles y los bytes que ha enviado el microservicio.
+
+La llamada se hace con `upstream.request` (métricas, trazas, reintentos y
+fallos inyectados incluidos) en el pool de hilos, para no bloquear el bucle de
+eventos desde las rutas async.
+"""
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+import controller.upstream as upstream
+
+AUTH_COOKIE = "oversound_auth"
+
+# Cabeceras de la respuesta del microservicio que se reenvían al navegador. El
+# resto son de salto (Connection, Transfer-Encoding...), de la conexión con el
+# microservicio (Server, Date) o dejan de ser ciertas: requests ya ha
+# descomprimido el cuerpo (Content-Encoding) y Starlette recalcula Content-Length.
+FORWARDED_HEADERS = ("content-type", "cache-control", "etag", "last-modified", "expires", "retry-after")
+
+
+def upstream_headers(request: Request, content_type: str = None) -> dict:
+    """
+    Cabeceras para el microservicio: Accept JSON y la cookie de sesión del usuario.
+    """
+    headers = {"Accept": "application/json"}
+    token = request.cookies.get(AUTH_COOKIE)
+    if token:
+        headers["Cookie"] = f"{AUTH_COOKIE}={token}"
+    if content_type:
+        headers["Content-Type"] = content_type
+    return headers
+
+
+async def send(request: Request, method: str, url: str, timeout: float, forward_body: bool = False):
+    """
+    Llama al microservicio en nombre de `request`. Con `forward_body` reenvía
+    el cuerpo de la petición sin decodificarlo. Devuelve la `requests.Response`
+    para que la ruta decida qué hacer con los errores.
+    """
+    kwargs = {}
+    content_type = None
+    if forward_body:
+        kwargs["data"] = await request.body()
+        content_type = request.headers.get("content-type", "application/json")
+    headers = upstream_headers(request, content_type)
+    return await run_in_threadpool(upstream.request, method, url, timeout=timeout, headers=headers, **kwargs)
+
+
+def passthrough(resp) -> Response:
+    """
+    Respuesta con el estado, las cabeceras de FORWARDED_HEADERS y los bytes de `resp`.
+    """
+    headers = {name: resp.headers[name] for name in FORWARDED_HEADERS if name in resp.headers}
+    return Response(content=resp.content, status_code=resp.status_code, headers=headers)
@@ -0,0 +1,26 @@
+"""
+Respuesta JSON del FND.
+
+`JSONResponse` sustituye a la de Starlette (json de la biblioteca estándar) en
+todas las rutas y es la clase por defecto de la app. Serializa con orjson, que
+escribe directamente los bytes del cuerpo sin pasar por un str intermedio y
+entiende de forma nativa datetime, date, UUID y claves no str. Además acepta
+los modelos de `controller.models` y los conjuntos.
+"""
+import msgspec
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+def _default(value):
+    if isinstance(value, msgspec.Struct):
+        return msgspec.structs.asdict(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Tipo no serializable a JSON: {type(value).__name__}")
+
+
+class JSONResponse(ORJSONResponse):
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
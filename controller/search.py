@@ -0,0 +1,182 @@
+"""
+Índice de búsqueda local por trigramas para /api/search/*.
+
+Por cada tipo de entidad guarda el nombre normalizado (título o nombre
+artístico en minúsculas, sin tildes ni signos) y, por cada trigrama, la lista
+de ids cuyo nombre lo contiene. Una búsqueda:
+
+1. Normaliza la consulta igual que los nombres ("Canción", "CANCION" y
+   "cancion" son lo mismo; también "año" y "ano").
+2. Cruza las listas de sus trigramas, empezando por la más corta.
+3. Comprueba que la consulta aparece entera en el nombre de cada candidato
+   (los trigramas solo descartan), que es el criterio de /x/search de TYA.
+4. En canciones, álbumes y merch añade las entidades de los artistas cuyo
+   nombre coincide, con menos prioridad que las coincidencias por título.
+5. Ordena: nombre idéntico, empieza por la consulta, alguna palabra empieza
+   por ella, la contiene en otra posición, coincidencia por artista; a
+   igualdad, nombre más corto e id.
+
+Los datos salen del índice del catálogo (`controller.catalog`), que llama a
+`sync` con las entidades que cambian; las listas solo crecen y las entradas
+obsoletas se descartan en el paso 3, hasta que superan a las vivas y se
+reconstruye el índice del tipo. Si el catálogo no está cargado o su última
+comprobación con TYA es más antigua que SEARCH_INDEX_MAX_STALENESS, `query`
+devuelve None y la ruta pregunta a TYA.
+"""
+import re
+import threading
+import time
+import unicodedata
+from array import array
+
+import controller.settings as settings
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+# Peso de cada tipo de coincidencia (menor es mejor)
+EXACT, PREFIX, WORD, INFIX, ARTIST = range(5)
+
+
+def fold(text: str) -> str:
+    """
+    Minúsculas, sin tildes, diéresis ni virgulillas y con los signos
+    convertidos en un espacio: "¡Canción Ñandú!" -> "cancion nandu".
+    """
+    text = unicodedata.normalize("NFD", (text or "").casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+def trigrams(folded: str) -> set:
+    return {folded[i:i + 3] for i in range(len(folded) - 2)}
+
+
+class Index():
+    """
+    Índice de trigramas de los nombres de un tipo de entidad.
+    """
+
+    __slots__ = ("names", "grams", "postings", "live")
+
+    def __init__(self, names: dict = None):
+        self.names = {}
+        self.grams = {}
+        self.postings = 0
+        self.live = 0
+        for entity_id, name in (names or {}).items():
+            self.put(entity_id, name)
+
+    def put(self, entity_id: int, name: str):
+        folded = fold(name)
+        old = self.names.get(entity_id)
+        if old == folded:
+            return
+        if old is not None:
+            self.live -= len(trigrams(old))
+        self.names[entity_id] = folded
+        grams = trigrams(folded)
+        for gram in grams:
+            self.grams.setdefault(gram, array("q")).append(entity_id)
+        self.postings += len(grams)
+        self.live += len(grams)
+
+    def remove(self, entity_id: int):
+        old = self.names.pop(entity_id, None)
+        if old is not None:
+            self.live -= len(trigrams(old))
+
+    def stale(self) -> bool:
+        # Las entradas obsoletas de las listas superan a las vivas
+        return self.postings > 2 * self.live + 1024
+
+    def match(self, folded_query: str) -> dict:
+        """
+        {id: peso} de las entidades cuyo nombre contiene la consulta normalizada.
+        """
+        lists = sorted((self.grams.get(g, ()) for g in trigrams(folded_query)), key=len)
+        if not lists or not lists[0]:
+            return {}
+        candidates = set(lists[0])
+        for ids in lists[1:]:
+            candidates.intersection_update(ids)
+            if not candidates:
+                return {}
+        result = {}
+        for entity_id in candidates:
+            name = self.names.get(entity_id)
+            if name is None:
+                continue
+            position = name.find(folded_query)
+            if position < 0:
+                continue
+            if name == folded_query:
+                result[entity_id] = EXACT
+            elif position == 0:
+                result[entity_id] = PREFIX
+            elif name[position - 1] == " " or f" {folded_query}" in name:
+                result[entity_id] = WORD
+            else:
+                result[entity_id] = INFIX
+        return result
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def sync(kind: str, names: dict, touched=None):
+    """
+    Actualiza el índice de `kind`. Sin `touched`, lo reconstruye con
+    {id: nombre}; con `touched`, `names` trae los nombres de esos ids y los
+    que faltan se quitan.
+    """
+    with _lock:
+        index = _indexes.get(kind)
+        if index is None or touched is None:
+            _indexes[kind] = Index(names)
+            return
+        for entity_id in touched:
+            if entity_id in names:
+                index.put(entity_id, names[entity_id])
+            else:
+                index.remove(entity_id)
+        if index.stale():
+            # fold() es idempotente: los nombres ya normalizados sirven de origen
+            _indexes[kind] = Index(index.names)
+
+
+def is_fresh(refreshed_at) -> bool:
+    return refreshed_at is not None and time.time() - refreshed_at <= settings.SEARCH_INDEX_MAX_STALENESS
+
+
+def query(kind: str, q: str, by_artist=None, limit: int = None):
+    """
+    Ids de `kind` que coinciden con `q`, de mejor a peor. `by_artist(ids)`
+    devuelve las entidades de `kind` de esos artistas. None si el índice no
+    existe o la consulta normalizada tiene menos de 3 caracteres.
+    """
+    index = _indexes.get(kind)
+    folded = fold(q)
+    if index is None or len(folded) < 3:
+        return None
+    scores = index.match(folded)
+    artists = _indexes.get("artist")
+    if by_artist is not None and artists is not None:
+        for entity_id in by_artist(artists.match(folded)):
+            scores.setdefault(entity_id, ARTIST)
+    names = index.names
+    ranked = sorted(scores, key=lambda i: (scores[i], len(names.get(i, "")), i))
+    return ranked[:limit] if limit else ranked
+
+
+def folded(kind: str) -> dict:
+    """
+    {id: nombre normalizado} de `kind` ({} si no hay índice). No se modifica.
+    """
+    index = _indexes.get(kind)
+    return index.names if index is not None else {}
+
+
+def status() -> dict:
+    return {kind: {"entities": len(index.names), "grams": len(index.grams), "postings": index.postings}
+            for kind, index in _indexes.items()}
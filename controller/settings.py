@@ -0,0 +1,107 @@
+"""
+PARÁMETROS DE CONFIGURACIÓN DEL FRONTEND (FND).
+
+Cada valor tiene un valor por defecto razonable para desarrollo y puede
+sobrescribirse con una variable de entorno del mismo nombre con el prefijo
+FND_ (por ejemplo: FND_WARMUP_ENABLED=0).
+"""
+import os
+
+
+def _env(name: str, default):
+    value = os.environ.get(f"FND_{name}")
+    if value is None:
+        return default
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+
+# ===================== CACHÉ DEL CATÁLOGO =====================
+CATALOG_CACHE_TTL = _env("CATALOG_CACHE_TTL", 60.0)        # segundos que vive una canción/álbum/artista en caché
+CATALOG_CACHE_SIZE = _env("CATALOG_CACHE_SIZE", 4096)       # número máximo de entidades cacheadas
+TOP_LISTS_CACHE_TTL = _env("TOP_LISTS_CACHE_TTL", 30.0)     # segundos que viven los top-10 de RYE
+AUDIO_CACHE_TTL = _env("AUDIO_CACHE_TTL", 3600.0)           # segundos que vive un track decodificado
+AUDIO_CACHE_SIZE = _env("AUDIO_CACHE_SIZE", 32)             # número máximo de tracks en memoria
+LISTINGS_CACHE_TTL = _env("LISTINGS_CACHE_TTL", 60.0)       # segundos que vive un producto de la tienda (de /list) en caché
+LISTINGS_CACHE_SIZE = _env("LISTINGS_CACHE_SIZE", 2048)     # número máximo de productos de la tienda cacheados
+FAVORITES_CACHE_TTL = _env("FAVORITES_CACHE_TTL", 120.0)    # segundos que viven los favoritos de un usuario en caché
+FAVORITES_CACHE_SIZE = _env("FAVORITES_CACHE_SIZE", 1024)   # número máximo de usuarios con favoritos cacheados
+CART_CACHE_TTL = _env("CART_CACHE_TTL", 300.0)              # segundos que vive el resumen del carrito de un usuario
+CART_CACHE_SIZE = _env("CART_CACHE_SIZE", 1024)             # número máximo de usuarios con el carrito resumido en caché
+
+# ===================== ÍNDICE DEL CATÁLOGO =====================
+CATALOG_INDEX_ENABLED = _env("CATALOG_INDEX_ENABLED", True)   # resolver en local los filtros de la tienda (ver controller/catalog.py)
+CATALOG_INDEX_REFRESH = _env("CATALOG_INDEX_REFRESH", 60.0)   # segundos entre comprobaciones de altas y bajas en TYA
+CATALOG_INDEX_FULL_RELOAD_EVERY = _env("CATALOG_INDEX_FULL_RELOAD_EVERY", 10)  # cada cuántas comprobaciones se relee el catálogo entero (ediciones hechas fuera del FND; 0 = nunca)
+CATALOG_INDEX_BATCH = _env("CATALOG_INDEX_BATCH", 500)        # ids por petición a /list al cargar el índice
+SEARCH_INDEX_MAX_STALENESS = _env("SEARCH_INDEX_MAX_STALENESS", 300.0)  # segundos sin sincronizar con TYA tras los que /api/search vuelve a TYA
+SEARCH_INDEX_LIMIT = _env("SEARCH_INDEX_LIMIT", 50)           # resultados máximos por tipo en /api/search
+SUGGEST_LIMIT = _env("SUGGEST_LIMIT", 8)                      # sugerencias máximas de /api/suggest
+SUGGEST_BUCKET = _env("SUGGEST_BUCKET", 32)                   # claves por debajo de las que un subárbol del trie no se despliega
+
+# ===================== PAGINACIÓN DE LA TIENDA =====================
+SHOP_PAGE_SIZE = _env("SHOP_PAGE_SIZE", 9)          # productos por página y tipo si la petición no indica `size`
+SHOP_PAGE_SIZE_MAX = _env("SHOP_PAGE_SIZE_MAX", 48) # `size` máximo aceptado
+SHOP_PREFETCH = _env("SHOP_PREFETCH", True)         # cargar en segundo plano la página siguiente al servir una
+PREFETCH_WORKERS = _env("PREFETCH_WORKERS", 2)      # hilos para las precargas
+
+# ===================== CARRITO =====================
+CART_BULK_MAX = _env("CART_BULK_MAX", 50)           # operaciones máximas por petición a /cart/bulk
+CART_BULK_WORKERS = _env("CART_BULK_WORKERS", 4)    # llamadas simultáneas a TPP de un /cart/bulk
+CHECKOUT_WORKERS = _env("CHECKOUT_WORKERS", 2)      # compras simultáneas contra TPP
+CHECKOUT_QUEUE_MAX = _env("CHECKOUT_QUEUE_MAX", 100)  # compras en cola a partir de las que /purchase responde 503
+CHECKOUT_TIMEOUT = _env("CHECKOUT_TIMEOUT", 30.0)   # segundos máximos de espera a POST /purchase de TPP
+CHECKOUT_TTL = _env("CHECKOUT_TTL", 3600.0)         # segundos que se recuerdan un pedido y su clave de idempotencia
+CHECKOUT_JOBS_SIZE = _env("CHECKOUT_JOBS_SIZE", 4096)  # pedidos terminados (done/failed) recordados como máximo
+
+# ===================== CONTROL DE ADMISIÓN =====================
+ADMISSION_ENABLED = _env("ADMISSION_ENABLED", True)             # limitar peticiones en curso por clase de ruta (ver controller/admission.py)
+ADMISSION_CRITICAL_LIMIT = _env("ADMISSION_CRITICAL_LIMIT", 24)  # compras, pagos, carrito y sesión en curso a la vez
+ADMISSION_CRITICAL_QUEUE = _env("ADMISSION_CRITICAL_QUEUE", 256) # peticiones críticas que pueden esperar hueco
+ADMISSION_CRITICAL_TIMEOUT = _env("ADMISSION_CRITICAL_TIMEOUT", 10.0)  # segundos máximos de espera de una petición crítica
+ADMISSION_NORMAL_LIMIT = _env("ADMISSION_NORMAL_LIMIT", 24)      # resto de páginas en curso a la vez
+ADMISSION_NORMAL_QUEUE = _env("ADMISSION_NORMAL_QUEUE", 64)
+ADMISSION_NORMAL_TIMEOUT = _env("ADMISSION_NORMAL_TIMEOUT", 2.0)
+ADMISSION_LOW_LIMIT = _env("ADMISSION_LOW_LIMIT", 8)             # búsquedas, sugerencias y tienda sin sesión en curso a la vez
+ADMISSION_LOW_QUEUE = _env("ADMISSION_LOW_QUEUE", 16)
+ADMISSION_LOW_TIMEOUT = _env("ADMISSION_LOW_TIMEOUT", 0.5)
+ADMISSION_RETRY_AFTER = _env("ADMISSION_RETRY_AFTER", 2)         # segundos de la cabecera Retry-After de los 503 por saturación
+
+# ===================== CALENTAMIENTO AL ARRANCAR =====================
+WARMUP_ENABLED = _env("WARMUP_ENABLED", True)       # precargar top-10 de RYE al arrancar
+WARMUP_DEADLINE = _env("WARMUP_DEADLINE", 20.0)     # segundos máximos antes de declarar el servicio listo
+WARMUP_INTERVAL = _env("WARMUP_INTERVAL", 25.0)     # segundos entre recalentamientos (menor que los TTL del catálogo y los top-10; 0 = solo al arrancar)
+
+# ===================== LLAMADAS A MICROSERVICIOS =====================
+UPSTREAM_RETRIES = _env("UPSTREAM_RETRIES", 0)              # reintentos de GET ante errores de conexión o timeout
+UPSTREAM_RETRY_BACKOFF = _env("UPSTREAM_RETRY_BACKOFF", 0.05)  # segundos de espera entre reintentos (crece linealmente)
+FAULTS = _env("FAULTS", "")                                # inyección de retardos y fallos por servicio (ver controller/faults.py); vacío la desactiva
+FAULTS_SEED = _env("FAULTS_SEED", 0)                       # semilla de la inyección de fallos (0 = aleatoria)
+
+# ===================== LOGGING =====================
+LOG_LEVEL = _env("LOG_LEVEL", "INFO")                       # nivel por defecto de los loggers del FND
+LOG_LEVELS = _env("LOG_LEVELS", "")                         # niveles por módulo: "controller.upstream=DEBUG,controller.warmup=WARNING"
+LOG_DEBUG_SAMPLE_RATE = _env("LOG_DEBUG_SAMPLE_RATE", 0.1)  # fracción de eventos DEBUG que se escriben
+
+# ===================== DIAGNÓSTICO =====================
+SERVER_TIMING_ENABLED = _env("SERVER_TIMING_ENABLED", False)  # cabecera Server-Timing con las llamadas a microservicios (solo en desarrollo y pruebas de carga)
+SLOW_REQUEST_THRESHOLD = _env("SLOW_REQUEST_THRESHOLD", 1.0)  # segundos a partir de los que una petición se considera lenta
+SLOW_REQUEST_BUFFER_SIZE = _env("SLOW_REQUEST_BUFFER_SIZE", 200)  # peticiones lentas que se conservan en memoria
+SLOW_REQUEST_DUMP_FILE = _env("SLOW_REQUEST_DUMP_FILE", "slow_requests.jsonl")  # fichero donde se vuelca el registro bajo demanda
+LOOP_LAG_ENABLED = _env("LOOP_LAG_ENABLED", True)         # medir el retardo del event loop
+LOOP_LAG_INTERVAL = _env("LOOP_LAG_INTERVAL", 0.1)         # segundos entre latidos del monitor
+LOOP_LAG_THRESHOLD = _env("LOOP_LAG_THRESHOLD", 0.25)      # segundos de bloqueo a partir de los que se captura la pila
+PROFILE_SAMPLE_INTERVAL = _env("PROFILE_SAMPLE_INTERVAL", 0.005)  # segundos entre muestras del perfilador por petición
+PROFILE_BUFFER_SIZE = _env("PROFILE_BUFFER_SIZE", 20)      # perfiles que se conservan en memoria
+MEMORY_TRACEMALLOC = _env("MEMORY_TRACEMALLOC", False)     # activar tracemalloc desde el arranque
+MEMORY_TRACE_FRAMES = _env("MEMORY_TRACE_FRAMES", 1)       # frames guardados por asignación (más frames, más coste)
+MEMORY_SNAPSHOTS = _env("MEMORY_SNAPSHOTS", 4)             # instantáneas de memoria que se conservan
+MEMORY_TOP = _env("MEMORY_TOP", 25)                        # puntos de asignación que se devuelven por informe
+
+# ===================== ADMINISTRACIÓN =====================
+ADMIN_TOKEN = _env("ADMIN_TOKEN", "")   # valor de la cabecera X-Admin-Token; vacío desactiva los endpoints /admin
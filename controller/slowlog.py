@@ -0,0 +1,65 @@
+"""
+Registro de peticiones lentas.
+
+Guarda en un buffer circular acotado las peticiones que superan
+FND_SLOW_REQUEST_THRESHOLD junto con la traza completa de sus llamadas a
+microservicios (incluidos timeouts y reintentos), para diagnosticar la latencia
+de cola en producción sin tener que reproducirla.
+"""
+import json
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+import controller.settings as settings
+
+_entries = deque(maxlen=settings.SLOW_REQUEST_BUFFER_SIZE)
+_lock = threading.Lock()
+
+
+def record(request, status_code: int, trace):
+    """
+    Añade la petición al registro si ha superado el umbral configurado.
+    """
+    duration = trace.elapsed()
+    if duration < settings.SLOW_REQUEST_THRESHOLD:
+        return
+    route = request.scope.get("route")
+    entry = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "method": request.method,
+        "route": route.path if route is not None else request.url.path,
+        "path": request.url.path,
+        "path_params": dict(request.scope.get("path_params") or {}),
+        "query": dict(request.query_params),
+        "status": status_code,
+        "duration": duration,
+        "calls": list(trace.calls),
+    }
+    with _lock:
+        _entries.append(entry)
+
+
+def entries() -> list:
+    """
+    Devuelve las peticiones lentas registradas, de la más reciente a la más antigua.
+    """
+    with _lock:
+        return list(reversed(_entries))
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def dump(path: str = None) -> int:
+    """
+    Vuelca el registro al fichero indicado (una petición JSON por línea).
+    Devuelve el número de entradas escritas.
+    """
+    items = entries()
+    with open(path or settings.SLOW_REQUEST_DUMP_FILE, "a", encoding="utf-8") as f:
+        for entry in items:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+    return len(items)
@@ -0,0 +1,201 @@
+"""
+Sugerencias de búsqueda para /api/suggest.
+
+Un trie de prefijos sobre los nombres normalizados (`search.fold`) del
+catálogo: cada nombre entra una vez por cada palabra por la que empieza, de
+modo que "lov" sugiere "Crazy Love". Cada nodo guarda ya calculadas las
+SUGGEST_LIMIT mejores entidades de su subárbol, así que responder es bajar
+por el trie tantos nodos como letras tiene la consulta.
+
+Para no crear un nodo por cada letra de cada nombre, un subárbol con pocas
+claves (SUGGEST_BUCKET) se queda como una lista que se filtra al consultar.
+
+La relevancia de una entidad es, de mayor a menor peso:
+
+1. El puesto en los top-10 de canciones y artistas de RYE.
+2. Las búsquedas completas (/api/search/*) que la han tenido como
+   coincidencia de prefijo (`record`). El contador se reduce a la mitad en
+   cada reconstrucción para que pesen más las recientes.
+3. A igualdad, nombre más corto, tipo (artista, canción, álbum, merch) e id.
+
+El índice del catálogo llama a `rebuild` tras cargarse y tras cada
+actualización; los puntos 1 y 2 se incorporan en esas reconstrucciones.
+"""
+import heapq
+import logging
+import threading
+
+import requests
+
+import controller.settings as settings
+import controller.upstream as upstream
+import controller.search as search
+
+logger = logging.getLogger(__name__)
+
+# Orden de los tipos a igualdad de relevancia
+KIND_ORDER = ("artist", "song", "album", "merch")
+
+# Peso de cada puesto de los top-10 de RYE frente a una búsqueda registrada
+TOP_WEIGHT = 1000
+
+
+class Node():
+
+    __slots__ = ("children", "top", "bucket")
+
+    def __init__(self):
+        self.children = {}
+        self.top = ()
+        # Lista de (clave, rank) cuando el subárbol no se ha desplegado
+        self.bucket = None
+
+
+class Trie():
+    """
+    Trie de prefijos con las mejores entidades de cada nodo precalculadas.
+    `entries[rank]` es (kind, id, nombre, artista): cuanto menor el rank, mejor.
+    """
+
+    __slots__ = ("root", "entries")
+
+    def __init__(self, entries: list, keys: list):
+        self.entries = entries
+        keys.sort()
+        self.root = self._build(keys, 0, len(keys), 0)
+
+    def _build(self, keys: list, lo: int, hi: int, depth: int) -> Node:
+        node = Node()
+        if hi - lo <= settings.SUGGEST_BUCKET:
+            node.bucket = keys[lo:hi]
+            node.top = _best(rank for _, rank in node.bucket)
+            return node
+        # Las claves que terminan aquí van delante de las más largas al ordenar
+        start = lo
+        while start < hi and len(keys[start][0]) == depth:
+            start += 1
+        ranks = [rank for _, rank in keys[lo:start]]
+        while start < hi:
+            char = keys[start][0][depth]
+            end = start
+            while end < hi and keys[end][0][depth] == char:
+                end += 1
+            child = node.children[char] = self._build(keys, start, end, depth + 1)
+            ranks.extend(child.top)
+            start = end
+        node.top = _best(ranks)
+        return node
+
+    def lookup(self, prefix: str) -> tuple:
+        node = self.root
+        for char in prefix:
+            if node.bucket is not None:
+                break
+            node = node.children.get(char)
+            if node is None:
+                return ()
+        if node.bucket is not None:
+            return _best(rank for key, rank in node.bucket if key.startswith(prefix))
+        return node.top
+
+
+def _best(ranks) -> tuple:
+    return tuple(heapq.nsmallest(settings.SUGGEST_LIMIT, set(ranks)))
+
+
+_trie = None
+_counts = {}
+_lock = threading.Lock()
+
+
+def _top_weights() -> dict:
+    """
+    {(kind, id): peso} de los top-10 de RYE; sin RYE no hay bonificación.
+    """
+    weights = {}
+    for kind, top in (("song", "songs"), ("artist", "artists")):
+        try:
+            items = upstream.get_top_list(top)
+        except requests.RequestException as e:
+            logger.warning("Sin top-10 de %s para las sugerencias: %s", top, e)
+            continue
+        for position, item in enumerate(items[:10]):
+            if isinstance(item, dict) and item.get("id") is not None:
+                weights[(kind, item["id"])] = (10 - position) * TOP_WEIGHT
+    return weights
+
+
+def rebuild(catalog: dict):
+    """
+    Reconstruye el trie con {kind: {id: (nombre, artistId)}}.
+    """
+    global _trie
+    weights = _top_weights()
+    with _lock:
+        for key in list(_counts):
+            _counts[key] //= 2
+            if not _counts[key]:
+                del _counts[key]
+        for key, count in _counts.items():
+            weights[key] = weights.get(key, 0) + count
+
+    artist_names = {artist_id: name for artist_id, (name, _) in catalog.get("artist", {}).items()}
+    candidates = []
+    for kind in KIND_ORDER:
+        # El índice de búsqueda ya tiene los nombres normalizados
+        names = search.folded(kind)
+        for entity_id, (name, artist_id) in catalog.get(kind, {}).items():
+            folded = names.get(entity_id)
+            if folded is None:
+                folded = search.fold(name)
+            if folded:
+                artist = None if kind == "artist" else artist_names.get(artist_id)
+                candidates.append((-weights.get((kind, entity_id), 0), len(folded), KIND_ORDER.index(kind), entity_id,
+                                   folded, (kind, entity_id, name, artist)))
+    candidates.sort()
+
+    entries = []
+    keys = []
+    for rank, candidate in enumerate(candidates):
+        folded = candidate[4]
+        entries.append(candidate[5])
+        # Una clave por cada palabra del nombre: "crazy love" -> "crazy love", "love"
+        position = 0
+        while position >= 0:
+            keys.append((folded[position:], rank))
+            position = folded.find(" ", position)
+            if position >= 0:
+                position += 1
+    _trie = Trie(entries, keys)
+
+
+def suggest(q: str, limit: int = None) -> list:
+    """
+    Las mejores entidades cuyo nombre tiene una palabra que empieza por `q`,
+    o las más relevantes del catálogo si `q` está vacía. [] si el trie no existe.
+    """
+    trie = _trie
+    if trie is None:
+        return []
+    ranks = trie.lookup(search.fold(q))
+    return [trie.entries[rank] for rank in ranks[:limit or settings.SUGGEST_LIMIT]]
+
+
+def record(kind: str, q: str, ids: list):
+    """
+    Cuenta una búsqueda completa de `kind` para los primeros resultados `ids`
+    cuyo nombre empieza por `q`.
+    """
+    folded = search.fold(q)
+    names = search.folded(kind)
+    if not folded:
+        return
+    with _lock:
+        for entity_id in ids[:settings.SUGGEST_LIMIT]:
+            if names.get(entity_id, "").startswith(folded):
+                _counts[(kind, entity_id)] = _counts.get((kind, entity_id), 0) + 1
+
+
+def status() -> dict:
+    trie = _trie
+    return {"entities": len(trie.entries) if trie else 0, "recorded": len(_counts)}
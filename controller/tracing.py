@@ -0,0 +1,83 @@
+"""
+Registro, por petición, de las llamadas a microservicios.
+
+La middleware abre una traza al recibir la petición y la capa `upstream` añade
+una entrada por cada llamada (o acierto de caché). La traza vive en una
+ContextVar, que FastAPI copia al hilo del pool donde se ejecutan las rutas
+síncronas, así que todas las llamadas de la petición acaban en la misma lista.
+"""
+import time
+from contextvars import ContextVar
+
+_trace = ContextVar("fnd_trace", default=None)
+
+
+class Trace():
+    """
+    Llamadas a microservicios y tiempos de renderizado de una petición.
+    """
+
+    __slots__ = ("start", "calls")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.calls = []
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+
+def begin():
+    """
+    Abre una traza para la petición en curso. Devuelve (traza, token).
+    """
+    trace = Trace()
+    return trace, _trace.set(trace)
+
+
+def end(token):
+    _trace.reset(token)
+
+
+def current():
+    return _trace.get()
+
+
+def record(service: str, method: str, endpoint: str, started: float, duration: float, status: str, cache: str = None, attempt: int = 1, error: str = None):
+    """
+    Añade una llamada a la traza en curso (no hace nada fuera de una petición,
+    p. ej. durante el calentamiento de cachés).
+    """
+    trace = _trace.get()
+    if trace is None:
+        return
+    trace.calls.append({
+        "service": service,
+        "method": method,
+        "endpoint": endpoint,
+        "offset": started - trace.start,
+        "duration": duration,
+        "status": status,
+        "cache": cache,
+        "attempt": attempt,
+        "error": error,
+    })
+
+
+def server_timing(trace: Trace, render_timings=()) -> str:
+    """
+    Construye la cabecera Server-Timing con una entrada por llamada, el
+    renderizado de plantillas y el total de la petición.
+    """
+    parts = []
+    for i, call in enumerate(trace.calls):
+        desc = f"{call['service']} {call['method']} {call['endpoint']} {call['status']}"
+        if call["cache"]:
+            desc += f" cache={call['cache']}"
+        if call["attempt"] > 1:
+            desc += f" attempt={call['attempt']}"
+        parts.append(f'{call["service"].lower()}_{i};desc="{desc}";dur={call["duration"] * 1000:.1f}')
+    for i, (template, duration) in enumerate(render_timings):
+        parts.append(f'render_{i};desc="{template}";dur={duration * 1000:.1f}')
+    parts.append(f"total;dur={trace.elapsed() * 1000:.1f}")
+    return ", ".join(parts)
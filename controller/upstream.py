@@ -0,0 +1,338 @@
+"""
+Capa de acceso a los microservicios.
+
+Todas las llamadas del FND a SYU, TYA, TPP, PT y RYE pasan por `request()` (o sus
+atajos `get`, `post`, ...), que mantienen la interfaz de `requests` y registran
+latencia, estado y llamadas en curso por servicio y plantilla de endpoint, además
+de anotar cada llamada en la traza de la petición en curso (ver `tracing`).
+
+Las funciones de catálogo lanzan `requests.RequestException` igual que una llamada
+directa con `raise_for_status()`, de modo que las rutas conservan su manejo de errores.
+"""
+import base64
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from urllib.parse import urlsplit
+
+import msgspec
+import requests
+
+import controller.cache as cache
+import controller.faults as faults
+import controller.metrics as metrics
+import controller.models as models
+import controller.msvc_servers as servers
+import controller.settings as settings
+import controller.tracing as tracing
+
+logger = logging.getLogger(__name__)
+
+JSON_HEADERS = {"Accept": "application/json"}
+
+# Modelo de los productos de la tienda por tipo (ver `get_list`)
+LIST_MODELS = {
+    "song": models.Song,
+    "album": models.Album,
+    "merch": models.Merchandising,
+}
+
+# Tipos de favoritos de SYU (/favs/{tipo})
+FAVORITE_TYPES = ("songs", "albums", "artists", "merch")
+
+SERVICES = {
+    "SYU": servers.SYU,
+    "TYA": servers.TYA,
+    "TPP": servers.TPP,
+    "PT": servers.PT,
+    "RYE": servers.RYE,
+}
+
+
+def describe(url: str):
+    """
+    Devuelve (servicio, plantilla del endpoint) para una URL de un microservicio.
+    Los segmentos numéricos se sustituyen por {id} y los nombres de usuario por
+    {username} para no disparar la cardinalidad de las métricas.
+    """
+    service = "other"
+    for name, base in SERVICES.items():
+        if url.startswith(base):
+            service = name
+            break
+    segments = urlsplit(url).path.split("/")
+    for i, segment in enumerate(segments):
+        if segment.isdigit():
+            segments[i] = "{id}"
+        elif service == "SYU" and i == 2 and segments[1] == "user" and segment != "link-artist":
+            segments[i] = "{username}"
+    return service, "/".join(segments) or "/"
+
+
+def request(method: str, url: str, cache_status: str = None, **kwargs):
+    """
+    Equivalente instrumentado de `requests.request`.
+    `cache_status` indica si la llamada se debe a un fallo de caché ("miss").
+    Las peticiones GET se reintentan ante errores de conexión o timeouts hasta
+    FND_UPSTREAM_RETRIES veces; cada intento queda anotado en la traza.
+    """
+    service, endpoint = describe(url)
+    retries = settings.UPSTREAM_RETRIES if method == "GET" else 0
+    attempt = 1
+    while True:
+        try:
+            return _attempt(method, url, service, endpoint, attempt, cache_status, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt > retries:
+                raise
+            time.sleep(settings.UPSTREAM_RETRY_BACKOFF * attempt)
+            attempt += 1
+
+
+def _attempt(method: str, url: str, service: str, endpoint: str, attempt: int, cache_status: str, **kwargs):
+    status = "error"
+    error = None
+    metrics.upstream_in_flight.inc(service)
+    start = time.perf_counter()
+    try:
+        if faults.enabled():
+            resp = faults.send(service, endpoint, method, url, **kwargs)
+        else:
+            resp = requests.request(method, url, **kwargs)
+        status = str(resp.status_code)
+        return resp
+    except requests.Timeout as e:
+        status = "timeout"
+        error = str(e)
+        raise
+    except requests.RequestException as e:
+        error = str(e)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.upstream_in_flight.dec(service)
+        metrics.upstream_requests.inc(service, method, endpoint, status)
+        metrics.upstream_latency.observe(service, method, endpoint, status, value=elapsed)
+        tracing.record(service, method, endpoint, start, elapsed, status, cache_status, attempt=attempt, error=error)
+
+
+def _record_hit(service: str, endpoint: str):
+    tracing.record(service, "GET", endpoint, time.perf_counter(), 0.0, "200", "hit")
+
+
+def get(url: str, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def patch(url: str, **kwargs):
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url: str, **kwargs):
+    return request("DELETE", url, **kwargs)
+
+
+@functools.lru_cache(maxsize=None)
+def _decoder(model):
+    # strict=False acepta números en texto ("9.99") como hace TYA con los precios
+    return msgspec.json.Decoder(model, strict=False)
+
+
+def decode(resp, model):
+    """
+    Decodifica el cuerpo de `resp` directamente al tipo `model` de `controller.models`
+    (p. ej. `List[models.Song]`), sin pasar por diccionarios intermedios.
+    Un cuerpo que no es JSON o no encaja con el esquema lanza
+    `requests.exceptions.InvalidJSONError`, como `resp.json()`.
+    """
+    try:
+        return _decoder(model).decode(resp.content)
+    except msgspec.MsgspecError as e:
+        raise requests.exceptions.InvalidJSONError(f"Respuesta no válida de {resp.url}: {e}", response=resp)
+
+
+def get_entity(kind: str, entity_id: int, timeout: float = 2, refresh: bool = False):
+    """
+    Obtiene /{kind}/{id} de TYA (song, album, artist o merch) pasando por la caché.
+    Devuelve una copia superficial, las rutas añaden claves sobre el diccionario.
+    Con `refresh` se vuelve a pedir aunque esté en caché.
+    """
+    key = (kind, entity_id)
+    data = None if refresh else cache.catalog.get(key)
+    if data is None:
+        resp = get(f"{servers.TYA}/{kind}/{entity_id}", timeout=timeout, headers=JSON_HEADERS, cache_status="miss")
+        resp.raise_for_status()
+        data = resp.json()
+        cache.catalog.set(key, data)
+    else:
+        _record_hit("TYA", f"/{kind}/{{id}}")
+    return dict(data)
+
+
+def get_genres(timeout: float = 2, refresh: bool = False):
+    """
+    Obtiene la lista completa de géneros de TYA pasando por la caché.
+    """
+    data = None if refresh else cache.catalog.get("genres")
+    if data is None:
+        resp = get(f"{servers.TYA}/genres", timeout=timeout, headers=JSON_HEADERS, cache_status="miss")
+        resp.raise_for_status()
+        data = resp.json()
+        cache.catalog.set("genres", data)
+    else:
+        _record_hit("TYA", "/genres")
+    return list(data)
+
+
+def get_top_list(kind: str, timeout: float = 3, refresh: bool = False):
+    """
+    Obtiene /statistics/top-10-{kind} de RYE ('songs' o 'artists') pasando por la caché.
+    """
+    data = None if refresh else cache.top_lists.get(kind)
+    if data is None:
+        resp = get(f"{servers.RYE}/statistics/top-10-{kind}", timeout=timeout, headers=JSON_HEADERS, cache_status="miss")
+        resp.raise_for_status()
+        data = resp.json()
+        cache.top_lists.set(kind, data)
+    else:
+        _record_hit("RYE", f"/statistics/top-10-{kind}")
+    return list(data)
+
+
+def get_list(kind: str, ids, timeout: float = 10) -> list:
+    """
+    Obtiene de TYA los productos `ids` de `kind` (song, album o merch) como
+    modelos de LIST_MODELS pasando por la caché: solo se piden a /{kind}/list
+    los que faltan. Devuelve los que existen en el orden de `ids`.
+    """
+    found = {}
+    missing = []
+    for entity_id in ids:
+        item = cache.listings.get((kind, entity_id))
+        if item is None:
+            missing.append(entity_id)
+        else:
+            found[entity_id] = item
+    if missing:
+        resp = get(f"{servers.TYA}/{kind}/list", params={"ids": ",".join(map(str, missing))},
+                   timeout=timeout, headers=JSON_HEADERS, cache_status="miss")
+        resp.raise_for_status()
+        for item in decode(resp, List[LIST_MODELS[kind]]):
+            entity_id = getattr(item, f"{kind}Id")
+            cache.listings.set((kind, entity_id), item)
+            found[entity_id] = item
+    elif ids:
+        _record_hit("TYA", f"/{kind}/list")
+    return [found[entity_id] for entity_id in ids if entity_id in found]
+
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=settings.PREFETCH_WORKERS, thread_name_prefix="fnd-prefetch")
+_prefetching = set()
+_prefetch_lock = threading.Lock()
+
+
+def prefetch_list(kind: str, ids):
+    """
+    Carga en segundo plano en la caché los productos `ids` de `kind` que aún
+    no están, para que la siguiente `get_list` con ellos no espere a TYA.
+    """
+    missing = tuple(entity_id for entity_id in ids if (kind, entity_id) not in cache.listings)
+    if not missing:
+        return
+    key = (kind, missing)
+    with _prefetch_lock:
+        if key in _prefetching:
+            return
+        _prefetching.add(key)
+    _prefetch_pool.submit(_prefetch, key)
+
+
+def _prefetch(key):
+    kind, ids = key
+    try:
+        get_list(kind, ids)
+    except requests.RequestException as e:
+        logger.debug("No se pudo precargar %s %s: %s", kind, ids, e)
+    finally:
+        with _prefetch_lock:
+            _prefetching.discard(key)
+
+
+def get_favorites(user_id, token: str, timeout: float = 2) -> dict:
+    """
+    Obtiene de SYU los favoritos del usuario como {tipo: frozenset de ids}
+    para todos los FAVORITE_TYPES, pasando por la caché. Los tipos que SYU no
+    conoce (404) quedan vacíos; cualquier otro error se lanza.
+    """
+    state = cache.favorites.get(user_id)
+    if state is None:
+        headers = dict(JSON_HEADERS)
+        headers["Cookie"] = f"oversound_auth={token}"
+        state = {}
+        for kind in FAVORITE_TYPES:
+            resp = get(f"{servers.SYU}/favs/{kind}", timeout=timeout, headers=headers, cache_status="miss")
+            if resp.status_code == 404:
+                state[kind] = frozenset()
+                continue
+            resp.raise_for_status()
+            # SYU devuelve ids, aunque algunas versiones devuelven objetos con `id`
+            state[kind] = frozenset(item.get("id") if isinstance(item, dict) else item for item in resp.json())
+        cache.favorites.set(user_id, state)
+    else:
+        for kind in FAVORITE_TYPES:
+            _record_hit("SYU", f"/favs/{kind}")
+    return state
+
+
+def invalidate_favorites(user_id):
+    """
+    Elimina de la caché los favoritos de un usuario tras añadir o quitar uno.
+    """
+    cache.favorites.delete(user_id)
+
+
+def get_track_audio(track_id: int, token: str = None, timeout: float = 10):
+    """
+    Obtiene el audio de un track de PT ya decodificado de base64.
+    Devuelve None si PT no incluye el track en la respuesta.
+
+    PT exige read:tracks, así que la caché va por sesión (token, track): un
+    audio descargado con una sesión nunca se sirve a otra sin pasar por PT.
+    """
+    key = (token, track_id)
+    audio_bytes = cache.audio.get(key)
+    if audio_bytes is None:
+        headers = dict(JSON_HEADERS)
+        if token:
+            headers["Cookie"] = f"oversound_auth={token}"
+        resp = get(f"{servers.PT}/track/{track_id}", timeout=timeout, headers=headers, cache_status="miss")
+        resp.raise_for_status()
+        # La respuesta contiene {"idtrack": int, "track": "base64string"}
+        track_data = resp.json()
+        if not track_data.get('track'):
+            return None
+        audio_bytes = base64.b64decode(track_data['track'])
+        cache.audio.set(key, audio_bytes)
+    else:
+        _record_hit("PT", "/track/{id}")
+    return audio_bytes
+
+
+def invalidate_entity(kind: str, entity_id):
+    """
+    Elimina una entidad de la caché tras modificarla o borrarla.
+    """
+    if entity_id is not None:
+        cache.catalog.delete((kind, entity_id))
+        cache.listings.delete((kind, entity_id))
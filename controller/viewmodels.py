@@ -0,0 +1,159 @@
+"""
+Construcción de los datos que reciben las vistas.
+
+Funciones puras: reciben lo que las rutas ya han pedido a los microservicios y
+devuelven el modelo de la vista sin hacer ninguna llamada de red ni modificar
+sus argumentos. Así el coste de dar forma a los datos se puede medir y
+optimizar por separado (ver bench/viewmodels.py).
+
+Las entidades pueden llegar como diccionarios (caché de `upstream.get_entity`)
+o como modelos de `controller.models` decodificados de las listas de TYA.
+"""
+import msgspec
+
+
+def _unknown_artist(artist_id, name_key: str = "artisticName") -> dict:
+    return {"artistId": artist_id, name_key: "Artista desconocido"}
+
+
+def _as_dict(entity) -> dict:
+    if isinstance(entity, dict):
+        return dict(entity)
+    return msgspec.structs.asdict(entity)
+
+
+def _with_artist(entity, artists: dict, name_key: str = "artisticName") -> dict:
+    result = _as_dict(entity)
+    artist_id = result.get("artistId")
+    result["artist"] = artists.get(artist_id) or _unknown_artist(artist_id, name_key)
+    return result
+
+
+def _price(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def select_genres(all_genres: list, genre_ids) -> list:
+    """
+    Géneros de `all_genres` cuyos id están en `genre_ids`, en el orden de `all_genres`.
+    """
+    if not genre_ids:
+        return []
+    wanted = set(genre_ids)
+    return [g for g in all_genres if g.get("id") in wanted]
+
+
+def song_artist_ids(song: dict, albums: dict) -> list:
+    """
+    Artistas que hay que resolver para la vista de una canción: el principal,
+    los colaboradores y los de sus álbumes.
+    """
+    ids = [song.get("artistId")]
+    ids.extend(song.get("collaborators") or ())
+    ids.extend(album.get("artistId") for album in albums.values())
+    return list(dict.fromkeys(i for i in ids if i is not None))
+
+
+def build_song(song: dict, artists: dict, all_genres: list, albums: dict) -> dict:
+    """
+    Modelo de la vista de canción.
+
+    - artists: {artistId: artista} con los artistas que se han podido obtener.
+    - albums: {albumId: álbum} con el álbum original y los enlazados que se han podido obtener.
+    """
+    song_data = _with_artist(song, artists, "nombre")
+    song_data["collaborators_data"] = [
+        artists.get(collab_id) or _unknown_artist(collab_id, "nombre")
+        for collab_id in song.get("collaborators") or ()
+    ]
+    song_data["genres_data"] = select_genres(all_genres, song.get("genres"))
+
+    original = albums.get(song.get("albumId"))
+    song_data["original_album"] = _with_artist(original, artists, "nombre") if original is not None else None
+    song_data["linked_albums_data"] = [
+        _with_artist(albums[album_id], artists, "nombre")
+        for album_id in song.get("linked_albums") or ()
+        if album_id in albums
+    ]
+    song_data["price"] = _price(song.get("price", 0))
+    return song_data
+
+
+def song_metrics(metrics_data: dict) -> dict:
+    return {
+        "sales": metrics_data.get("sales", 0),
+        "downloads": metrics_data.get("downloads", 0),
+        "playbacks": metrics_data.get("playbacks", 0),
+    }
+
+
+def related_album_ids(album_id: int, artist: dict, limit: int = 6) -> list:
+    """
+    Otros álbumes del mismo artista (campo owner_albums), como máximo `limit`.
+    """
+    return [aid for aid in (artist or {}).get("owner_albums") or () if aid != album_id][:limit]
+
+
+def format_duration(songs: list) -> str:
+    """
+    Suma la duración de las canciones (en segundos) y la devuelve como "m:ss".
+    """
+    total = 0
+    for song in songs:
+        if song.get("duration"):
+            try:
+                total += int(song["duration"])
+            except (ValueError, TypeError):
+                pass
+    return f"{total // 60}:{total % 60:02d}"
+
+
+def build_album(album: dict, artists: dict, all_genres: list, songs: list, related_albums: list):
+    """
+    Modelo de la vista de álbum. Devuelve (álbum, duración total formateada).
+
+    - artists: {artistId: artista} con los artistas del álbum y de sus canciones.
+    - songs: canciones del álbum de /song/list (models.SongSummary).
+    - related_albums: otros álbumes del artista (models.AlbumSummary), se pasan tal cual.
+    """
+    album_data = _with_artist(album, artists)
+    album_data["genres_data"] = select_genres(all_genres, album.get("genres"))
+    # Las canciones sin albumOrder van al final
+    songs_data = sorted(
+        (_with_artist(song, artists) for song in songs),
+        key=lambda s: s.get("albumOrder") if s.get("albumOrder") is not None else 999,
+    )
+    album_data["songs_data"] = songs_data
+    album_data["related_albums"] = related_albums
+    album_data["price"] = _price(album.get("price", 0))
+    return album_data, format_duration(songs_data)
+
+
+def shop_maps(all_artists: list, all_genres: list):
+    """
+    Mapas id -> nombre de artistas y géneros para los filtros y tarjetas de la tienda
+    (models.ArtistSummary y models.Genre).
+    """
+    artists_map = {a.artistId: a.artisticName for a in all_artists if a.artistId}
+    genres_map = {g.id: g.name for g in all_genres if g.id}
+    return artists_map, genres_map
+
+
+def _facet(counts: tuple) -> dict:
+    songs, albums, merch = counts
+    total = songs + albums + merch
+    return {"total": total, "empty": not total, "title": f"{songs} canciones, {albums} álbumes, {merch} merch"}
+
+
+def shop_facets(facets: dict):
+    """
+    Recuentos de `catalog.facets` listos para los filtros de la tienda:
+    {"genres": {id: {"total", "empty", "title"}}, "artists": {...}}.
+    """
+    if facets is None:
+        return None
+    return {group: {entity_id: _facet(counts) for entity_id, counts in by_id.items()}
+            for group, by_id in facets.items()}
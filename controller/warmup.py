@@ -0,0 +1,145 @@
+"""
+Calentamiento de cachés al arrancar el FND.
+
+Descarga los top-10 de canciones y artistas de RYE y resuelve en la caché del
+catálogo las canciones, álbumes y artistas asociados, de modo que los primeros
+visitantes de / y de las canciones más escuchadas no paguen el coste completo
+de los microservicios.
+
+Las entradas del catálogo y de los top-10 caducan en uno o dos minutos, así que
+tras el arranque el calentamiento se repite cada WARMUP_INTERVAL segundos. El
+audio no se precarga: PT exige la sesión del usuario y su caché va por sesión.
+"""
+import logging
+import threading
+import time
+
+import requests
+
+import controller.settings as settings
+import controller.upstream as upstream
+
+logger = logging.getLogger(__name__)
+
+_stop = threading.Event()
+_thread = None
+
+state = {
+    "enabled": settings.WARMUP_ENABLED,
+    "started_at": None,
+    "finished_at": None,
+    "entities": 0,
+    "rounds": 0,
+    "errors": 0,
+}
+
+
+def is_ready() -> bool:
+    """
+    El servicio está listo cuando el calentamiento ha terminado, está
+    desactivado o ha vencido el plazo máximo configurado.
+    """
+    if not state["enabled"] or state["finished_at"] is not None:
+        return True
+    if state["started_at"] is None:
+        return False
+    return time.monotonic() - state["started_at"] >= settings.WARMUP_DEADLINE
+
+
+def _deadline_passed() -> bool:
+    # El plazo solo limita el primer calentamiento, el que retrasa la sonda
+    if state["finished_at"] is not None:
+        return False
+    return time.monotonic() - state["started_at"] >= settings.WARMUP_DEADLINE
+
+
+def _hydrate(kind: str, entity_id, refresh: bool, seen: set):
+    """
+    Carga una entidad en la caché y la devuelve (None si no se pudo). Con
+    `refresh` la vuelve a pedir aunque siga en caché, una vez por ronda.
+    """
+    if entity_id is None or _stop.is_set() or _deadline_passed():
+        return None
+    refresh = refresh and (kind, entity_id) not in seen
+    seen.add((kind, entity_id))
+    try:
+        data = upstream.get_entity(kind, entity_id, refresh=refresh)
+        state["entities"] += 1
+        return data
+    except requests.RequestException:
+        state["errors"] += 1
+        return None
+
+
+def warm():
+    """
+    Ejecuta una ronda de calentamiento. La primera se detiene al vencer el
+    plazo; las siguientes renuevan las entradas antes de que caduquen.
+    """
+    refresh = state["rounds"] > 0
+    seen = set()
+    try:
+        try:
+            top_songs = upstream.get_top_list("songs", refresh=refresh)
+        except requests.RequestException:
+            state["errors"] += 1
+            top_songs = []
+        try:
+            top_artists = upstream.get_top_list("artists", refresh=refresh)
+        except requests.RequestException:
+            state["errors"] += 1
+            top_artists = []
+        try:
+            upstream.get_genres(refresh=refresh)
+        except requests.RequestException:
+            state["errors"] += 1
+
+        for item in top_songs:
+            song = _hydrate("song", item.get("id"), refresh, seen)
+            if not song:
+                continue
+            _hydrate("artist", song.get("artistId"), refresh, seen)
+            album = _hydrate("album", song.get("albumId"), refresh, seen)
+            if album:
+                _hydrate("artist", album.get("artistId"), refresh, seen)
+
+        for item in top_artists:
+            _hydrate("artist", item.get("id"), refresh, seen)
+    finally:
+        state["rounds"] += 1
+        if state["finished_at"] is None:
+            state["finished_at"] = time.monotonic()
+
+
+def run():
+    """
+    Calienta al arrancar y, con WARMUP_INTERVAL, repite mientras viva el proceso.
+    """
+    if state["started_at"] is None:
+        state["started_at"] = time.monotonic()
+    while not _stop.is_set():
+        try:
+            warm()
+        except Exception:
+            logger.exception("Error calentando las cachés")
+        if settings.WARMUP_INTERVAL <= 0 or _stop.wait(settings.WARMUP_INTERVAL):
+            return
+
+
+def start():
+    """
+    Lanza el calentamiento en un hilo en segundo plano para no bloquear el arranque.
+    """
+    global _thread
+    if not state["enabled"] or _thread is not None:
+        return
+    _stop.clear()
+    state["started_at"] = time.monotonic()
+    _thread = threading.Thread(target=run, name="fnd-warmup", daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread
+    _stop.set()
+    _thread = None
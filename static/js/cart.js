@@ -84,6 +84,12 @@ function setupEventListeners() {
         btnCheckout.addEventListener('click', handleCheckout);
     }
 
+    // Botón de vaciar carrito
+    const btnClearCart = document.getElementById('btn-clear-cart');
+    if (btnClearCart) {
+        btnClearCart.addEventListener('click', clearCart);
+    }
+
     // Botón de agregar método de pago
     const btnAddPayment = document.getElementById('btn-add-payment');
     if (btnAddPayment) {
@@ -170,6 +176,70 @@ async function removeProductFromServer(productId, productType) {
     }
 }
 
+/**
+ * Envía varias altas o bajas del carrito en una sola petición a /cart/bulk
+ * @param {Array} operations - [{op: 'add' | 'remove', type: 'song' | 'album' | 'merch', id, unidades}]
+ * @returns {Promise<Object|null>} {results, summary} o null si la petición falla
+ */
+async function bulkCartOperations(operations) {
+    try {
+        const response = await fetch('/cart/bulk', {
+            method: 'POST',
+            credentials: 'include',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            },
+            body: JSON.stringify({ operations })
+        });
+
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            console.error('Error en la operación múltiple del carrito:', errorData);
+            return null;
+        }
+        return await response.json();
+    } catch (error) {
+        console.error('Error en la petición:', error);
+        return null;
+    }
+}
+
+/**
+ * Elimina todos los productos del carrito con una sola petición
+ */
+async function clearCart() {
+    const cart = window.currentCart || [];
+    if (!cart.length || !confirm('¿Vaciar el carrito?')) return;
+
+    const operations = [];
+    cart.forEach(item => {
+        const songId = item.song_id ?? item.songId;
+        const albumId = item.album_id ?? item.albumId;
+        const merchId = item.merch_id ?? item.merchId;
+        if (merchId != null) {
+            operations.push({ op: 'remove', type: 'merch', id: merchId });
+        } else if (albumId != null) {
+            operations.push({ op: 'remove', type: 'album', id: albumId });
+        } else if (songId != null) {
+            operations.push({ op: 'remove', type: 'song', id: songId });
+        }
+    });
+
+    const btnClearCart = document.getElementById('btn-clear-cart');
+    if (btnClearCart) btnClearCart.disabled = true;
+
+    const result = await bulkCartOperations(operations);
+    const failed = result ? result.results.filter(r => r.status >= 400).length : operations.length;
+
+    await loadCartFromServer();
+    if (btnClearCart) btnClearCart.disabled = false;
+    showNotification(failed ? `No se pudieron eliminar ${failed} productos` : 'Carrito vaciado');
+
+    // Emitir evento para actualizar el header
+    window.dispatchEvent(new CustomEvent('cartUpdated'));
+}
+
 /**
  * Actualiza la visualización del carrito
  */
@@ -407,14 +477,24 @@ async function handleCheckout() {
     openShippingModal();
 }
 
+// Intervalo de consulta del estado de un pedido y tiempo máximo de espera
+const CHECKOUT_POLL_INTERVAL = 1000;
+const CHECKOUT_POLL_TIMEOUT = 120000;
+
 /**
  * Procesa el pago enviando la compra al backend
+ * La compra se encola en el servidor y su estado se consulta en /purchase/{checkoutId}.
+ * Los reintentos (doble clic, error de red) reutilizan la misma clave de
+ * idempotencia y los mismos datos, de modo que no se cobra dos veces.
  */
 async function processPay() {
     console.log('Cart.js: Processing payment');
+    const btnCheckout = document.getElementById('btn-checkout');
+    if (window.checkoutInProgress) {
+        console.log('Cart.js: Checkout already in progress');
+        return;
+    }
     try {
-        showNotification('Procesando pago...');
-
         // Obtener método de pago seleccionado
         const selectedPayment = document.querySelector('input[name="payment-method"]:checked');
         console.log('Cart.js: Selected payment method element:', selectedPayment);
@@ -426,48 +506,82 @@ async function processPay() {
         const paymentMethodId = selectedPayment.value;
         console.log('Cart.js: Payment method ID:', paymentMethodId);
 
-        // Preparar datos según el esquema de la API
-        // Nota: Se usa camelCase porque el modelo Purchase de TPP tiene attribute_map
-        const purchaseData = {
-            purchasePrice: calculateTotal(),
-            purchaseDate: new Date().toISOString(),
-            paymentMethodId: parseInt(paymentMethodId),
-            songIds: [],
-            albumIds: [],
-            merchIds: []
-        };
-
-        // Extraer IDs según tipo de producto
-        window.currentCart.forEach(item => {
-            if (item.songId) {
-                purchaseData.songIds.push(item.songId);
-            } else if (item.albumId) {
-                purchaseData.albumIds.push(item.albumId);
-            } else if (item.merchId) {
-                purchaseData.merchIds.push(item.merchId);
-            }
-        });
+        window.checkoutInProgress = true;
+        if (btnCheckout) btnCheckout.disabled = true;
+        showNotification('Procesando pago...');
+
+        // Reutilizar el pedido pendiente si el intento anterior no llegó a confirmarse
+        let pending = window.pendingCheckout;
+        if (!pending || pending.paymentMethodId !== paymentMethodId) {
+            // Preparar datos según el esquema de la API
+            // Nota: Se usa camelCase porque el modelo Purchase de TPP tiene attribute_map
+            const purchaseData = {
+                purchasePrice: calculateTotal(),
+                purchaseDate: new Date().toISOString(),
+                paymentMethodId: parseInt(paymentMethodId),
+                songIds: [],
+                albumIds: [],
+                merchIds: []
+            };
+
+            // Extraer IDs según tipo de producto
+            window.currentCart.forEach(item => {
+                const songId = item.songId ?? item.song_id;
+                const albumId = item.albumId ?? item.album_id;
+                const merchId = item.merchId ?? item.merch_id;
+                if (songId) {
+                    purchaseData.songIds.push(songId);
+                } else if (albumId) {
+                    purchaseData.albumIds.push(albumId);
+                } else if (merchId) {
+                    purchaseData.merchIds.push(merchId);
+                }
+            });
+
+            pending = {
+                key: (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`,
+                paymentMethodId: paymentMethodId,
+                data: purchaseData
+            };
+            window.pendingCheckout = pending;
+        }
 
-        // Realizar la compra mediante POST /purchase
+        console.log('Cart.js: Sending purchase data:', pending.data);
+
+        // Encolar la compra mediante POST /purchase
         const response = await fetch('/purchase', {
             method: 'POST',
             credentials: 'include',
             headers: {
                 'Content-Type': 'application/json',
-                'Accept': 'application/json'
+                'Accept': 'application/json',
+                'Idempotency-Key': pending.key
             },
-            body: JSON.stringify(purchaseData)
+            body: JSON.stringify(pending.data)
         });
 
         if (!response.ok) {
             const errorData = await response.json().catch(() => ({}));
             console.error('Cart.js: Payment failed:', errorData);
+            // Solo los errores de validación descartan el pedido; el resto se puede reintentar
+            if (response.status === 400 || response.status === 422) {
+                window.pendingCheckout = null;
+            }
             throw new Error(errorData.message || errorData.error || 'Error al procesar la compra');
         }
 
-        const result = await response.json();
-        console.log('Cart.js: Payment successful:', result);
-        
+        const order = await waitForCheckout(await response.json());
+        console.log('Cart.js: Checkout finished:', order);
+        // Con estado 'unknown' TPP puede haber cobrado: se conserva la clave para
+        // que un reintento devuelva el mismo pedido en lugar de crear otro
+        if (order.status !== 'unknown') {
+            window.pendingCheckout = null;
+        }
+
+        if (order.status !== 'done') {
+            throw new Error(order.error || 'Error al procesar la compra');
+        }
+
         showNotification('¡Compra realizada con éxito!');
         
         // Limpiar el carrito localmente (el backend ya lo limpia en BD)
@@ -485,7 +599,42 @@ async function processPay() {
     } catch (error) {
         console.error('Cart.js: Payment error:', error);
         showNotification(`Error: ${error.message}`);
+    } finally {
+        window.checkoutInProgress = false;
+        if (btnCheckout) btnCheckout.disabled = false;
+    }
+}
+
+/**
+ * Consulta el estado de un pedido hasta que termina
+ * @param {Object} order - Respuesta de POST /purchase: {checkoutId, status, purchaseId, error}
+ * @returns {Promise<Object>} El pedido en estado 'done', 'failed' o 'unknown'
+ */
+async function waitForCheckout(order) {
+    const deadline = Date.now() + CHECKOUT_POLL_TIMEOUT;
+    while (order.status === 'pending' || order.status === 'processing') {
+        if (Date.now() > deadline) {
+            throw new Error('La compra está tardando más de lo normal, revisa tus pedidos más tarde');
+        }
+        await new Promise(resolve => setTimeout(resolve, CHECKOUT_POLL_INTERVAL));
+        try {
+            const response = await fetch(`/purchase/${order.checkoutId}`, {
+                method: 'GET',
+                credentials: 'include',
+                headers: { 'Accept': 'application/json' }
+            });
+            if (response.ok) {
+                order = await response.json();
+            } else if (response.status === 404) {
+                throw new Error('No se encontró el pedido');
+            }
+        } catch (error) {
+            // Un fallo puntual de red no cancela la espera
+            if (error.message === 'No se encontró el pedido') throw error;
+            console.warn('Cart.js: Error consultando el pedido:', error);
+        }
     }
+    return order;
 }
 
 /**
@@ -319,25 +319,61 @@ async function getFavoriteMerch() {
     }
 }
 
+// Tipo de los eventos favoriteToggled -> clave de /favs/state
+const FAVORITE_STATE_KEYS = { song: 'songs', album: 'albums', artist: 'artists', merch: 'merch' };
+
+let favoritesStatePromise = null;
+
+/**
+ * Obtiene los ids favoritos del usuario de todos los tipos con una sola
+ * petición a /favs/state, que se hace como mucho una vez por página
+ * @returns {Promise<Object>} {songs: Set, albums: Set, artists: Set, merch: Set}
+ */
+function getFavoritesState() {
+    if (!favoritesStatePromise) {
+        favoritesStatePromise = fetch('/favs/state', {
+            method: 'GET',
+            credentials: 'include',
+            headers: { 'Accept': 'application/json' }
+        })
+            .then(response => response.ok ? response.json() : {})
+            .catch(error => {
+                console.error('Error al obtener el estado de favoritos:', error);
+                return {};
+            })
+            .then(data => {
+                const state = {};
+                Object.values(FAVORITE_STATE_KEYS).forEach(key => {
+                    state[key] = new Set(data[key] || []);
+                });
+                return state;
+            });
+    }
+    return favoritesStatePromise;
+}
+
+// Mantener el estado al día con los cambios hechos en la propia página
+window.addEventListener('favoriteToggled', (e) => {
+    if (!favoritesStatePromise) return;
+    const key = FAVORITE_STATE_KEYS[e.detail.type];
+    favoritesStatePromise.then(state => {
+        if (!key) return;
+        if (e.detail.isFavorited) {
+            state[key].add(e.detail.id);
+        } else {
+            state[key].delete(e.detail.id);
+        }
+    });
+});
+
 /**
  * Verifica si una canción es favorita del usuario actual
  * @param {number} songId - ID de la canción
  * @returns {Promise<boolean>} True si es favorita
  */
 async function isSongFavorited(songId) {
-    try {
-        const favorites = await getFavoriteSongs();
-        // SYU API returns an array of ids (integers) but some endpoints might
-        // return objects with an `id` field. Be robust and accept both.
-        return favorites.some(item => {
-            if (typeof item === 'number') return item === songId;
-            if (item && (item.id !== undefined)) return item.id === songId;
-            return false;
-        });
-    } catch (error) {
-        console.error('Error verificando si es favorito:', error);
-        return false;
-    }
+    const state = await getFavoritesState();
+    return state.songs.has(songId);
 }
 
 /**
@@ -346,17 +382,8 @@ async function isSongFavorited(songId) {
  * @returns {Promise<boolean>} True si es favorito
  */
 async function isAlbumFavorited(albumId) {
-    try {
-        const favorites = await getFavoriteAlbums();
-        return favorites.some(item => {
-            if (typeof item === 'number') return item === albumId;
-            if (item && (item.id !== undefined)) return item.id === albumId;
-            return false;
-        });
-    } catch (error) {
-        console.error('Error verificando si es favorito:', error);
-        return false;
-    }
+    const state = await getFavoritesState();
+    return state.albums.has(albumId);
 }
 
 /**
@@ -365,17 +392,8 @@ async function isAlbumFavorited(albumId) {
  * @returns {Promise<boolean>} True si es favorita
  */
 async function isMerchFavorited(merchId) {
-    try {
-        const favorites = await getFavoriteMerch();
-        return favorites.some(item => {
-            if (typeof item === 'number') return item === merchId;
-            if (item && (item.id !== undefined)) return item.id === merchId;
-            return false;
-        });
-    } catch (error) {
-        console.error('Error verificando si es favorito:', error);
-        return false;
-    }
+    const state = await getFavoritesState();
+    return state.merch.has(merchId);
 }
 
 /**
@@ -437,120 +455,37 @@ function showFavoritesNotification(message, type = 'info') {
  * Se debe llamar cuando el DOM esté listo
  */
 async function initializeFavoriteButtons() {
-    // Botones de favorito para canciones
-    const favoriteSongButtons = document.querySelectorAll('[data-fav-song]');
-    favoriteSongButtons.forEach(button => {
-        button.addEventListener('click', (e) => {
-            e.preventDefault();
-            e.stopPropagation();
-            const songId = parseInt(button.dataset.favSong);
-            toggleFavoriteSong(songId, button);
-        });
-    });
-
-    // Ajustar estado visual inicial para botones de canción
-    try {
-        const songIds = Array.from(favoriteSongButtons).map(b => parseInt(b.dataset.favSong)).filter(Boolean);
-        if (songIds.length) {
-            const favs = await getFavoriteSongs();
-            favoriteSongButtons.forEach(button => {
-                const id = parseInt(button.dataset.favSong);
-                let isFav = false;
-                if (favs && favs.length) {
-                    isFav = favs.some(item => (typeof item === 'number' ? item === id : (item && item.id !== undefined ? item.id === id : false)));
-                }
-                updateFavoriteButtonState(button, isFav);
-            });
-        }
-    } catch (e) {
-        console.warn('Error inicializando estados de canciones favoritos:', e);
-    }
-
-    // Botones de favorito para álbumes
-    const favoriteAlbumButtons = document.querySelectorAll('[data-fav-album]');
-    favoriteAlbumButtons.forEach(button => {
-        button.addEventListener('click', (e) => {
-            e.preventDefault();
-            e.stopPropagation();
-            const albumId = parseInt(button.dataset.favAlbum);
-            toggleFavoriteAlbum(albumId, button);
-        });
-    });
-
-    // Ajustar estado visual inicial para botones de álbum
-    try {
-        const albumIds = Array.from(favoriteAlbumButtons).map(b => parseInt(b.dataset.favAlbum)).filter(Boolean);
-        if (albumIds.length) {
-            const favs = await getFavoriteAlbums();
-            favoriteAlbumButtons.forEach(button => {
-                const id = parseInt(button.dataset.favAlbum);
-                let isFav = false;
-                if (favs && favs.length) {
-                    isFav = favs.some(item => (typeof item === 'number' ? item === id : (item && item.id !== undefined ? item.id === id : false)));
-                }
-                updateFavoriteButtonState(button, isFav);
+    // [selector, atributo data-*, clave de /favs/state, función de alternar]
+    const kinds = [
+        ['[data-fav-song]', 'favSong', 'songs', toggleFavoriteSong],
+        ['[data-fav-album]', 'favAlbum', 'albums', toggleFavoriteAlbum],
+        ['[data-fav-artist]', 'favArtist', 'artists', toggleFavoriteArtist],
+        ['[data-fav-merch]', 'favMerch', 'merch', toggleFavoriteMerch]
+    ];
+
+    // Botones cuyo estado no ha pintado ya el servidor (data-fav-liked)
+    const pending = [];
+    kinds.forEach(([selector, attribute, key, toggle]) => {
+        document.querySelectorAll(selector).forEach(button => {
+            const id = parseInt(button.dataset[attribute]);
+            button.addEventListener('click', (e) => {
+                e.preventDefault();
+                e.stopPropagation();
+                toggle(id, button);
             });
-        }
-    } catch (e) {
-        console.warn('Error inicializando estados de álbumes favoritos:', e);
-    }
-
-    // Botones de favorito para artistas
-    const favoriteArtistButtons = document.querySelectorAll('[data-fav-artist]');
-    favoriteArtistButtons.forEach(button => {
-        button.addEventListener('click', (e) => {
-            e.preventDefault();
-            e.stopPropagation();
-            const artistId = parseInt(button.dataset.favArtist);
-            toggleFavoriteArtist(artistId, button);
-        });
-    });
-
-    // Ajustar estado visual inicial para botones de artista
-    try {
-        const artistIds = Array.from(favoriteArtistButtons).map(b => parseInt(b.dataset.favArtist)).filter(Boolean);
-        if (artistIds.length) {
-            const favs = await getFavoriteArtists();
-            favoriteArtistButtons.forEach(button => {
-                const id = parseInt(button.dataset.favArtist);
-                let isFav = false;
-                if (favs && favs.length) {
-                    isFav = favs.some(item => (typeof item === 'number' ? item === id : (item && item.id !== undefined ? item.id === id : false)));
-                }
-                updateFavoriteButtonState(button, isFav);
-            });
-        }
-    } catch (e) {
-        console.warn('Error inicializando estados de artistas favoritos:', e);
-    }
-
-    // Botones de favorito para mercancía
-    const favoriteMerchButtons = document.querySelectorAll('[data-fav-merch]');
-    favoriteMerchButtons.forEach(button => {
-        button.addEventListener('click', (e) => {
-            e.preventDefault();
-            e.stopPropagation();
-            const merchId = parseInt(button.dataset.favMerch);
-            toggleFavoriteMerch(merchId, button);
+            if (button.dataset.favLiked === undefined && id) {
+                pending.push([button, key, id]);
+            }
         });
     });
 
-    // Ajustar estado visual inicial para botones de merch
+    // Ajustar estado visual inicial con una sola consulta para todos los tipos
+    if (!pending.length) return;
     try {
-        const merchIds = Array.from(favoriteMerchButtons).map(b => parseInt(b.dataset.favMerch)).filter(Boolean);
-        if (merchIds.length) {
-            const favs = await getFavoriteMerch();
-            favoriteMerchButtons.forEach(button => {
-                const id = parseInt(button.dataset.favMerch);
-                let isFav = false;
-                if (favs && favs.length) {
-                    isFav = favs.some(item => (typeof item === 'number' ? item === id : (item && item.id !== undefined ? item.id === id : false)));
-                }
-                updateFavoriteButtonState(button, isFav);
-            });
-        }
+        const state = await getFavoritesState();
+        pending.forEach(([button, key, id]) => updateFavoriteButtonState(button, state[key].has(id)));
     } catch (e) {
-        console.warn('Error inicializando estados de mercancía favoritos:', e);
+        console.warn('Error inicializando estados de favoritos:', e);
     }
 }
 
@@ -145,25 +145,25 @@ function initSearch() {
             return;
         }
 
-        // Buscar solo si hay al menos 3 caracteres
-        if (query.length < 3) {
-            searchResults.style.display = 'none';
-            return;
-        }
-
-        // Cancelar búsqueda anterior
+        // Cancelar sugerencia anterior
         clearTimeout(searchTimeout);
 
-        // Mostrar loading
-        searchResults.style.display = 'block';
-        searchLoading.style.display = 'flex';
-        searchContent.innerHTML = '';
-        searchNoResults.style.display = 'none';
-
-        // Ejecutar búsqueda después de 300ms
+        // Sugerencias desde la primera letra (respuestas de pocos cientos de bytes);
+        // la búsqueda completa se lanza con Enter o desde la última fila
         searchTimeout = setTimeout(() => {
-            performSearch(query);
-        }, 300);
+            performSuggest(query);
+        }, 80);
+    });
+
+    // Enter: búsqueda completa en todos los endpoints
+    searchInput.addEventListener('keydown', (e) => {
+        if (e.key !== 'Enter') return;
+        e.preventDefault();
+        const query = searchInput.value.trim();
+        if (query.length < 3) return;
+        clearTimeout(searchTimeout);
+        showLoading();
+        performSearch(query);
     });
 
     // Botón de limpiar
@@ -185,11 +185,113 @@ function initSearch() {
 
     // Reabrir resultados si hay query al hacer focus
     searchInput.addEventListener('focus', () => {
-        if (currentQuery.length >= 3 && searchContent.innerHTML) {
+        if (currentQuery.length > 0 && searchContent.innerHTML) {
             searchResults.style.display = 'block';
         }
     });
 
+    function showLoading() {
+        searchResults.style.display = 'block';
+        searchLoading.style.display = 'flex';
+        searchContent.innerHTML = '';
+        searchNoResults.style.display = 'none';
+    }
+
+    /**
+     * Pide las sugerencias de /api/suggest para lo escrito hasta ahora
+     */
+    async function performSuggest(query) {
+        try {
+            const response = await fetch(`/api/suggest?q=${encodeURIComponent(query)}`);
+            const suggestions = response.ok ? await response.json() : [];
+
+            // Se ha seguido escribiendo mientras llegaba la respuesta
+            if (query !== currentQuery) return;
+
+            searchResults.style.display = 'block';
+            searchLoading.style.display = 'none';
+            searchContent.innerHTML = '';
+            searchNoResults.style.display = 'none';
+
+            suggestions.forEach(item => {
+                searchContent.appendChild(createSuggestionItem(item));
+            });
+
+            if (query.length >= 3) {
+                searchContent.appendChild(createSearchAllItem(query));
+            } else if (suggestions.length === 0) {
+                searchNoResults.style.display = 'flex';
+            }
+        } catch (error) {
+            console.error('Error obteniendo sugerencias:', error);
+        }
+    }
+
+    /**
+     * Crea una sugerencia: {type, id, name, artist}
+     */
+    function createSuggestionItem(item) {
+        const link = document.createElement('a');
+        link.className = 'search-item';
+        link.href = `/${item.type}/${item.id}`;
+        link.addEventListener('click', () => {
+            searchResults.style.display = 'none';
+        });
+
+        const placeholder = document.createElement('div');
+        placeholder.className = `search-item-placeholder ${item.type === 'artist' ? 'artist' : ''}`;
+        placeholder.innerHTML = getIconForType(item.type);
+        link.appendChild(placeholder);
+
+        const info = document.createElement('div');
+        info.className = 'search-item-info';
+
+        const titleEl = document.createElement('div');
+        titleEl.className = 'search-item-title';
+        titleEl.textContent = item.name;
+        info.appendChild(titleEl);
+
+        const subtitleEl = document.createElement('div');
+        subtitleEl.className = 'search-item-subtitle';
+        subtitleEl.textContent = item.type === 'artist' ? 'Artista' : (item.artist || '');
+        info.appendChild(subtitleEl);
+        link.appendChild(info);
+
+        const typeBadge = document.createElement('span');
+        typeBadge.className = `search-item-type ${item.type}`;
+        typeBadge.textContent = item.type === 'song' ? 'Canción'
+            : item.type === 'album' ? 'Álbum'
+            : item.type === 'artist' ? 'Artista'
+            : 'Merch';
+        link.appendChild(typeBadge);
+
+        return link;
+    }
+
+    /**
+     * Última fila de las sugerencias: lanza la búsqueda completa
+     */
+    function createSearchAllItem(query) {
+        const link = document.createElement('a');
+        link.className = 'search-item';
+        link.href = '#';
+        link.addEventListener('click', (e) => {
+            e.preventDefault();
+            showLoading();
+            performSearch(query);
+        });
+
+        const info = document.createElement('div');
+        info.className = 'search-item-info';
+        const titleEl = document.createElement('div');
+        titleEl.className = 'search-item-title';
+        titleEl.textContent = `Ver todos los resultados de "${query}"`;
+        info.appendChild(titleEl);
+        link.appendChild(info);
+
+        return link;
+    }
+
     /**
      * Realiza la búsqueda en todos los endpoints
      */
@@ -384,15 +486,17 @@ function initSearch() {
 }
 
 /**
- * Actualiza el badge del carrito en el header
+ * Actualiza el badge del carrito en el header con /cart/summary
+ * @param {Event} [event] - Evento cartUpdated; sin él, se respeta el contador ya pintado por el servidor
  */
-async function updateCartBadge() {
+async function updateCartBadge(event) {
     const cartBadge = document.getElementById('cart-badge');
     
     if (!cartBadge) return;
+    if (!event && cartBadge.dataset.cartCount !== undefined) return;
 
     try {
-        const response = await fetch('/cart', {
+        const response = await fetch('/cart/summary', {
             method: 'GET',
             credentials: 'include',
             headers: {
@@ -401,9 +505,10 @@ async function updateCartBadge() {
         });
 
         if (response.ok) {
-            const cart = await response.json();
-            const totalItems = cart.length;
+            const summary = await response.json();
+            const totalItems = summary.count || 0;
 
+            cartBadge.dataset.cartCount = totalItems;
             if (totalItems > 0) {
                 cartBadge.textContent = totalItems;
                 cartBadge.style.display = 'flex';
@@ -1,12 +1,16 @@
-// Shop Page JavaScript - Custom Dropdowns & Pagination
+// Shop Page JavaScript - Custom Dropdowns & Infinite Scroll
 
-// Estado de la paginación para cada sección
+// Estado del scroll infinito de cada sección: cursor de la página siguiente
+// (vacío si no quedan más) y si hay una petición en curso
 const paginationState = {
-    songs: { currentPage: 1, itemsPerPage: 9 },
-    albums: { currentPage: 1, itemsPerPage: 9 },
-    merch: { currentPage: 1, itemsPerPage: 9 }
+    songs: { kind: 'song', nextCursor: '', loading: false },
+    albums: { kind: 'album', nextCursor: '', loading: false },
+    merch: { kind: 'merch', nextCursor: '', loading: false }
 };
 
+// Precio por defecto de cada tipo (igual que la plantilla)
+const DEFAULT_PRICES = { song: '0.99', album: '9.99', merch: '19.99' };
+
 // Inicialización cuando el DOM está listo
 document.addEventListener('DOMContentLoaded', () => {
     initCustomDropdowns();
@@ -18,94 +22,161 @@ document.addEventListener('DOMContentLoaded', () => {
     restoreScrollPosition();
 });
 
-// ============ PAGINATION ============
+// ============ INFINITE SCROLL ============
 function initPagination() {
-    // Inicializar paginación para cada sección
     ['songs', 'albums', 'merch'].forEach(section => {
-        updatePagination(section);
+        const grid = document.getElementById(`${section}-grid`);
+        if (!grid) return;
+
+        const state = paginationState[section];
+        state.nextCursor = grid.dataset.nextCursor || '';
+        grid.querySelectorAll('.product-card').forEach(card => card.classList.add('visible'));
+        updatePageInfo(section);
+
+        if (!state.nextCursor) return;
+
+        // Al acercarse al final de la sección se pide la página siguiente con
+        // el cursor; el servidor ya la está precargando
+        const sentinel = document.createElement('div');
+        sentinel.className = 'infinite-sentinel';
+        grid.after(sentinel);
+        const observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNextPage(section, observer, sentinel);
+            }
+        }, { rootMargin: '400px 0px' });
+        observer.observe(sentinel);
     });
 }
 
-function updatePagination(section) {
-    const grid = document.getElementById(`${section}-grid`);
-    if (!grid) return;
-
-    const cards = Array.from(grid.querySelectorAll('.product-card'));
+async function loadNextPage(section, observer, sentinel) {
     const state = paginationState[section];
-    const totalPages = Math.ceil(cards.length / state.itemsPerPage);
+    if (state.loading || !state.nextCursor) return;
+    state.loading = true;
 
-    // Ocultar todas las cards primero
-    cards.forEach(card => card.classList.remove('visible'));
-
-    // Mostrar solo las cards de la página actual
-    const start = (state.currentPage - 1) * state.itemsPerPage;
-    const end = start + state.itemsPerPage;
-    cards.slice(start, end).forEach(card => card.classList.add('visible'));
+    const grid = document.getElementById(`${section}-grid`);
+    const params = new URLSearchParams(window.location.search);
+    params.delete('page');
+    params.set('kind', state.kind);
+    params.set('cursor', state.nextCursor);
+    if (grid.dataset.pageSize) params.set('size', grid.dataset.pageSize);
 
-    // Actualizar info de página
-    const pageInfo = document.getElementById(`${section}-page-info`);
-    if (pageInfo && cards.length > 0) {
-        pageInfo.textContent = `Página ${state.currentPage} de ${totalPages}`;
+    try {
+        const response = await fetch(`/shop?${params.toString()}`, {
+            headers: { 'Accept': 'application/json' }
+        });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const data = await response.json();
+
+        data.items.forEach(item => {
+            const card = createProductCard(state.kind, item);
+            grid.appendChild(card);
+            if (isAuthenticated) {
+                card.querySelector('.btn-add-cart')?.addEventListener('click', handleAddToCart);
+            }
+        });
+        state.nextCursor = data.next || '';
+        updatePageInfo(section);
+    } catch (error) {
+        console.error('Error cargando más productos:', error);
+        state.nextCursor = '';
+    } finally {
+        state.loading = false;
     }
 
-    // Crear botones de paginación
-    const paginationContainer = document.getElementById(`${section}-pagination`);
-    if (paginationContainer && totalPages > 1) {
-        paginationContainer.innerHTML = '';
-        
-        // Botón anterior
-        if (state.currentPage > 1) {
-            const prevBtn = document.createElement('button');
-            prevBtn.className = 'pagination-btn';
-            prevBtn.textContent = '← Anterior';
-            prevBtn.onclick = () => {
-                state.currentPage--;
-                updatePagination(section);
-                scrollToSection(section);
-            };
-            paginationContainer.appendChild(prevBtn);
-        }
+    if (!state.nextCursor) {
+        observer.disconnect();
+        sentinel.remove();
+    }
+}
 
-        // Botones de página
-        for (let i = 1; i <= totalPages; i++) {
-            if (i === 1 || i === totalPages || (i >= state.currentPage - 1 && i <= state.currentPage + 1)) {
-                const pageBtn = document.createElement('button');
-                pageBtn.className = `pagination-btn ${i === state.currentPage ? 'active' : ''}`;
-                pageBtn.textContent = i;
-                pageBtn.onclick = () => {
-                    state.currentPage = i;
-                    updatePagination(section);
-                    scrollToSection(section);
-                };
-                paginationContainer.appendChild(pageBtn);
-            } else if (i === state.currentPage - 2 || i === state.currentPage + 2) {
-                const dots = document.createElement('span');
-                dots.className = 'pagination-dots';
-                dots.textContent = '...';
-                paginationContainer.appendChild(dots);
-            }
-        }
+function updatePageInfo(section) {
+    const grid = document.getElementById(`${section}-grid`);
+    const pageInfo = document.getElementById(`${section}-page-info`);
+    if (!grid || !pageInfo) return;
+    const count = grid.querySelectorAll('.product-card').length;
+    pageInfo.textContent = paginationState[section].nextCursor
+        ? `${count} productos, desplázate para ver más`
+        : `${count} productos`;
+}
 
-        // Botón siguiente
-        if (state.currentPage < totalPages) {
-            const nextBtn = document.createElement('button');
-            nextBtn.className = 'pagination-btn';
-            nextBtn.textContent = 'Siguiente →';
-            nextBtn.onclick = () => {
-                state.currentPage++;
-                updatePagination(section);
-                scrollToSection(section);
-            };
-            paginationContainer.appendChild(nextBtn);
-        }
+/**
+ * Tarjeta de un producto recibido en JSON, con el mismo marcado que la plantilla
+ */
+function createProductCard(kind, item) {
+    const id = item[`${kind}Id`];
+    const title = item.title || 'Sin título';
+    const grid = document.querySelector(`.products-grid[data-kind="${kind}"]`);
+
+    const card = document.createElement('div');
+    card.className = 'product-card visible';
+    card.dataset.type = kind;
+    card.dataset.index = grid ? grid.querySelectorAll('.product-card').length : 0;
+
+    const image = document.createElement('div');
+    image.className = 'product-image';
+    const img = document.createElement('img');
+    img.src = `${document.querySelector('.products-container').dataset.staticBase}${item.cover || `img/utils/default-${kind}.svg`}`;
+    img.alt = item.title || (kind === 'song' ? 'Canción' : kind === 'album' ? 'Álbum' : 'Merchandising');
+    img.loading = 'lazy';
+    const overlay = document.createElement('div');
+    overlay.className = 'product-overlay';
+    const link = document.createElement('a');
+    link.href = `/${kind}/${id}`;
+    link.className = 'btn-view';
+    link.textContent = 'Ver Detalles';
+    overlay.appendChild(link);
+    image.append(img, overlay);
+
+    const info = document.createElement('div');
+    info.className = 'product-info';
+    const name = document.createElement('h3');
+    name.className = 'product-name';
+    name.textContent = title;
+    const artist = document.createElement('p');
+    artist.className = 'product-artist';
+    artist.textContent = filterName('artist', item.artistId) || 'Artista desconocido';
+    info.append(name, artist);
+
+    if (kind === 'album' && item.songs && item.songs.length) {
+        info.appendChild(textElement('p', 'product-meta', `${item.songs.length} canciones`));
+    }
+    const genre = item.genres && item.genres.length ? filterName('genre', item.genres[0]) : null;
+    if (genre) {
+        info.appendChild(textElement('p', 'product-genre', genre));
     }
+    if (kind === 'merch' && item.description) {
+        info.appendChild(textElement('p', 'product-description', `${item.description.slice(0, 100)}...`));
+    }
+
+    const footer = document.createElement('div');
+    footer.className = 'product-footer';
+    const price = textElement('span', 'product-price',
+        `€${item.price ? Number(item.price).toFixed(2) : DEFAULT_PRICES[kind]}`);
+    const button = document.createElement('button');
+    button.className = 'btn-add-cart';
+    button.dataset.productId = id;
+    button.dataset.productType = kind;
+    button.innerHTML = '<svg width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><circle cx="9" cy="21" r="1"></circle><circle cx="20" cy="21" r="1"></circle><path d="M1 1h4l2.68 13.39a2 2 0 0 0 2 1.61h9.72a2 2 0 0 0 2-1.61L23 6H6"></path></svg>';
+    footer.append(price, button);
+    info.appendChild(footer);
+
+    card.append(image, info);
+    return card;
 }
 
-function scrollToSection(section) {
-    const sectionElement = document.getElementById(`${section}-section`);
-    if (sectionElement) {
-        sectionElement.scrollIntoView({ behavior: 'smooth', block: 'start' });
-    }
+function textElement(tag, className, text) {
+    const element = document.createElement(tag);
+    element.className = className;
+    element.textContent = text;
+    return element;
+}
+
+// Nombre de un género o artista a partir de los checkboxes de los filtros
+function filterName(type, id) {
+    if (id === null || id === undefined) return null;
+    const checkbox = document.querySelector(`.${type}-checkbox[value="${id}"]`);
+    return checkbox ? checkbox.dataset.name : null;
 }
 
 // ============ CUSTOM DROPDOWNS ============
@@ -196,6 +267,13 @@ function updateDropdownText(type, checkboxes, textElement) {
     }
 }
 
+// Un filtro ya marcado se puede desmarcar aunque su recuento sea 0
+function selectFacet(checkbox) {
+    checkbox.checked = true;
+    checkbox.disabled = false;
+    checkbox.closest('.dropdown-item')?.classList.remove('facet-empty');
+}
+
 function preselectFiltersFromURL() {
     const urlParams = new URLSearchParams(window.location.search);
     
@@ -205,7 +283,7 @@ function preselectFiltersFromURL() {
         const genreIds = genresParam.split(',');
         genreIds.forEach(id => {
             const checkbox = document.querySelector(`.genre-checkbox[value="${id}"]`);
-            if (checkbox) checkbox.checked = true;
+            if (checkbox) selectFacet(checkbox);
         });
         
         const genreCheckboxes = document.querySelectorAll('.genre-checkbox');
@@ -221,7 +299,7 @@ function preselectFiltersFromURL() {
         const artistIds = artistsParam.split(',');
         artistIds.forEach(id => {
             const checkbox = document.querySelector(`.artist-checkbox[value="${id}"]`);
-            if (checkbox) checkbox.checked = true;
+            if (checkbox) selectFacet(checkbox);
         });
         
         const artistCheckboxes = document.querySelectorAll('.artist-checkbox');
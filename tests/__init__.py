@@ -0,0 +1,3 @@
+"""
+Pruebas automáticas del FND.
+"""
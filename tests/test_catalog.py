@@ -0,0 +1,190 @@
+"""
+Pruebas del índice local del catálogo (controller/catalog.py) sobre un
+catálogo sintético: filtros y orden iguales a /{kind}/filter de TYA, cursores
+de la tienda y recuentos de facets, comparados con una implementación directa.
+"""
+import itertools
+import random
+
+import pytest
+
+import controller.catalog as catalog
+
+GENRES = range(1, 9)
+ARTISTS = range(1, 13)
+ORDERS = [(None, None), ("date", "asc"), ("date", "desc"), ("name", "asc"), ("name", "desc")]
+SELECTIONS = [
+    (set(), set()),
+    ({1}, set()),
+    ({2, 5}, set()),
+    (set(), {3}),
+    (set(), {1, 4, 7}),
+    ({1, 2, 3}, {2, 6}),
+    ({8}, {5}),
+    ({99}, set()),
+]
+
+
+def _rows(seed: int, size: int, with_genres: bool = True) -> dict:
+    # Pocas fechas y nombres distintos para que haya empates en los dos órdenes
+    rng = random.Random(seed)
+    rows = {}
+    for entity_id in rng.sample(range(1, size * 3), size):
+        genres = tuple(sorted(rng.sample(GENRES, rng.randint(0, 3)))) if with_genres else ()
+        artist_id = rng.choice(ARTISTS) if rng.random() > 0.05 else None
+        rows[entity_id] = (f"2024-01-{rng.randint(1, 20):02d}", rng.choice(["alba", "brisa", "cielo", "duna", ""]),
+                           artist_id, genres)
+    return rows
+
+
+def _expected(rows: dict, genres, artists, order, direction) -> list:
+    """
+    Lo que devolvería TYA: OR dentro de cada filtro, AND entre ambos y, a
+    igualdad de valor, el id ascendente en los dos sentidos.
+    """
+    ids = [entity_id for entity_id in sorted(rows)
+           if (not genres or set(rows[entity_id][3]) & genres) and (not artists or rows[entity_id][2] in artists)]
+    if order:
+        column = catalog._ORDER_COLUMNS[order]
+        ids = sorted(ids, key=lambda entity_id: rows[entity_id][column], reverse=direction == "desc")
+    return ids
+
+
+def _params(genres, artists, order, direction, page=None) -> dict:
+    params = {"genres": ",".join(map(str, sorted(genres))), "artists": ",".join(map(str, sorted(artists)))}
+    if order:
+        params.update(order=order, direction=direction)
+    if page is not None:
+        params["page"] = str(page)
+    return params
+
+
+@pytest.fixture
+def indexes(monkeypatch):
+    loaded = {
+        "song": catalog.Index(_rows(1, 400)),
+        "album": catalog.Index(_rows(2, 120)),
+        "merch": catalog.Index(_rows(3, 60, with_genres=False), has_genres=False),
+    }
+    monkeypatch.setattr(catalog, "_indexes", dict(loaded))
+    monkeypatch.setattr(catalog, "_facets_cache", (None, {}))
+    return loaded
+
+
+@pytest.mark.parametrize("order,direction", ORDERS)
+@pytest.mark.parametrize("genres,artists", SELECTIONS)
+def test_query_matches_tya(indexes, genres, artists, order, direction):
+    index = indexes["song"]
+    expected = _expected(index.rows, genres, artists, order, direction)
+    assert index.query(genres, artists, order, direction) == expected
+    for page in range(1, len(expected) // catalog.PAGE_SIZE + 3):
+        start = (page - 1) * catalog.PAGE_SIZE
+        assert index.query(genres, artists, order, direction, page) == expected[start:start + catalog.PAGE_SIZE]
+
+
+def test_filter_pages_match_tya(indexes):
+    rows = indexes["song"].rows
+    for genres, artists in SELECTIONS:
+        for order, direction in ORDERS:
+            expected = _expected(rows, genres, artists, order, direction)
+            assert catalog.filter("song", _params(genres, artists, order, direction, 2)) == expected[9:18]
+
+
+def test_filter_leaves_merch_genres_to_tya(indexes):
+    assert catalog.filter("merch", _params({1}, set(), None, None)) is None
+    assert catalog.filter("merch", _params(set(), {1}, None, None)) == _expected(indexes["merch"].rows, set(), {1}, None, None)
+
+
+def _walk(kind: str, params: dict, size: int) -> list:
+    seen = []
+    ids, cursor = catalog.page(kind, params, size)
+    seen.extend(ids)
+    while cursor:
+        ids, cursor = catalog.page(kind, params, size, cursor)
+        seen.extend(ids)
+    return seen
+
+
+@pytest.mark.parametrize("order,direction", ORDERS)
+@pytest.mark.parametrize("genres,artists", SELECTIONS)
+def test_cursor_walk_has_no_gaps_or_duplicates(indexes, genres, artists, order, direction):
+    expected = _expected(indexes["song"].rows, genres, artists, order, direction)
+    for size in (1, 7, catalog.PAGE_SIZE):
+        assert _walk("song", _params(genres, artists, order, direction), size) == expected
+
+
+@pytest.mark.parametrize("order,direction", ORDERS)
+def test_cursor_survives_changes_between_pages(indexes, order, direction):
+    rows = dict(indexes["song"].rows)
+    params = _params(set(), set(), order, direction)
+    visited = []
+    removed = []
+    counter = itertools.count(10_000)
+
+    def change():
+        # Entre página y página se borra la última fila vista y se añade una nueva
+        rows.pop(visited[-1], None)
+        removed.append(visited[-1])
+        rows[next(counter)] = ("2024-01-10", "cielo", 1, (1,))
+        catalog._indexes["song"] = catalog.Index(dict(rows))
+
+    ids, cursor = catalog.page("song", params, 5)
+    visited.extend(ids)
+    while cursor:
+        change()
+        ids, cursor = catalog.page("song", params, 5, cursor)
+        visited.extend(ids)
+
+    assert len(visited) == len(set(visited))
+    # Toda fila que existía al empezar y no se ha borrado aparece una vez
+    original = set(indexes["song"].rows) - set(removed)
+    assert original <= set(visited)
+    # Y en el orden de TYA
+    final = _expected(rows, set(), set(), order, direction)
+    survivors = [entity_id for entity_id in visited if entity_id in rows]
+    assert survivors == [entity_id for entity_id in final if entity_id in set(survivors)]
+
+
+# Texto que no es base64, {} y [null, null, "x"]
+@pytest.mark.parametrize("cursor", ["no-es-un-cursor!", "e30", "W251bGwsbnVsbCwieCJd"])
+def test_bad_cursor_raises(indexes, cursor):
+    with pytest.raises(ValueError):
+        catalog.page("song", _params(set(), set(), "name", "asc"), 5, cursor)
+
+
+def test_cursor_from_another_order_raises(indexes):
+    _, cursor = catalog.page("song", _params(set(), set(), "date", "asc"), 5)
+    assert cursor is not None
+    with pytest.raises(ValueError):
+        catalog.page("song", _params(set(), set(), "date", "desc"), 5, cursor)
+    with pytest.raises(ValueError):
+        catalog.page("song", _params(set(), set(), None, None), 5, cursor)
+
+
+def _expected_count(rows: dict, genres, artists) -> int:
+    return sum(1 for _, _, artist_id, row_genres in rows.values()
+               if (not genres or set(row_genres) & genres) and (not artists or artist_id in artists))
+
+
+@pytest.mark.parametrize("genres,artists", SELECTIONS)
+def test_facet_counts(indexes, genres, artists):
+    facets = catalog.facets(",".join(map(str, genres)), ",".join(map(str, artists)), list(GENRES), list(ARTISTS))
+    kinds = ("song", "album", "merch")
+    for genre in GENRES:
+        # Un género cuenta con los artistas ya marcados
+        assert facets["genres"][genre] == tuple(_expected_count(indexes[kind].rows, {genre}, artists) for kind in kinds)
+    for artist_id in ARTISTS:
+        # Un artista cuenta con los géneros ya marcados
+        assert facets["artists"][artist_id] == tuple(_expected_count(indexes[kind].rows, genres, {artist_id})
+                                                     for kind in kinds)
+
+
+def test_merch_never_matches_a_genre(indexes):
+    facets = catalog.facets("1", "", list(GENRES), list(ARTISTS))
+    assert all(counts[2] == 0 for counts in facets["genres"].values())
+    assert all(counts[2] == 0 for counts in facets["artists"].values())
+
+
+def test_facets_need_every_index(indexes):
+    del catalog._indexes["album"]
+    assert catalog.facets("", "", [1], [1]) is None
@@ -0,0 +1,3 @@
+"""
+Utilidades de desarrollo del FND (generación de código a partir de las especificaciones).
+"""
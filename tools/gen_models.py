@@ -0,0 +1,131 @@
+"""
+GENERADOR DE LOS MODELOS TIPADOS DE controller/models.py.
+
+Lee los esquemas de TemasYArtistas.yaml y escribe una clase `msgspec.Struct`
+por cada entidad que devuelve TYA (Genre, Song, Album, Artist, Merchandising),
+más las variantes reducidas de SUMMARIES: solo los campos que usan las vistas
+de listas o el índice del catálogo, de modo que el decodificador se salta el
+resto (biografías, imágenes en base64, listas de ids) sin llegar a crear los
+objetos.
+
+    python -m tools.gen_models            # regenera controller/models.py
+    python -m tools.gen_models --check    # falla si el fichero está desactualizado
+
+Necesita PyYAML, que no forma parte de las dependencias del FND:
+
+    pip install -r tools/requirements.txt
+"""
+import argparse
+import os
+import sys
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPEC = os.path.join(ROOT, "TemasYArtistas.yaml")
+OUT = os.path.join(ROOT, "controller", "models.py")
+
+# Esquemas de entrada (altas) y errores no se decodifican en el FND
+SKIP_PREFIXES = ("Register",)
+SKIP = {"Error"}
+
+# Nombre de la variante -> (esquema, uso, campos que conserva)
+SUMMARIES = {
+    "ArtistSummary": ("Artist", "listas", ["artistId", "artisticName"]),
+    "SongSummary": ("Song", "listas", ["songId", "title", "artistId", "duration", "albumOrder", "trackId"]),
+    "AlbumSummary": ("Album", "listas", ["albumId", "title", "artistId", "releaseDate", "cover", "price"]),
+    "SongEntry": ("Song", "el índice del catálogo", ["songId", "title", "artistId", "releaseDate", "genres"]),
+    "AlbumEntry": ("Album", "el índice del catálogo", ["albumId", "title", "artistId", "releaseDate", "genres"]),
+    "MerchEntry": ("Merchandising", "el índice del catálogo", ["merchId", "title", "artistId", "releaseDate"]),
+    "ArtistEntry": ("Artist", "el índice del catálogo", ["artistId", "artisticName", "registrationDate"]),
+}
+
+TYPES = {
+    "integer": "int",
+    "number": "float",
+    "string": "str",
+    "boolean": "bool",
+}
+
+HEADER = '''"""
+Modelos tipados de las respuestas de TYA.
+
+GENERADO por tools/gen_models.py a partir de TemasYArtistas.yaml: no editar a
+mano, regenerar con `python -m tools.gen_models`.
+
+Se decodifican directamente de los bytes de la respuesta con
+`upstream.decode(resp, List[models.Song])`. Los campos no obligatorios en el
+esquema valen None si TYA no los envía y los desconocidos se ignoran.
+"""
+from typing import List, Optional
+
+import msgspec
+'''
+
+
+def _type(prop: dict) -> str:
+    if prop.get("type") == "array":
+        return f"List[{_type(prop.get('items') or {})}]"
+    return TYPES.get(prop.get("type"), "object")
+
+
+def _struct(name: str, schema: dict, fields: list = None, doc: str = None) -> str:
+    props = schema.get("properties") or {}
+    required = set(schema.get("required") or ())
+    lines = [f"class {name}(msgspec.Struct, gc=False):"]
+    if doc:
+        lines.append(f'    """{doc}"""')
+        lines.append("")
+    # Los obligatorios van primero: no pueden ir detrás de campos con valor por defecto
+    names = [f for f in (fields or props) if f in props]
+    names.sort(key=lambda f: f not in required)
+    for field in names:
+        annotation = _type(props[field])
+        if field in required:
+            lines.append(f"    {field}: {annotation}")
+        else:
+            lines.append(f"    {field}: Optional[{annotation}] = None")
+    return "\n".join(lines)
+
+
+def generate(spec_path: str = SPEC) -> str:
+    with open(spec_path, encoding="utf-8") as f:
+        schemas = yaml.safe_load(f)["components"]["schemas"]
+
+    blocks = [HEADER.rstrip("\n")]
+    for name, schema in schemas.items():
+        if name in SKIP or name.startswith(SKIP_PREFIXES):
+            continue
+        blocks.append(_struct(name, schema))
+    for name, (base, purpose, fields) in SUMMARIES.items():
+        missing = [f for f in fields if f not in schemas[base].get("properties", {})]
+        if missing:
+            raise SystemExit(f"{name}: campos que no existen en {base}: {', '.join(missing)}")
+        blocks.append(_struct(name, schemas[base], fields, f"{base} reducido para {purpose}: {', '.join(fields)}."))
+    return "\n\n\n".join(blocks) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera controller/models.py a partir de TemasYArtistas.yaml")
+    parser.add_argument("--spec", default=SPEC, help="especificación OpenAPI de TYA")
+    parser.add_argument("--out", default=OUT, help="fichero de salida")
+    parser.add_argument("--check", action="store_true", help="solo comprobar que el fichero está al día")
+    args = parser.parse_args(argv)
+
+    code = generate(args.spec)
+    if args.check:
+        try:
+            with open(args.out, encoding="utf-8") as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current != code:
+            print(f"{args.out} no está al día, regenerar con `python -m tools.gen_models`")
+            sys.exit(1)
+        return
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,21 @@
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
 from datetime import datetime
+import time
 
 templates = Jinja2Templates(directory="view/templates") # Esta ruta es la que se va a usar para renderizar las plantillas
 
+# Renderiza una plantilla y anota en request.state cuánto ha tardado (se publica en la cabecera Server-Timing)
+def _render(name: str, context: dict):
+    start = time.perf_counter()
+    response = templates.TemplateResponse(name, context)
+    state = context["request"].state
+    timings = getattr(state, "render_timings", None)
+    if timings is None:
+        timings = state.render_timings = []
+    timings.append((name, time.perf_counter() - start))
+    return response
+
 class View():
 
     def __init__(self): 
@@ -22,41 +34,41 @@ class View():
             rec_artists = []
 
         data = {"userdata": userdata, "syu_server": syu_server, "rye_server": rye_server, "tya_server": tya_server, "top_songs": top_songs, "top_artists": top_artists, "rec_songs": rec_songs, "rec_artists": rec_artists}
-        return templates.TemplateResponse("home.html", {"request" : request, "data": data})
+        return _render("home.html", {"request" : request, "data": data})
     
     # Renderizar la template login.html
     def get_login_view(self, request: Request, userdata: dict, fnd_server: str):
         data = {"userdata": userdata, "fnd_server": fnd_server}
-        return templates.TemplateResponse("login.html", {"request": request, "data": data})
+        return _render("login.html", {"request": request, "data": data})
 
     # Renderizar la template register.html
     def get_register_view(self, request: Request, userdata: dict, fnd_server: str):
         data = {"userdata": userdata, "fnd_server": fnd_server}
-        return templates.TemplateResponse("register.html", {"request": request, "data": data})
+        return _render("register.html", {"request": request, "data": data})
 
     # Renderizar la template de recuperación de contraseña
     def get_forgot_password_view(self, request: Request, userdata: dict, fnd_server: str):
         data = {"userdata": userdata, "fnd_server": fnd_server}
-        return templates.TemplateResponse("forgot_password.html", {"request": request, "data": data})
+        return _render("forgot_password.html", {"request": request, "data": data})
     
     # Renderizar la template de subir merchandising
     def get_upload_merch_view(self, request: Request, userdata: dict):
         data = {"userdata": userdata}
-        return templates.TemplateResponse("upload_merch.html", {"request": request, "data": data})
+        return _render("upload_merch.html", {"request": request, "data": data})
     
     # Renderizar la template de error
     def get_error_view(self, request: Request, userdata: dict, error_message: str, error_details: str = ""):
         data = {"userdata": userdata, "error_message": error_message, "error_details": error_details}
-        return templates.TemplateResponse("error.html", {"request": request, "data": data})
+        return _render("error.html", {"request": request, "data": data})
 
     # Renderizar la template shop.html
-    def get_shop_view(self, request: Request, userdata: dict, songs, genres, artistas, albums, merch, artists_map=None, genres_map=None, tya_server=None):
+    def get_shop_view(self, request: Request, userdata: dict, songs, genres, artistas, albums, merch, artists_map=None, genres_map=None, tya_server=None, facets=None, cursors=None, page_size=None):
         if artists_map is None:
             artists_map = {}
         if genres_map is None:
             genres_map = {}
         data = {"userdata": userdata}
-        return templates.TemplateResponse("shop.html", {
+        return _render("shop.html", {
             "request": request, 
             "data": data,
             "songs": songs,
@@ -66,26 +78,29 @@ class View():
             "artists": artistas,
             "artists_map": artists_map, 
             "genres_map": genres_map,
-            "tya_server": tya_server
+            "tya_server": tya_server,
+            "facets": facets,
+            "cursors": cursors or {},
+            "page_size": page_size
         })
 
     # Esta función se va a usar para renderizar la template music/upload-song.html (versión más reciente/completa de 'get_upload_song_view')
     def get_upload_song_view(self, request: Request):
-        return templates.TemplateResponse("music/upload-song.html", {"request": request})
+        return _render("music/upload-song.html", {"request": request})
     
     def get_songs_view(self, request: Request, songs):
-        return templates.TemplateResponse("main/index.html", {"request" :request, "songs" : songs})
+        return _render("main/index.html", {"request" :request, "songs" : songs})
     
     def get_song_view(self, request: Request, song_info : dict, tipoUsuario: int, user : dict, isLiked: bool, inCarrito: bool, syu_server: str = None, metrics: dict = None, tya_server: str = None, rye_server: str = None, pt_server: str = None):
         data = {"userdata": user, "syu_server": syu_server, "pt_server": pt_server, "song": song_info}
-        return templates.TemplateResponse("song.html", {"request": request, "data": data, "tipoUsuario": tipoUsuario, "user": user, "isLiked": isLiked, "inCarrito": inCarrito, "stats": metrics, "syu_server": syu_server, "tya_server": tya_server, "rye_server": rye_server})
+        return _render("song.html", {"request": request, "data": data, "tipoUsuario": tipoUsuario, "user": user, "isLiked": isLiked, "inCarrito": inCarrito, "stats": metrics, "syu_server": syu_server, "tya_server": tya_server, "rye_server": rye_server})
 
     def get_edit_song_view(self, request: Request, song_info):
-        return templates.TemplateResponse("music/song-edit.html", {"request": request, "song": song_info})     
+        return _render("music/song-edit.html", {"request": request, "song": song_info})     
 
     # Renderizar la template logut.html
     def get_logout_view(self, request: Request):
-        return templates.TemplateResponse("auth/logout.html", {"request": request})
+        return _render("auth/logout.html", {"request": request})
 
     # Renderizar la template profile.html
     # Necesita un user_info completo, no se contempla otro caso.
@@ -93,7 +108,7 @@ class View():
         if payment_methods is None:
             payment_methods = []
         data = {"userdata": usuario_data, "syu_server": syu_server, "pt_server": pt_server}
-        return templates.TemplateResponse("user_profile.html", {
+        return _render("user_profile.html", {
             "request": request,
             "data": data,
             "user": usuario_data,
@@ -107,65 +122,66 @@ class View():
     
     # Renderizar la template faqs.html
     def get_faqs_view(self, request: Request, faqs):
-        return templates.TemplateResponse("main/faqs.html", {"request": request, "faqs": faqs })
+        return _render("main/faqs.html", {"request": request, "faqs": faqs })
     
     # Renderizar la template upload-album.html (versión más reciente/completa de 'get_upload_album_view')
     def get_upload_album_view(self, request: Request, songs: list[dict]):
-        return templates.TemplateResponse("music/upload-album.html", {"request": request , "songs": songs}) 
+        return _render("music/upload-album.html", {"request": request , "songs": songs}) 
     
     # Renderizar la template album.html
     def get_album_view(self, request: Request, album_info : dict, tipoUsuario : int, isLiked: bool, inCarrito: bool, tiempo_formateado: str, userdata: dict = None, pt_server: str = None):
         data = {"userdata": userdata, "pt_server": pt_server}
-        return templates.TemplateResponse("album.html", {"request": request, "data": data, "album": album_info, "tipoUsuario": tipoUsuario, "isLiked": isLiked, "inCarrito": inCarrito, "duracion_total": tiempo_formateado})
+        return _render("album.html", {"request": request, "data": data, "album": album_info, "tipoUsuario": tipoUsuario, "isLiked": isLiked, "inCarrito": inCarrito, "duracion_total": tiempo_formateado})
     
     # Renderizar la template header.html
     def get_header_view(self, request: Request, user_info : dict):
-        return templates.TemplateResponse("includes/header.html", {"request": request, "user": user_info})
+        return _render("includes/header.html", {"request": request, "user": user_info})
     
     # Renderizar la template footer.html
     def get_footer_view(self, request: Request, user_info : dict):
-        return templates.TemplateResponse("includes/footer.html", {"request": request, "user": user_info})
+        return _render("includes/footer.html", {"request": request, "user": user_info})
 
     # Renderizar la template about.html
     def get_about_view(self, request: Request):
-        return templates.TemplateResponse("main/about.html", {"request" : request})
+        return _render("main/about.html", {"request" : request})
 
     # Renderizar la template prepaid.html
     def get_prepaid_view(self, request: Request, carrito : dict):
-        return templates.TemplateResponse("shop/prepaid.html", {"request": request, "carrito": carrito})
+        return _render("shop/prepaid.html", {"request": request, "carrito": carrito})
     
     # Renderizar la template tpv.html
     def get_tpv_view(self, request: Request):
-        return templates.TemplateResponse("shop/tpv.html", {"request": request})
+        return _render("shop/tpv.html", {"request": request})
     
     # Renderizar la template studio.html
     def get_studio_view(self, request: Request, songs: list[dict], albums: list[dict], user: dict):
-        return templates.TemplateResponse("user/studio.html", {"request": request, "songs": songs, "albums": albums, "user" : user})
+        return _render("user/studio.html", {"request": request, "songs": songs, "albums": albums, "user" : user})
     
     # Renderizar la template artista.html
     def get_artista_view(self, request: Request, artista: dict, singles: list[dict], albums: list[dict], songs: list[dict], tipoUsuario: int):
-        return templates.TemplateResponse("shop/artista.html", {"request": request, "artista" : artista, "singles" : singles, "albums" : albums, "songs" : songs, "tipoUsuario" : tipoUsuario})     
+        return _render("shop/artista.html", {"request": request, "artista" : artista, "singles" : singles, "albums" : albums, "songs" : songs, "tipoUsuario" : tipoUsuario})     
     
     # Esta función se va a usar para renderizar la template includes/radio.html
     def get_play_view(self, request: Request): 
-        return templates.TemplateResponse("includes/radio.html", {"request" : request})
+        return _render("includes/radio.html", {"request" : request})
 
     # Renderizar la template purchased.html
     def get_purchased_view(self, request: Request, user, songs):
-        return templates.TemplateResponse("shop/purchased.html", {"request": request, "usuario": user, "songs": songs})
+        return _render("shop/purchased.html", {"request": request, "usuario": user, "songs": songs})
     
     # Renderizar la template search.html
     def get_search_view(self, request: Request, all_items : list[dict]):
-        return templates.TemplateResponse("main/search.html", {"request": request, "items": all_items})
+        return _render("main/search.html", {"request": request, "items": all_items})
     
     # Renderizar la template artist_profile.html
-    def get_artist_profile_view(self, request: Request, artist: dict, userdata: dict, is_own_profile: bool, syu_server: str = None, metrics: dict = None, tya_server: str = None, rye_server: str = None, pt_server: str = None):
+    def get_artist_profile_view(self, request: Request, artist: dict, userdata: dict, is_own_profile: bool, syu_server: str = None, metrics: dict = None, tya_server: str = None, rye_server: str = None, pt_server: str = None, isFollowing: bool = None):
         data = {"userdata": userdata, "syu_server": syu_server, "pt_server": pt_server}
-        return templates.TemplateResponse("artist_profile.html", {
+        return _render("artist_profile.html", {
             "request": request,
             "data": data,
             "artist": artist,
             "is_own_profile": is_own_profile,
+            "isFollowing": isFollowing,
             "stats": metrics,
             "syu_server": syu_server,
             "tya_server": tya_server,
@@ -175,7 +191,7 @@ class View():
     # Renderizar la template artist_studio.html
     def get_artist_studio_view(self, request: Request, artist: dict, userdata: dict, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
-        return templates.TemplateResponse("artist_studio.html", {
+        return _render("artist_studio.html", {
             "request": request,
             "data": data,
             "artist": artist
@@ -185,7 +201,7 @@ class View():
     def get_terms_view(self, request: Request, userdata: dict, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
         last_updated = datetime.now().strftime("%d de %B de %Y")
-        return templates.TemplateResponse("terms.html", {
+        return _render("terms.html", {
             "request": request,
             "data": data,
             "last_updated": last_updated
@@ -195,7 +211,7 @@ class View():
     def get_privacy_view(self, request: Request, userdata: dict, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
         last_updated = datetime.now().strftime("%d de %B de %Y")
-        return templates.TemplateResponse("privacy.html", {
+        return _render("privacy.html", {
             "request": request,
             "data": data,
             "last_updated": last_updated
@@ -205,7 +221,7 @@ class View():
     def get_cookies_view(self, request: Request, userdata: dict, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
         last_updated = datetime.now().strftime("%d de %B de %Y")
-        return templates.TemplateResponse("cookies.html", {
+        return _render("cookies.html", {
             "request": request,
             "data": data,
             "last_updated": last_updated
@@ -215,7 +231,7 @@ class View():
     def get_faq_view(self, request: Request, userdata: dict, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
         last_updated = datetime.now().strftime("%d de %B de %Y")
-        return templates.TemplateResponse("faq.html", {
+        return _render("faq.html", {
             "request": request,
             "data": data,
             "last_updated": last_updated
@@ -225,7 +241,7 @@ class View():
     def get_contact_view(self, request: Request, userdata: dict, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
         last_updated = datetime.now().strftime("%d de %B de %Y")
-        return templates.TemplateResponse("contact.html", {
+        return _render("contact.html", {
             "request": request,
             "data": data,
             "last_updated": last_updated
@@ -235,7 +251,7 @@ class View():
     def get_help_view(self, request: Request, userdata: dict, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
         last_updated = datetime.now().strftime("%d de %B de %Y")
-        return templates.TemplateResponse("help.html", {
+        return _render("help.html", {
             "request": request,
             "data": data,
             "last_updated": last_updated
@@ -244,54 +260,54 @@ class View():
     # Renderizar la template merch.html
     def get_merch_view(self, request: Request, merch_info : dict, tipoUsuario : int, isLiked: bool, inCarrito: bool, userdata: dict = None, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server, "merch": merch_info}
-        return templates.TemplateResponse("merch.html", {"request": request, "data": data, "tipoUsuario": tipoUsuario, "isLiked": isLiked, "inCarrito": inCarrito})
+        return _render("merch.html", {"request": request, "data": data, "tipoUsuario": tipoUsuario, "isLiked": isLiked, "inCarrito": inCarrito})
     
     # Renderizar la template cart.html
     def get_cart_view(self, request: Request, userdata: dict = None, tya_server: str = None):
         data = {"userdata": userdata, "tya_server": tya_server}
-        return templates.TemplateResponse("cart.html", {"request": request, "data": data})
+        return _render("cart.html", {"request": request, "data": data})
     
     # Renderizar la template label.html
     def get_label_view(self, request: Request, label_info : dict, is_owner: bool, is_member: bool, userdata: dict = None, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
-        return templates.TemplateResponse("label.html", {"request": request, "data": data, "label": label_info, "is_owner": is_owner, "is_member": is_member})
+        return _render("label.html", {"request": request, "data": data, "label": label_info, "is_owner": is_owner, "is_member": is_member})
     
     # Renderizar la template label_create.html
     def get_label_create_view(self, request: Request, label_info : dict = None, userdata: dict = None, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
-        return templates.TemplateResponse("label_create.html", {"request": request, "data": data, "label": label_info})
+        return _render("label_create.html", {"request": request, "data": data, "label": label_info})
     
     # Renderizar la template giftcard.html
     def get_giftcard_view(self, request: Request, userdata: dict, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
-        return templates.TemplateResponse("giftcard.html", {"request": request, "data": data})
+        return _render("giftcard.html", {"request": request, "data": data})
 
     # Renderizar la template artist_create.html
     def get_artist_create_view(self, request: Request, userdata: dict = None, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
-        return templates.TemplateResponse("artist_create.html", {"request": request, "data": data})
+        return _render("artist_create.html", {"request": request, "data": data})
     
     # Renderizar la template user_profile_edit.html
     def get_user_profile_edit_view(self, request: Request, userdata: dict = None, syu_server: str = None):
         data = {"userdata": userdata, "syu_server": syu_server}
-        return templates.TemplateResponse("user_profile_edit.html", {"request": request, "data": data})
+        return _render("user_profile_edit.html", {"request": request, "data": data})
     
     # Renderizar la template artist_profile_edit.html
     def get_artist_profile_edit_view(self, request: Request, userdata: dict = None, artist_data: dict = None, tya_server: str = None):
         data = {"userdata": userdata, "artist": artist_data, "tya_server": tya_server}
-        return templates.TemplateResponse("artist_profile_edit.html", {"request": request, "data": data})
+        return _render("artist_profile_edit.html", {"request": request, "data": data})
     
     # Renderizar la template song_edit.html (Versión más reciente)
     def get_song_edit_view(self, request: Request, userdata: dict = None, song_data: dict = None, tya_server: str = None):
         data = {"userdata": userdata, "song": song_data, "tya_server": tya_server}
-        return templates.TemplateResponse("edit_song.html", {"request": request, "data": data})
+        return _render("edit_song.html", {"request": request, "data": data})
     
     # Renderizar la template album_edit.html (Versión más reciente)
     def get_album_edit_view(self, request: Request, userdata: dict = None, album_data: dict = None, tya_server: str = None):
         data = {"userdata": userdata, "album": album_data, "tya_server": tya_server}
-        return templates.TemplateResponse("edit_album.html", {"request": request, "data": data})
+        return _render("edit_album.html", {"request": request, "data": data})
     
     # Renderizar la template merch_edit.html
     def get_merch_edit_view(self, request: Request, userdata: dict = None, merch_data: dict = None, tya_server: str = None):
         data = {"userdata": userdata, "merch": merch_data, "tya_server": tya_server}
-        return templates.TemplateResponse("edit_merch.html", {"request": request, "data": data})
\ No newline at end of file
+        return _render("edit_merch.html", {"request": request, "data": data})
\ No newline at end of file